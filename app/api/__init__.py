@@ -2,5 +2,6 @@
 API package initialization
 """
 from app.api.routes import router
+from app.api.state import AppState, get_state
 
-__all__ = ["router"]
+__all__ = ["router", "AppState", "get_state"]
@@ -7,28 +7,51 @@ Provides RESTful API for:
 - Correlation analysis
 - Results retrieval
 """
-from fastapi import APIRouter, HTTPException, status
-from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse
+from typing import AsyncIterator, List, Optional
 from datetime import datetime
+import asyncio
+import heapq
+import itertools
 import logging
 
-from app.models.topology import TopologySnapshot
+import numpy as np
+from pydantic import TypeAdapter
+
+from app.models.topology import TopologySnapshot, TORRelay
 from app.models.correlation import TrafficObservation, SessionPair, CorrelationCluster
 from app.models.weight_profile import WeightProfile, ProfileType, get_profile, create_custom_profile, PREDEFINED_PROFILES
 from app.core import TORTopologyEngine, CorrelationEngine
+from app.core.correlation import top_indices
+from app.api.state import AppState, get_state
 from app.utils import SyntheticDataGenerator
+from config import settings
 
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
-# Global state (in production, use proper state management/database)
-current_topology: Optional[TopologySnapshot] = None
-topology_engine: Optional[TORTopologyEngine] = None
-correlation_engine: Optional[CorrelationEngine] = None
-stored_observations: List[TrafficObservation] = []
-stored_pairs: List[SessionPair] = []
-stored_clusters: List[CorrelationCluster] = []
+# Serializers for list responses whose items are already validated models;
+# routes keep response_model for the schema but return pre-encoded JSON
+_observation_list = TypeAdapter(List[TrafficObservation])
+_pair_list = TypeAdapter(List[SessionPair])
+_cluster_list = TypeAdapter(List[CorrelationCluster])
+_pair = TypeAdapter(SessionPair)
+_relay_list = TypeAdapter(List[TORRelay])
+
+
+def _json_list_response(adapter: TypeAdapter, items: list) -> Response:
+    """Encode validated models without re-validating them"""
+    return Response(content=adapter.dump_json(items), media_type="application/json")
+
+
+def _relay_list_response(total_key: str, total: int, list_key: str, relays: List[TORRelay]) -> Response:
+    """{total_key: total, list_key: relays}, with the relays encoded straight from the models"""
+    content = b'{"%s":%d,"%s":%s}' % (
+        total_key.encode(), total, list_key.encode(), _relay_list.dump_json(relays)
+    )
+    return Response(content=content, media_type="application/json")
 
 
 @router.get("/", tags=["General"])
@@ -51,13 +74,13 @@ async def root():
 
 
 @router.get("/health", tags=["General"])
-async def health_check():
+async def health_check(state: AppState = Depends(get_state)):
     """Health check endpoint"""
     return {
         "status": "healthy",
-        "topology_loaded": current_topology is not None,
-        "total_relays": current_topology.total_relays if current_topology else 0,
-        "observations_count": len(stored_observations)
+        "topology_loaded": state.topology is not None,
+        "total_relays": state.topology.total_relays if state.topology else 0,
+        "observations_count": len(state.observations)
     }
 
 
@@ -66,7 +89,7 @@ async def health_check():
 # ============================================================================
 
 @router.post("/topology/fetch", response_model=TopologySnapshot, tags=["Topology"])
-async def fetch_topology(limit: Optional[int] = None):
+async def fetch_topology(limit: Optional[int] = None, state: AppState = Depends(get_state)):
     """
     Fetch current TOR network topology from official sources
     
@@ -76,25 +99,23 @@ async def fetch_topology(limit: Optional[int] = None):
     Returns:
         Complete topology snapshot
     """
-    global current_topology, topology_engine, correlation_engine
     
     logger.info(f"Fetching topology (limit={limit})...")
     
     try:
         # Initialize topology engine if needed
-        if topology_engine is None:
-            topology_engine = TORTopologyEngine()
+        if state.topology_engine is None:
+            state.topology_engine = TORTopologyEngine()
         
         # Fetch and create snapshot
-        snapshot = await topology_engine.create_topology_snapshot(limit=limit)
+        snapshot = await state.topology_engine.create_topology_snapshot(limit=limit)
         
-        # Update global state
-        current_topology = snapshot
-        correlation_engine = CorrelationEngine(topology=snapshot)
+        # Update application state
+        state.set_topology(snapshot)
         
         logger.info(f"Topology fetched successfully: {snapshot.total_relays} relays")
         
-        return snapshot
+        return Response(content=state.topology_json, media_type="application/json")
     
     except Exception as e:
         logger.error(f"Failed to fetch topology: {e}")
@@ -105,26 +126,25 @@ async def fetch_topology(limit: Optional[int] = None):
 
 
 @router.get("/topology/current", response_model=TopologySnapshot, tags=["Topology"])
-async def get_current_topology():
+async def get_current_topology(state: AppState = Depends(get_state)):
     """Get currently loaded topology snapshot"""
-    if current_topology is None:
+    if state.topology is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="No topology loaded. Use POST /topology/fetch to load topology."
         )
     
-    return current_topology
+    return Response(content=state.topology_json, media_type="application/json")
 
 
 @router.get("/topology/snapshots", tags=["Topology"])
-async def list_topology_snapshots():
+async def list_topology_snapshots(state: AppState = Depends(get_state)):
     """List all available topology snapshots"""
-    global topology_engine
     
-    if topology_engine is None:
-        topology_engine = TORTopologyEngine()
+    if state.topology_engine is None:
+        state.topology_engine = TORTopologyEngine()
     
-    snapshots = topology_engine.list_snapshots()
+    snapshots = state.topology_engine.list_snapshots()
     
     return {
         "snapshots": snapshots,
@@ -133,73 +153,99 @@ async def list_topology_snapshots():
 
 
 @router.get("/topology/guards", tags=["Topology"])
-async def get_guard_relays(limit: int = 50):
+async def get_guard_relays(limit: int = 50, state: AppState = Depends(get_state)):
     """Get list of guard-capable relays"""
-    if current_topology is None:
+    if state.topology is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="No topology loaded"
         )
     
-    guards = [r for r in current_topology.relays if r.is_guard]
-    guards.sort(key=lambda r: r.consensus_weight, reverse=True)
-    
-    return {
-        "total_guards": len(guards),
-        "guards": guards[:limit]
-    }
+    return _relay_list_response("total_guards", len(state.guards), "guards", state.guards[:limit])
 
 
 @router.get("/topology/exits", tags=["Topology"])
-async def get_exit_relays(limit: int = 50):
+async def get_exit_relays(limit: int = 50, state: AppState = Depends(get_state)):
     """Get list of exit-capable relays"""
-    if current_topology is None:
+    if state.topology is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="No topology loaded"
         )
     
-    exits = [r for r in current_topology.relays if r.is_exit]
-    exits.sort(key=lambda r: r.consensus_weight, reverse=True)
-    
-    return {
-        "total_exits": len(exits),
-        "exits": exits[:limit]
-    }
+    return _relay_list_response("total_exits", len(state.exits), "exits", state.exits[:limit])
 
 
 # ============================================================================
 # OBSERVATION ENDPOINTS
 # ============================================================================
 
+def _ingest_observations(state: AppState, observations: List[TrafficObservation]) -> None:
+    """Store a batch of observations, mapping store errors to HTTP 400"""
+    try:
+        state.observations.extend(observations)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+
 @router.post("/observations/add", response_model=TrafficObservation, tags=["Observations"])
-async def add_observation(observation: TrafficObservation):
+async def add_observation(observation: TrafficObservation, state: AppState = Depends(get_state)):
     """
     Add a traffic observation
     
     In production, this would validate case numbers and authorization.
     For PoC, accepts any valid observation.
     """
-    global stored_observations
-    
     logger.info(f"Adding observation: {observation.observation_id}")
     
-    stored_observations.append(observation)
+    _ingest_observations(state, [observation])
     
     return observation
 
 
+@router.post("/observations/add-batch", tags=["Observations"])
+async def add_observations_batch(
+    observations: List[TrafficObservation],
+    state: AppState = Depends(get_state)
+):
+    """
+    Add many traffic observations in one request
+    
+    The batch is stored as a unit: either every observation is accepted
+    or none is.
+    """
+    if len(observations) > settings.MAX_OBSERVATION_BATCH_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Batch too large: {len(observations)} observations "
+                   f"(maximum {settings.MAX_OBSERVATION_BATCH_SIZE} per request)"
+        )
+    
+    logger.info(f"Adding batch of {len(observations)} observations")
+    
+    _ingest_observations(state, observations)
+    
+    return {
+        "accepted": len(observations),
+        "total_observations": len(state.observations)
+    }
+
+
 @router.get("/observations/list", response_model=List[TrafficObservation], tags=["Observations"])
-async def list_observations(limit: int = 100):
+async def list_observations(limit: int = 100, state: AppState = Depends(get_state)):
     """List all stored observations"""
-    return stored_observations[:limit]
+    return _json_list_response(_observation_list, state.observations.observations[:limit])
 
 
 @router.post("/observations/generate-synthetic", tags=["Observations"])
 async def generate_synthetic_observations(
     num_sessions: int = 5,
     num_noise: int = 10,
-    guard_persistence: bool = True
+    guard_persistence: bool = True,
+    state: AppState = Depends(get_state)
 ):
     """
     Generate synthetic observations for testing
@@ -209,9 +255,8 @@ async def generate_synthetic_observations(
         num_noise: Number of uncorrelated noise observations
         guard_persistence: Whether to use persistent guard (realistic)
     """
-    global stored_observations, current_topology
     
-    if current_topology is None:
+    if state.topology is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="No topology loaded. Fetch topology first."
@@ -219,11 +264,14 @@ async def generate_synthetic_observations(
     
     logger.info(f"Generating {num_sessions} synthetic sessions + {num_noise} noise observations")
     
-    generator = SyntheticDataGenerator(current_topology)
+    # Generation builds many models; run it in worker threads so the
+    # event loop keeps serving other requests
+    generator = await asyncio.to_thread(SyntheticDataGenerator, state.topology)
     base_time = datetime.utcnow()
     
     # Generate correlated sessions
-    entry_obs, exit_obs = generator.generate_user_sessions(
+    entry_obs, exit_obs = await asyncio.to_thread(
+        generator.generate_user_sessions,
         num_sessions=num_sessions,
         base_time=base_time,
         time_spread_hours=24,
@@ -231,21 +279,22 @@ async def generate_synthetic_observations(
     )
     
     # Generate noise
-    noise_entry, noise_exit = generator.generate_noise_observations(
+    noise_entry, noise_exit = await asyncio.to_thread(
+        generator.generate_noise_observations,
         num_observations=num_noise,
         base_time=base_time,
         time_spread_hours=24
     )
     
-    # Store all observations
+    # Store all observations (on the event loop, so no other handler sees a partial batch)
     all_observations = entry_obs + exit_obs + noise_entry + noise_exit
-    stored_observations.extend(all_observations)
+    _ingest_observations(state, all_observations)
     
     return {
         "generated": len(all_observations),
         "correlated_sessions": num_sessions,
         "noise_observations": num_noise * 2,
-        "total_observations": len(stored_observations)
+        "total_observations": len(state.observations)
     }
 
 
@@ -253,45 +302,87 @@ async def generate_synthetic_observations(
 # CORRELATION ENDPOINTS
 # ============================================================================
 
+class _AnalysisAbandoned(Exception):
+    """The run a request joined was cancelled before it finished; start another"""
+
+
 @router.post("/correlation/analyze", tags=["Correlation"])
-async def analyze_correlations():
+async def analyze_correlations(state: AppState = Depends(get_state)):
     """
     Run correlation analysis on stored observations
     
     Identifies potential entry-exit pairs and clusters
     """
-    global correlation_engine, stored_observations, stored_pairs, stored_clusters
+    _check_analysis_inputs(state)
+    
+    # Requests arriving while a run is queued behind the lock join that run:
+    # it has not snapshotted the observations yet, so its result covers them
+    while state.pending_analysis is not None:
+        logger.info("Joining queued correlation analysis")
+        try:
+            return await asyncio.shield(state.pending_analysis)
+        except _AnalysisAbandoned:
+            logger.info("Joined correlation analysis was cancelled; retrying")
     
-    if correlation_engine is None:
+    result = asyncio.get_running_loop().create_future()
+    state.pending_analysis = result
+    try:
+        async with state.analysis_lock:
+            state.pending_analysis = None  # Later requests start a new run
+            response = await _run_analysis(state)
+    except BaseException as e:
+        if state.pending_analysis is result:
+            state.pending_analysis = None
+        # A cancelled run (e.g. its client disconnected) says nothing about
+        # the joiners' requests, so they retry rather than fail with it
+        result.set_exception(_AnalysisAbandoned() if isinstance(e, asyncio.CancelledError) else e)
+        result.exception()  # Retrieved here; joiners re-raise it themselves
+        raise
+    
+    result.set_result(response)
+    return response
+
+
+def _check_analysis_inputs(state: AppState) -> None:
+    """Raise the HTTP error for a correlation run that cannot start"""
+    if state.correlation_engine is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="No correlation engine initialized. Load topology first."
         )
     
-    if len(stored_observations) == 0:
+    if len(state.observations) == 0:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="No observations available for correlation"
         )
+
+
+async def _run_analysis(state: AppState) -> dict:
+    """Correlate and cluster the stored observations; caller holds analysis_lock"""
+    logger.info(f"Analyzing {len(state.observations)} observations...")
     
-    logger.info(f"Analyzing {len(stored_observations)} observations...")
-    
-    # Separate entry and exit observations
-    entry_obs = [o for o in stored_observations if o.observation_type.value == "entry_observed"]
-    exit_obs = [o for o in stored_observations if o.observation_type.value == "exit_observed"]
+    # Snapshot the entry/exit buckets so ingestion can continue during the run
+    entry_obs = state.observations.entry_batch()
+    exit_obs = state.observations.exit_batch()
     
     logger.info(f"Found {len(entry_obs)} entry observations and {len(exit_obs)} exit observations")
     
-    # Run correlation
-    pairs = correlation_engine.correlate_observations(entry_obs, exit_obs)
-    stored_pairs = pairs
+    # Run correlation off the event loop; it is CPU-bound
+    loop = asyncio.get_running_loop()
+    pairs = await loop.run_in_executor(
+        state.correlation_executor, state.correlation_engine.correlate_observations,
+        entry_obs, exit_obs
+    )
+    clusters = await loop.run_in_executor(
+        state.correlation_executor, state.correlation_engine.cluster_session_pairs, pairs
+    )
     
-    # Create clusters
-    clusters = correlation_engine.cluster_session_pairs(pairs)
-    stored_clusters = clusters
+    state.set_pairs(pairs)
+    state.clusters = clusters
     
     return {
-        "observations_analyzed": len(stored_observations),
+        "observations_analyzed": len(state.observations),
         "entry_observations": len(entry_obs),
         "exit_observations": len(exit_obs),
         "session_pairs_found": len(pairs),
@@ -300,8 +391,114 @@ async def analyze_correlations():
     }
 
 
+@router.post("/correlation/analyze/stream", tags=["Correlation"])
+async def analyze_correlations_stream(state: AppState = Depends(get_state)):
+    """
+    Run correlation analysis and stream session pairs as they are scored
+    
+    The response is NDJSON, one SessionPair per line. Once the run
+    completes, stored pairs and clusters are replaced as with
+    /correlation/analyze.
+    """
+    _check_analysis_inputs(state)
+    return _ClosingStreamingResponse(_stream_analysis(state), media_type="application/x-ndjson")
+
+
+class _ClosingStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse that closes its body generator however the response ends
+    
+    A disconnect that lands while a chunk is being sent leaves the generator
+    suspended at its yield; closing it runs its cleanup straight away.
+    """
+    
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            await self.body_iterator.aclose()
+
+
+# Streamed pairs are scored and relayed in chunks; the buffer between the
+# run and the client is bounded, and a client that stops reading for
+# _STREAM_STALL_TIMEOUT seconds ends the run
+_STREAM_CHUNK_PAIRS = 256
+_STREAM_BUFFER_CHUNKS = 8
+_STREAM_STALL_TIMEOUT = 30.0
+
+
+async def _stream_analysis(state: AppState) -> AsyncIterator[bytes]:
+    """
+    Relay the chunks of a streamed correlation run as NDJSON
+    
+    The run holds analysis_lock only while it scores and stores; if the
+    client goes away it is cancelled, and nothing is stored.
+    """
+    chunks: asyncio.Queue = asyncio.Queue(maxsize=_STREAM_BUFFER_CHUNKS)
+    run = asyncio.create_task(_produce_stream(state, chunks))
+    try:
+        while (chunk := await _next_chunk(chunks, run)) is not None:
+            yield b"".join(_pair.dump_json(pair) + b"\n" for pair in chunk)
+    finally:
+        if not run.cancel() and not run.cancelled():
+            run.exception()  # Already raised to the client, or moot once it left
+
+
+async def _produce_stream(state: AppState, chunks: asyncio.Queue) -> None:
+    """Run the correlation generator in the correlation executor, queueing its pairs in chunks"""
+    loop = asyncio.get_running_loop()
+    async with state.analysis_lock:
+        entry_obs = state.observations.entry_batch()
+        exit_obs = state.observations.exit_batch()
+        logger.info(f"Streaming correlation of {len(entry_obs)} entry and {len(exit_obs)} exit observations")
+        
+        # The generator only advances in the single-worker executor
+        pair_iter = state.correlation_engine.iter_correlate_observations(entry_obs, exit_obs)
+        pairs = []
+        while chunk := await loop.run_in_executor(
+            state.correlation_executor, _take_pairs, pair_iter
+        ):
+            pairs.extend(chunk)
+            # asyncio.timeout rather than wait_for: on 3.11, wait_for can
+            # swallow the cancellation of a run whose client has left
+            try:
+                async with asyncio.timeout(_STREAM_STALL_TIMEOUT):
+                    await chunks.put(chunk)
+            except TimeoutError:
+                logger.warning("Stream client stopped reading; abandoning correlation run")
+                raise
+        
+        clusters = await loop.run_in_executor(
+            state.correlation_executor, state.correlation_engine.cluster_session_pairs, pairs
+        )
+        state.set_pairs(pairs)
+        state.clusters = clusters
+
+
+def _take_pairs(pair_iter) -> List[SessionPair]:
+    """Next chunk of pairs from the correlation generator; empty once it is exhausted"""
+    return list(itertools.islice(pair_iter, _STREAM_CHUNK_PAIRS))
+
+
+async def _next_chunk(chunks: asyncio.Queue, run: asyncio.Task) -> Optional[List[SessionPair]]:
+    """Next queued chunk, or None once the run has finished; re-raises the run's error"""
+    if chunks.empty() and not run.done():
+        getter = asyncio.ensure_future(chunks.get())
+        try:
+            await asyncio.wait((getter, run), return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            getter.cancel()
+        if getter.done() and not getter.cancelled():
+            return getter.result()
+    
+    if not chunks.empty():
+        return chunks.get_nowait()
+    run.result()
+    return None
+
+
 @router.get("/correlation/pairs", response_model=List[SessionPair], tags=["Correlation"])
-async def get_session_pairs(min_confidence: float = 0.0, limit: int = 100):
+async def get_session_pairs(min_confidence: float = 0.0, limit: int = 100, state: AppState = Depends(get_state)):
     """
     Get identified session pairs
     
@@ -309,19 +506,16 @@ async def get_session_pairs(min_confidence: float = 0.0, limit: int = 100):
         min_confidence: Minimum correlation strength to return
         limit: Maximum number of results
     """
-    filtered_pairs = [
-        p for p in stored_pairs
-        if p.correlation_strength >= min_confidence
-    ]
-    
-    # Sort by correlation strength (highest first)
-    filtered_pairs.sort(key=lambda p: p.correlation_strength, reverse=True)
-    
-    return filtered_pairs[:limit]
+    # Strongest correlations first; selected on the strength column, and
+    # only the top `limit` are ordered
+    strengths = state.pair_strengths
+    candidates = np.flatnonzero(strengths >= min_confidence)
+    top = candidates[top_indices(strengths[candidates], limit)]
+    return _json_list_response(_pair_list, [state.pairs[i] for i in top])
 
 
 @router.get("/correlation/clusters", response_model=List[CorrelationCluster], tags=["Correlation"])
-async def get_correlation_clusters(min_confidence: float = 0.0):
+async def get_correlation_clusters(min_confidence: float = 0.0, state: AppState = Depends(get_state)):
     """
     Get identified correlation clusters
     
@@ -329,34 +523,34 @@ async def get_correlation_clusters(min_confidence: float = 0.0):
         min_confidence: Minimum cluster confidence to return
     """
     filtered_clusters = [
-        c for c in stored_clusters
+        c for c in state.clusters
         if c.cluster_confidence >= min_confidence
     ]
     
     # Sort by confidence (highest first)
     filtered_clusters.sort(key=lambda c: c.cluster_confidence, reverse=True)
     
-    return filtered_clusters
+    return _json_list_response(_cluster_list, filtered_clusters)
 
 
 @router.get("/correlation/summary", tags=["Correlation"])
-async def get_correlation_summary():
+async def get_correlation_summary(state: AppState = Depends(get_state)):
     """Get summary statistics of correlation analysis"""
-    if len(stored_pairs) == 0:
+    if len(state.pairs) == 0:
         return {
             "status": "no_analysis",
             "message": "No correlation analysis has been run yet"
         }
     
     # Calculate statistics
-    avg_correlation = sum(p.correlation_strength for p in stored_pairs) / len(stored_pairs)
-    high_confidence = sum(1 for p in stored_pairs if p.correlation_strength >= 70)
-    medium_confidence = sum(1 for p in stored_pairs if 40 <= p.correlation_strength < 70)
-    low_confidence = sum(1 for p in stored_pairs if p.correlation_strength < 40)
+    avg_correlation = float(state.pair_strengths.mean())
+    low_confidence, medium_confidence, high_confidence = (
+        int(c) for c in np.histogram(state.pair_strengths, bins=[-np.inf, 40, 70, np.inf])[0]
+    )
     
     return {
-        "total_pairs": len(stored_pairs),
-        "total_clusters": len(stored_clusters),
+        "total_pairs": len(state.pairs),
+        "total_clusters": len(state.clusters),
         "average_correlation": round(avg_correlation, 2),
         "confidence_distribution": {
             "high_confidence (>=70%)": high_confidence,
@@ -370,28 +564,27 @@ async def get_correlation_summary():
                 "observations": c.observation_count,
                 "probable_guards": c.probable_guards
             }
-            for c in sorted(stored_clusters, key=lambda x: x.cluster_confidence, reverse=True)[:5]
+            for c in heapq.nlargest(5, state.clusters, key=lambda x: x.cluster_confidence)
         ]
     }
 
 
 @router.get("/correlation/repetition-stats", tags=["Correlation"])
-async def get_repetition_statistics():
+async def get_repetition_statistics(state: AppState = Depends(get_state)):
     """
     Get statistics about repeated observation patterns
     
     Shows how many patterns have been observed multiple times,
     which can increase correlation confidence.
     """
-    global correlation_engine
     
-    if correlation_engine is None:
+    if state.correlation_engine is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="No correlation engine initialized. Load topology first."
         )
     
-    stats = correlation_engine.get_repetition_statistics()
+    stats = state.correlation_engine.get_repetition_statistics()
     
     return {
         "repetition_weighting": stats,
@@ -402,7 +595,7 @@ async def get_repetition_statistics():
 
 
 @router.get("/correlation/pairs/{pair_id}/reasoning", tags=["Correlation"])
-async def get_pair_reasoning(pair_id: str):
+async def get_pair_reasoning(pair_id: str, state: AppState = Depends(get_state)):
     """
     Get detailed plain-English reasoning for a specific session pair
     
@@ -412,10 +605,7 @@ async def get_pair_reasoning(pair_id: str):
     Returns:
         Detailed reasoning and score breakdown
     """
-    global stored_pairs
-    
-    # Find the pair
-    pair = next((p for p in stored_pairs if p.pair_id == pair_id), None)
+    pair = state.pairs_by_id.get(pair_id)
     
     if pair is None:
         raise HTTPException(
@@ -423,7 +613,8 @@ async def get_pair_reasoning(pair_id: str):
             detail=f"Session pair '{pair_id}' not found"
         )
     
-    return {
+    # Plain JSON types only, so skip jsonable_encoder's recursive walk
+    return ORJSONResponse({
         "pair_id": pair.pair_id,
         "correlation_strength": pair.correlation_strength,
         "reasoning": pair.reasoning,
@@ -437,7 +628,7 @@ async def get_pair_reasoning(pair_id: str):
             "guard_relay": pair.hypothesized_guard,
             "guard_confidence": pair.guard_confidence
         }
-    }
+    })
 
 
 # =============================================================================
@@ -551,16 +742,15 @@ async def create_custom_weight_profile(
 
 
 @router.get("/correlation/weight-profile", tags=["Correlation"])
-async def get_current_weight_profile():
+async def get_current_weight_profile(state: AppState = Depends(get_state)):
     """
     Get the current weight profile being used by the correlation engine
     
     Returns:
         Current WeightProfile
     """
-    global correlation_engine
     
-    if correlation_engine is None:
+    if state.correlation_engine is None:
         # Return default profile
         return {
             "status": "no_engine",
@@ -570,13 +760,13 @@ async def get_current_weight_profile():
     
     return {
         "status": "active",
-        "profile": correlation_engine.get_weight_profile(),
+        "profile": state.correlation_engine.get_weight_profile(),
         "message": "This profile is currently used for all correlations"
     }
 
 
 @router.post("/correlation/weight-profile", tags=["Correlation"])
-async def update_weight_profile(profile: WeightProfile):
+async def update_weight_profile(profile: WeightProfile, state: AppState = Depends(get_state)):
     """
     Update the weight profile for the correlation engine
     
@@ -588,9 +778,8 @@ async def update_weight_profile(profile: WeightProfile):
     Returns:
         Confirmation with new profile details
     """
-    global correlation_engine
     
-    if correlation_engine is None:
+    if state.correlation_engine is None:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Correlation engine not initialized. Run /correlation/analyze first."
@@ -601,7 +790,7 @@ async def update_weight_profile(profile: WeightProfile):
         profile.validate_weights_sum()
         
         # Update engine
-        correlation_engine.set_weight_profile(profile)
+        state.correlation_engine.set_weight_profile(profile)
         
         return {
             "status": "success",
@@ -619,7 +808,8 @@ async def update_weight_profile(profile: WeightProfile):
 @router.post("/correlation/analyze-with-profile", tags=["Correlation"])
 async def analyze_with_custom_profile(
     profile_type: Optional[str] = "standard",
-    custom_profile: Optional[WeightProfile] = None
+    custom_profile: Optional[WeightProfile] = None,
+    state: AppState = Depends(get_state)
 ):
     """
     Run correlation analysis with a specific weight profile
@@ -634,9 +824,8 @@ async def analyze_with_custom_profile(
     Returns:
         Correlation results with profile information
     """
-    global stored_observations, correlation_engine, stored_pairs, current_topology
     
-    if not stored_observations:
+    if len(state.observations) == 0:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="No observations available. Add observations first via /observations/add"
@@ -645,7 +834,6 @@ async def analyze_with_custom_profile(
     # Get profile
     if custom_profile:
         profile = custom_profile
-        profile.validate_weights_sum()
     else:
         try:
             prof_type = ProfileType(profile_type)
@@ -656,16 +844,32 @@ async def analyze_with_custom_profile(
                 detail=f"Invalid profile type: {profile_type}"
             )
     
-    # Create new correlation engine with profile
-    correlation_engine = CorrelationEngine(topology=current_topology, weight_profile=profile)
+    # Snapshot the entry/exit buckets so ingestion can continue during the run
+    entry_obs = state.observations.entry_batch()
+    exit_obs = state.observations.exit_batch()
     
-    # Separate entry and exit observations
-    entry_obs = [obs for obs in stored_observations if obs.observation_type == "entry"]
-    exit_obs = [obs for obs in stored_observations if obs.observation_type == "exit"]
+    # Engine for this profile; reuses the current engine's topology indexes
+    try:
+        if state.correlation_engine is not None:
+            engine = state.correlation_engine.with_profile(profile)
+        else:
+            engine = CorrelationEngine(topology=state.topology, weight_profile=profile)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
     
-    # Run correlation
-    pairs = correlation_engine.correlate_observations(entry_obs, exit_obs)
-    stored_pairs = pairs
+    # Run it off the event loop
+    loop = asyncio.get_running_loop()
+    async with state.analysis_lock:
+        state.correlation_engine = engine
+        pairs = await loop.run_in_executor(
+            state.correlation_executor, state.correlation_engine.correlate_observations,
+            entry_obs, exit_obs
+        )
+        
+        state.set_pairs(pairs)
     
     return {
         "status": "success",
@@ -683,9 +887,8 @@ async def analyze_with_custom_profile(
             "entry_observations": len(entry_obs),
             "exit_observations": len(exit_obs)
         },
-        "top_correlations": sorted(
-            [{"pair_id": p.pair_id, "strength": p.correlation_strength} for p in pairs],
-            key=lambda x: x["strength"],
-            reverse=True
-        )[:10]
+        "top_correlations": [
+            {"pair_id": p.pair_id, "strength": p.correlation_strength}
+            for p in CorrelationEngine.top_pairs(pairs, 10)
+        ]
     }
@@ -0,0 +1,87 @@
+"""
+API application state
+
+Holds the in-memory state shared by the API routes of one process.
+An AppState instance lives on ``app.state`` and is injected into
+handlers with ``Depends(get_state)``.
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+import numpy as np
+import orjson
+from fastapi import Request
+
+from app.models.topology import TopologySnapshot, TORRelay
+from app.models.correlation import SessionPair, CorrelationCluster
+from app.core import TORTopologyEngine, CorrelationEngine, ObservationStore
+
+
+class AppState:
+    """
+    Mutable state of one API process
+
+    In production this would be backed by a database; for the PoC
+    everything is kept in memory.
+    """
+
+    def __init__(self):
+        # Topology
+        self.topology: Optional[TopologySnapshot] = None
+        self.topology_json: bytes = b""  # topology serialized once, served as-is
+        self.guards: List[TORRelay] = []  # Guards of topology, by consensus weight
+        self.exits: List[TORRelay] = []   # Exits of topology, by consensus weight
+        self.topology_engine: Optional[TORTopologyEngine] = None
+        self.correlation_engine: Optional[CorrelationEngine] = None
+
+        # Observations and correlation results
+        self.observations = ObservationStore()
+        self.pairs: List[SessionPair] = []
+        self.pairs_by_id: Dict[str, SessionPair] = {}
+        self.pair_strengths: np.ndarray = np.empty(0)  # correlation_strength of each pair
+        self.clusters: List[CorrelationCluster] = []
+
+        # Serializes correlation runs: the engine keeps repetition state and
+        # the results replace pairs/clusters as a unit
+        self.analysis_lock = asyncio.Lock()
+        
+        # Result of the /correlation/analyze run waiting for analysis_lock,
+        # shared by requests that arrive before it starts
+        self.pending_analysis: Optional[asyncio.Future] = None
+        
+        # Correlation runs execute here, off the event loop and without taking
+        # threads from the default executor. Runs are serialized by
+        # analysis_lock, so one worker is enough; a process pool is not an
+        # option because runs update the engine's in-process repetition state.
+        self.correlation_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="correlation")
+
+    def set_topology(self, snapshot: TopologySnapshot) -> None:
+        """Install a topology snapshot and a fresh correlation engine for it"""
+        self.topology = snapshot
+        # Same bytes as model_dump_json (OPT_UTC_Z keeps the "Z" suffix), but faster
+        self.topology_json = orjson.dumps(snapshot.model_dump(), option=orjson.OPT_UTC_Z)
+        # Heaviest consensus weight first, ordered on the snapshot's columns
+        relays = snapshot.relays
+        self.guards = [relays[i] for i in snapshot.rows_by_weight(snapshot.arrays.is_guard)]
+        self.exits = [relays[i] for i in snapshot.rows_by_weight(snapshot.arrays.is_exit)]
+        self.correlation_engine = CorrelationEngine(topology=snapshot)
+
+    async def close(self) -> None:
+        """Release worker threads and HTTP connections; called on application shutdown"""
+        self.correlation_executor.shutdown(wait=False, cancel_futures=True)
+        if self.topology_engine is not None:
+            await self.topology_engine.close()
+    
+    def set_pairs(self, pairs: List[SessionPair]) -> None:
+        """Replace the stored session pairs and their lookup structures"""
+        self.pairs = pairs
+        self.pairs_by_id = {p.pair_id: p for p in pairs}
+        self.pair_strengths = np.fromiter(
+            (p.correlation_strength for p in pairs), dtype=np.float64, count=len(pairs)
+        )
+
+
+async def get_state(request: Request) -> AppState:
+    """FastAPI dependency returning the application's AppState"""
+    return request.app.state.app_state
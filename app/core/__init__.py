@@ -2,10 +2,11 @@
 Core module initialization
 """
 from app.core.topology import TORTopologyEngine, TORGraphAnalyzer
-from app.core.correlation import CorrelationEngine
+from app.core.correlation import CorrelationEngine, ObservationStore
 
 __all__ = [
     "TORTopologyEngine",
     "TORGraphAnalyzer",
     "CorrelationEngine",
+    "ObservationStore",
 ]
@@ -1,8 +1,12 @@
 """
 Correlation module initialization
 """
-from app.core.correlation.engine import CorrelationEngine
+from app.core.correlation.engine import CorrelationEngine, TrafficObservationBatch, top_indices
+from app.core.correlation.observation_store import ObservationStore
 
 __all__ = [
     "CorrelationEngine",
+    "ObservationStore",
+    "TrafficObservationBatch",
+    "top_indices",
 ]
@@ -0,0 +1,89 @@
+"""
+Compiled pair scoring kernel
+
+Fused, single-pass version of engine._score_columns over window
+candidates. It is compiled with Numba when Numba is installed;
+otherwise ``score_candidates`` is None and the engine keeps using the
+NumPy implementation, which gives the same results.
+"""
+import numpy as np
+
+try:
+    import numba
+except ImportError:  # optional dependency
+    numba = None
+
+
+_prange = numba.prange if numba is not None else range
+
+
+def _score_candidates(
+    rows, cols,
+    ts_e, vol_e, npk_e,
+    ts_x, vol_x, npk_x,
+    time_window, w_t, w_v, w_p,
+    log_decay, volume_lut
+):
+    """
+    (time_delta_us, base_correlation) of the candidate pairs (rows[k], cols[k])
+
+    Same formulas as engine._score_columns. An empty volume_lut selects
+    "ratio" volume scoring; otherwise the volume columns are
+    volume_buckets codes and volume_lut is indexed by bucket distance.
+    """
+    k = rows.shape[0]
+    # The parallel loop runs over the flat candidate list rather than over
+    # entries: every iteration is the same small amount of work and each
+    # writes only its own output slot, so threads stay balanced however
+    # unevenly candidates fall per entry, and no per-thread lists or dense
+    # N x M mask need gathering afterwards
+    delta_us = np.empty(k, dtype=np.int64)
+    base = np.empty(k, dtype=np.float64)
+    norm = w_t + w_v
+    if norm > 0:
+        norm_t = w_t / norm
+        norm_v = w_v / norm
+    else:  # Pattern-only weights: nothing to score pairs without patterns on
+        norm_t = 0.0
+        norm_v = 0.0
+
+    for n in _prange(k):
+        i = rows[n]
+        j = cols[n]
+
+        d = abs(ts_x[j] - ts_e[i])
+        seconds = d / 1e6
+        if log_decay:
+            t = 100.0 / (1.0 + np.log1p(seconds / time_window))
+        else:
+            t = np.exp(-seconds / time_window) * 100
+
+        ve = vol_e[i]
+        vx = vol_x[j]
+        if ve > 0 and vx > 0:
+            if volume_lut.shape[0] > 0:
+                v = volume_lut[abs(np.int64(ve) - np.int64(vx))]
+            else:
+                fe = np.float64(ve)
+                fx = np.float64(vx)
+                v = min(fe, fx) / max(fe, fx) * 100
+        else:
+            v = 50.0
+
+        pe = npk_e[i]
+        px = npk_x[j]
+        if pe > 0 and px > 0:
+            p = min(pe, px) / max(pe, px) * 100
+            base[n] = t * w_t + v * w_v + p * w_p
+        else:
+            base[n] = t * norm_t + v * norm_v
+        delta_us[n] = d
+
+    return delta_us, base
+
+
+# No fastmath: viability is decided against min_confidence, so the kernel
+# must round like the NumPy path
+score_candidates = (
+    numba.njit(cache=True, parallel=True)(_score_candidates) if numba is not None else None
+)
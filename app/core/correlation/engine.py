@@ -14,9 +14,15 @@ METHODOLOGY:
 - No deanonymization: Outputs are probabilistic leads, not identities
 """
 import logging
+from dataclasses import dataclass
 from datetime import datetime, timedelta
-from typing import List, Optional, Tuple, Dict, Any
+from typing import List, Optional, Tuple, Dict, Any, Iterator, Union, Deque
+import copy
+import itertools
 import math
+from functools import lru_cache, partial
+
+import numpy as np
 
 from app.models.correlation import (
     TrafficObservation,
@@ -27,12 +33,436 @@ from app.models.correlation import (
 from app.models.topology import TopologySnapshot
 from app.models.weight_profile import WeightProfile, ProfileType, get_profile
 from app.core.topology import TORGraphAnalyzer
+from app.core.correlation._kernels import score_candidates
 from config import settings
-from collections import defaultdict
+from collections import defaultdict, deque, OrderedDict
 
 
 logger = logging.getLogger(__name__)
 
+_ONE_MICROSECOND = timedelta(microseconds=1)
+
+
+def _obs_to_soa(
+    observations: List[TrafficObservation],
+    epoch: datetime
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Convert observations to structure-of-arrays form for vectorized scoring
+
+    Timestamps are stored as integer microseconds since ``epoch`` so that
+    deltas (and the time-window check) are exactly what ``timedelta`` gives.
+
+    Returns:
+        Tuple of (timestamps_us int64, bytes uint64, packet_counts int64,
+        type_codes uint8). Missing volume or timing data is stored as 0;
+        type codes index _OBS_TYPES (ENTRY_TYPE_CODE, EXIT_TYPE_CODE, ...),
+        so entry/exit masks are one array comparison.
+    """
+    ts, vol, npk = _obs_columns(observations, epoch)
+    type_codes = np.fromiter(
+        (_OBS_TYPE_CODES.get(o.observation_type, _UNKNOWN_OBS_TYPE_CODE) for o in observations),
+        dtype=np.uint8, count=len(observations)
+    )
+    return ts, vol, npk, type_codes
+
+
+def _obs_columns(
+    observations: List[TrafficObservation],
+    epoch: datetime
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    The scored columns of _obs_to_soa: (timestamps_us, bytes, packet_counts)
+
+    This is the only place observation timestamps are turned into numbers,
+    once per observation; pair deltas are then int64 differences. Exact
+    timedelta arithmetic is used instead of datetime.timestamp(), whose
+    float result loses microseconds and treats naive times as local time.
+    Converting through np.array(..., dtype="datetime64[us]") is about ten
+    times slower than this generator and deprecated for aware datetimes.
+    """
+    n = len(observations)
+    ts = np.fromiter(
+        ((o.timestamp - epoch) // _ONE_MICROSECOND for o in observations),
+        dtype=np.int64, count=n
+    )
+    vol = np.fromiter((o.bytes_transferred or 0 for o in observations), dtype=np.uint64, count=n)
+    npk = np.fromiter(
+        (len(o.inter_packet_timings) if o.inter_packet_timings else 0 for o in observations),
+        dtype=np.int64, count=n
+    )
+    return ts, vol, npk
+
+
+@dataclass
+class TrafficObservationBatch:
+    """
+    Observations plus the columns the correlator scores on (struct of arrays)
+
+    Conversion happens once per batch; correlate_observations then reads
+    contiguous arrays and touches the models only for pairs it reports.
+    Batches correlated against each other must share the same epoch.
+    """
+    observations: List[TrafficObservation]
+    epoch: Optional[datetime]
+    timestamps_us: np.ndarray   # int64 microseconds since epoch
+    bytes_transferred: np.ndarray  # uint64, 0 when missing
+    packet_counts: np.ndarray   # int64 length of inter_packet_timings, 0 when missing
+
+    def __len__(self) -> int:
+        return len(self.observations)
+
+    @property
+    def arrays(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        return self.timestamps_us, self.bytes_transferred, self.packet_counts
+
+    @classmethod
+    def from_observations(
+        cls,
+        observations: List[TrafficObservation],
+        epoch: Optional[datetime] = None
+    ) -> "TrafficObservationBatch":
+        """Convert observations in one pass; epoch defaults to the first timestamp"""
+        observations = list(observations)
+        if epoch is None and observations:
+            epoch = observations[0].timestamp
+        return cls(observations, epoch, *_obs_columns(observations, epoch))
+
+    def concat(self, other: "TrafficObservationBatch") -> "TrafficObservationBatch":
+        """This batch followed by `other`, which must share its epoch"""
+        return TrafficObservationBatch(
+            self.observations + other.observations,
+            self.epoch if self.epoch is not None else other.epoch,
+            np.concatenate((self.timestamps_us, other.timestamps_us)),
+            np.concatenate((self.bytes_transferred, other.bytes_transferred)),
+            np.concatenate((self.packet_counts, other.packet_counts))
+        )
+
+
+ObservationsLike = Union[List[TrafficObservation], TrafficObservationBatch]
+
+
+_TIME_DECAY_FUNCTIONS = ("exponential", "log")
+
+
+def time_scores(delta_seconds: np.ndarray, time_window: float, decay: str = "exponential") -> np.ndarray:
+    """
+    Time correlation scores (0-100) for an array of time deltas
+
+    Vectorized counterpart of CorrelationEngine._calculate_time_correlation.
+    """
+    if decay == "log":
+        return 100.0 / (1.0 + np.log1p(delta_seconds / time_window))
+    return np.exp(-delta_seconds / time_window) * 100
+
+
+_VOLUME_SIMILARITY_MODES = ("ratio", "log_bucket")
+
+# log_bucket mode: byte counts are quantized to quarter-octave buckets, so the
+# similarity of two volumes depends only on their bucket distance d and is
+# read from a table, 100 * 2**(-d/4) (the min/max ratio at bucket resolution)
+_VOLUME_BUCKETS_PER_OCTAVE = 4
+_VOLUME_SIMILARITY_LUT = 100.0 * np.exp2(-np.arange(256) / _VOLUME_BUCKETS_PER_OCTAVE)
+_NO_VOLUME_LUT = np.empty(0)  # score_candidates: "ratio" volume scoring
+
+
+def volume_buckets(volumes: np.ndarray) -> np.ndarray:
+    """
+    Quarter-octave bucket codes (uint8) for byte counts
+
+    0 marks missing volume; a volume v > 0 maps to floor(4 * log2(v)) + 1,
+    capped at 255.
+    """
+    v = np.asarray(volumes, dtype=np.float64)
+    with np.errstate(divide="ignore"):
+        codes = np.floor(np.log2(v) * _VOLUME_BUCKETS_PER_OCTAVE) + 1
+    return np.where(v > 0, np.minimum(codes, 255), 0).astype(np.uint8)
+
+
+def volume_scores(vol_e: np.ndarray, vol_x: np.ndarray, mode: str = "ratio") -> np.ndarray:
+    """
+    Volume similarity scores (0-100) for broadcast-compatible volume columns
+
+    Vectorized counterpart of CorrelationEngine._calculate_volume_similarity.
+    In "ratio" mode the columns are byte counts; in "log_bucket" mode they
+    are volume_buckets codes. Missing volume (0) scores a neutral 50.
+    Scores stay float64 so they match the scalar path at the confidence
+    threshold; log_bucket is the compact (uint8) volume representation.
+    """
+    if mode == "log_bucket":
+        has_vol = (vol_e > 0) & (vol_x > 0)
+        distance = np.abs(vol_e.astype(np.int16) - vol_x.astype(np.int16))
+        return np.where(has_vol, _VOLUME_SIMILARITY_LUT[distance], 50.0)
+
+    # Branchless: min/max on the integer columns (no float copies), and
+    # both volumes are present exactly when the smaller one is
+    low = np.minimum(vol_e, vol_x)
+    high = np.maximum(vol_e, vol_x)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        scores = low / high
+    scores *= 100
+    return np.where(low > 0, scores, 50.0)
+
+
+# window_candidates compares all N x M timestamps directly up to this many pairs
+_DENSE_WINDOW_MAX_CELLS = 2048
+
+
+def window_candidates(ts_e: np.ndarray, ts_x: np.ndarray, window_us: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    (entry, exit) index pairs whose timestamps are at most window_us apart
+
+    Binary-searches each entry's window in the time-sorted exits, so the
+    cost follows the number of in-window pairs rather than N x M. The two
+    searches per entry play the role of a ts // window bucket index
+    (probing an entry's bucket and its neighbours) without building one,
+    and return exact window bounds instead of whole buckets. Pairs
+    come out entry-major with ascending exit indices, the order of
+    np.nonzero over the full (N, M) delta matrix.
+
+    Small inputs take exactly that route: one broadcast comparison is
+    cheaper than the searches and index bookkeeping below.
+    """
+    if len(ts_e) * len(ts_x) <= _DENSE_WINDOW_MAX_CELLS:
+        return np.nonzero(np.abs(ts_x[None, :] - ts_e[:, None]) <= window_us)
+
+    # Exits usually arrive in time order (ObservationStore appends them as
+    # ingested); then the sort and the per-entry reordering are both skipped
+    presorted = bool(np.all(ts_x[:-1] <= ts_x[1:]))
+    order = None if presorted else np.argsort(ts_x, kind="stable")
+    sorted_x = ts_x if presorted else ts_x[order]
+    lo = np.searchsorted(sorted_x, ts_e - window_us, side="left")
+    hi = np.searchsorted(sorted_x, ts_e + window_us, side="right")
+    counts = hi - lo
+
+    rows = np.repeat(np.arange(len(ts_e)), counts)
+    starts = np.cumsum(counts) - counts
+    positions = np.arange(len(rows)) - np.repeat(starts - lo, counts)
+    if presorted:
+        return rows, positions
+
+    # Restore ascending exit order within each entry's run: rows are already
+    # grouped, so one sort of the packed (row, col) keys replaces a lexsort
+    m = len(ts_x)
+    keys = rows.astype(np.int64) * m + order[positions]
+    keys.sort()
+    return np.divmod(keys, m)
+
+
+def top_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """
+    Indices of the k highest scores, highest first
+    
+    Partitions instead of sorting everything, so the cost is O(N + k log k).
+    Ties keep their original order, as a stable descending sort (or
+    heapq.nlargest) would.
+    """
+    n = len(scores)
+    if k <= 0 or n == 0:
+        return np.empty(0, dtype=np.intp)
+    if k < n:
+        kth = np.partition(scores, n - k)[n - k]
+        above = np.flatnonzero(scores > kth)
+        ties = np.flatnonzero(scores == kth)[:k - len(above)]
+        idx = np.sort(np.concatenate((above, ties)))
+    else:
+        idx = np.arange(n)
+    return idx[np.argsort(-scores[idx], kind="stable")]
+
+
+def _score_columns(
+    ts_e: np.ndarray, vol_e: np.ndarray, npk_e: np.ndarray,
+    ts_x: np.ndarray, vol_x: np.ndarray, npk_x: np.ndarray,
+    time_window: float, w_t: float, w_v: float, w_p: float,
+    time_decay: str, volume_mode: str
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Elementwise pair scores over broadcast-compatible entry/exit columns"""
+    delta_us = np.abs(ts_x - ts_e)
+    time_score = time_scores(delta_us / 1e6, time_window, time_decay)
+    volume_score = volume_scores(vol_e, vol_x, volume_mode)
+
+    has_pattern = (npk_e > 0) & (npk_x > 0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pattern_score = np.minimum(npk_e, npk_x) / np.maximum(npk_e, npk_x) * 100
+
+    # Scalar weights times whole columns: stacking the components into an
+    # (N, 3) array for a dot product with a weight vector costs an extra
+    # copy and measured slower; float32 weights would also shift scores
+    norm = w_t + w_v
+    norm_t, norm_v = (w_t / norm, w_v / norm) if norm > 0 else (0.0, 0.0)
+    base = np.where(
+        has_pattern,
+        time_score * w_t + volume_score * w_v + pattern_score * w_p,
+        time_score * norm_t + volume_score * norm_v
+    )
+    return delta_us, base
+
+
+# Packed repetition pattern keys: relay id | observation type code | volume bucket
+_VOLUME_BUCKET_BYTES = 100000
+_TYPE_SHIFT = 40                            # volume bucket index in the low 40 bits
+_MAX_VOLUME_BUCKET = (1 << _TYPE_SHIFT) - 1
+_TYPE_MASK = 0xF
+_RELAY_SHIFT = _TYPE_SHIFT + 4
+_OBS_TYPES = tuple(t.value for t in ObservationType)
+_OBS_TYPE_CODES = {value: code for code, value in enumerate(_OBS_TYPES)}
+_UNKNOWN_OBS_TYPE_CODE = _TYPE_MASK
+ENTRY_TYPE_CODE = _OBS_TYPE_CODES[ObservationType.ENTRY_OBSERVED.value]
+EXIT_TYPE_CODE = _OBS_TYPE_CODES[ObservationType.EXIT_OBSERVED.value]
+
+
+# cluster_session_pairs memoizes results for pair lists of at least this
+# size; smaller lists are cheaper to cluster than to look up
+_CLUSTER_CACHE_MIN_PAIRS = 256
+_CLUSTER_CACHE_SIZE = 8
+
+
+# Scalar scores and explanations depend only on their arguments, so they are
+# cached; repeated observations (and identical gaps) skip the string formatting
+_SCORE_CACHE_SIZE = 4096
+
+
+def _time_score(time_delta: float, time_window: float, decay: str) -> float:
+    """Time correlation score (0-100) alone, without building the explanation"""
+    # Normalize to 0-1 range
+    if decay == "log":
+        # At time_window seconds, score is ~59.1% (1 / (1 + ln 2))
+        normalized = 1.0 / (1.0 + math.log1p(time_delta / time_window))
+    else:
+        # At time_window seconds, score is ~36.8% (1/e)
+        normalized = math.exp(-time_delta / time_window)
+    
+    # Convert to 0-100 scale
+    return normalized * 100
+
+
+@lru_cache(maxsize=_SCORE_CACHE_SIZE)
+def _time_correlation(time_delta: float, time_window: float, decay: str) -> Tuple[float, str]:
+    """Time correlation score and explanation (see CorrelationEngine._calculate_time_correlation)"""
+    score = _time_score(time_delta, time_window, decay)
+    
+    # Generate plain English explanation
+    if time_delta < 1.0:
+        explanation = f"Entry and exit observations are nearly simultaneous ({time_delta:.2f} seconds apart). This is highly indicative of the same TOR session. Time correlation score: {score:.1f}%."
+    elif time_delta < 30:
+        explanation = f"Observations are {time_delta:.1f} seconds apart, which is very close. TOR circuits typically add only 1-2 seconds of latency. Time correlation score: {score:.1f}%."
+    elif time_delta < 120:
+        explanation = f"Observations are {time_delta:.1f} seconds apart. This is within typical TOR latency variance. Time correlation score: {score:.1f}%."
+    elif time_delta < time_window:
+        explanation = f"Observations are {time_delta:.1f} seconds apart. Still within the correlation window ({time_window}s), but confidence decreases with larger gaps. Time correlation score: {score:.1f}%."
+    else:
+        explanation = f"Observations are {time_delta:.1f} seconds apart, exceeding the correlation window ({time_window}s). Low confidence in temporal correlation. Time correlation score: {score:.1f}%."
+    
+    return score, explanation
+
+
+def _volume_score(entry_bytes: Optional[int], exit_bytes: Optional[int], mode: str = "ratio") -> float:
+    """Volume similarity score (0-100) alone, without building the explanation"""
+    if not entry_bytes or not exit_bytes:
+        return 50.0
+    
+    max_bytes = max(entry_bytes, exit_bytes)
+    if max_bytes == 0:
+        return 0.0
+    
+    if mode == "log_bucket":
+        # Table lookup on the quarter-octave bucket distance
+        entry_bucket, exit_bucket = volume_buckets(np.array([entry_bytes, exit_bytes]))
+        return float(_VOLUME_SIMILARITY_LUT[abs(int(entry_bucket) - int(exit_bucket))])
+    
+    # Similarity ratio
+    return (min(entry_bytes, exit_bytes) / max_bytes) * 100
+
+
+@lru_cache(maxsize=_SCORE_CACHE_SIZE)
+def _volume_similarity(
+    entry_bytes: Optional[int],
+    exit_bytes: Optional[int],
+    mode: str = "ratio"
+) -> Tuple[float, str, int]:
+    """
+    Volume similarity score and explanation (see CorrelationEngine._calculate_volume_similarity)
+    
+    Returns:
+        Tuple of (score, plain_english_explanation, log_level)
+    """
+    if not entry_bytes or not exit_bytes:
+        explanation = "Volume data is unavailable for one or both observations. Using neutral score of 50%. Cannot make volume-based assessment."
+        return 50.0, explanation, logging.INFO
+    
+    # Calculate relative difference
+    if entry_bytes == 0 and exit_bytes == 0:
+        explanation = "Both observations show zero bytes transferred. Perfect volume match. Score: 100%."
+        return 100.0, explanation, logging.INFO
+    
+    max_bytes = max(entry_bytes, exit_bytes)
+    min_bytes = min(entry_bytes, exit_bytes)
+    
+    if max_bytes == 0:
+        explanation = "Invalid volume data (max is zero). Cannot calculate similarity. Score: 0%."
+        return 0.0, explanation, logging.WARNING
+    
+    similarity = _volume_score(entry_bytes, exit_bytes, mode)
+    if mode == "log_bucket":
+        diff_percent = 100.0 - similarity
+    else:
+        # Calculate percentage difference
+        diff_percent = ((max_bytes - min_bytes) / max_bytes) * 100
+    
+    # Generate explanation
+    entry_mb = entry_bytes / 1_000_000
+    exit_mb = exit_bytes / 1_000_000
+    
+    if similarity >= 95:
+        explanation = f"Entry traffic: {entry_mb:.2f}MB, Exit traffic: {exit_mb:.2f}MB. Volumes are nearly identical (difference: {diff_percent:.1f}%). This strongly suggests the same data passing through TOR. Volume similarity: {similarity:.1f}%."
+    elif similarity >= 85:
+        explanation = f"Entry traffic: {entry_mb:.2f}MB, Exit traffic: {exit_mb:.2f}MB. Volumes are very similar (difference: {diff_percent:.1f}%). The ~3-5% variance is consistent with TOR protocol overhead. Volume similarity: {similarity:.1f}%."
+    elif similarity >= 70:
+        explanation = f"Entry traffic: {entry_mb:.2f}MB, Exit traffic: {exit_mb:.2f}MB. Volumes are reasonably similar (difference: {diff_percent:.1f}%). Could be the same session with some buffering variance. Volume similarity: {similarity:.1f}%."
+    elif similarity >= 50:
+        explanation = f"Entry traffic: {entry_mb:.2f}MB, Exit traffic: {exit_mb:.2f}MB. Moderate volume difference (difference: {diff_percent:.1f}%). May indicate different sessions or significant protocol overhead. Volume similarity: {similarity:.1f}%."
+    else:
+        explanation = f"Entry traffic: {entry_mb:.2f}MB, Exit traffic: {exit_mb:.2f}MB. Large volume difference (difference: {diff_percent:.1f}%). Unlikely to be the same session. Volume similarity: {similarity:.1f}%."
+    
+    return similarity, explanation, logging.INFO
+
+
+def _pattern_similarity(entry_packets: int, exit_packets: int) -> Optional[float]:
+    """Timing pattern similarity score (see CorrelationEngine._calculate_pattern_similarity)"""
+    if not entry_packets or not exit_packets:
+        return None
+    return (min(entry_packets, exit_packets) / max(entry_packets, exit_packets)) * 100
+
+
+_PATTERN_SIMILARITY_MODES = ("length", "correlation")
+_MIN_TIMINGS_FOR_CORRELATION = 3
+
+
+def timing_correlation(entry_timings: List[float], exit_timings: List[float]) -> Optional[float]:
+    """
+    Similarity (0-100) of two inter-packet timing series by Pearson correlation
+
+    The shorter series is linearly resampled to the length of the longer
+    one; negative correlation scores 0. Returns None where correlation is
+    undefined: fewer than 3 samples on either side, or a constant series.
+    """
+    if min(len(entry_timings), len(exit_timings)) < _MIN_TIMINGS_FOR_CORRELATION:
+        return None
+
+    n = max(len(entry_timings), len(exit_timings))
+    grid = np.linspace(0.0, 1.0, n)
+
+    def resample(timings: List[float]) -> np.ndarray:
+        values = np.asarray(timings, dtype=np.float64)
+        if len(values) == n:
+            return values
+        return np.interp(grid, np.linspace(0.0, 1.0, len(values)), values)
+
+    a, b = resample(entry_timings), resample(exit_timings)
+    if a.std() == 0 or b.std() == 0:
+        return None
+    return max(float(np.corrcoef(a, b)[0, 1]), 0.0) * 100
+
 
 class CorrelationEngine:
     """
@@ -44,36 +474,101 @@ class CorrelationEngine:
     
     def __init__(self, topology: Optional[TopologySnapshot] = None, weight_profile: Optional[WeightProfile] = None):
         self.topology = topology
-        self.graph_analyzer = TORGraphAnalyzer(topology) if topology else None
         
         # Correlation parameters from config
         self.time_window = settings.TIME_CORRELATION_WINDOW
+        self.time_decay = settings.TIME_DECAY_FUNCTION
+        if self.time_decay not in _TIME_DECAY_FUNCTIONS:
+            raise ValueError(
+                f"Unknown TIME_DECAY_FUNCTION '{self.time_decay}', "
+                f"expected one of {_TIME_DECAY_FUNCTIONS}"
+            )
+        self.volume_mode = settings.VOLUME_SIMILARITY_MODE
+        if self.volume_mode not in _VOLUME_SIMILARITY_MODES:
+            raise ValueError(
+                f"Unknown VOLUME_SIMILARITY_MODE '{self.volume_mode}', "
+                f"expected one of {_VOLUME_SIMILARITY_MODES}"
+            )
+        self.pattern_mode = settings.PATTERN_SIMILARITY_MODE
+        if self.pattern_mode not in _PATTERN_SIMILARITY_MODES:
+            raise ValueError(
+                f"Unknown PATTERN_SIMILARITY_MODE '{self.pattern_mode}', "
+                f"expected one of {_PATTERN_SIMILARITY_MODES}"
+            )
         self.min_confidence = settings.MIN_CONFIDENCE_THRESHOLD
         
         # Weight profile for this investigation
         self.weight_profile = weight_profile or get_profile(ProfileType.STANDARD)
         self.weight_profile.validate_weights_sum()  # Ensure weights are valid
         
-        # Repeated observation tracking
-        self.observation_history: Dict[str, List[TrafficObservation]] = defaultdict(list)
-        self.pattern_frequency: Dict[str, int] = defaultdict(int)
+        self.reset_repetition_state()
+        
+        # Clusters of recent large pair lists (see cluster_session_pairs)
+        self._cluster_cache: "OrderedDict[tuple, List[CorrelationCluster]]" = OrderedDict()
         
         logger.info(f"Correlation Engine initialized with weight profile: {self.weight_profile.profile_name}")
         logger.info(f"Weights - Time: {self.weight_profile.weight_time_correlation:.2f}, "
                    f"Volume: {self.weight_profile.weight_volume_similarity:.2f}, "
                    f"Pattern: {self.weight_profile.weight_pattern_similarity:.2f}")
     
+    @property
+    def topology(self) -> Optional[TopologySnapshot]:
+        """Topology snapshot; assigning one also switches graph_analyzer to it"""
+        return self._topology
+    
+    @topology.setter
+    def topology(self, topology: Optional[TopologySnapshot]) -> None:
+        self._topology = topology
+        # Guard probabilities are precomputed per analyzer, so a new snapshot
+        # must not keep scoring against the old one's
+        self.graph_analyzer = TORGraphAnalyzer.for_snapshot(topology) if topology else None
+    
+    @property
+    def weight_profile(self) -> WeightProfile:
+        """Active weight profile; assigning one also snapshots its weights for scoring"""
+        return self._weight_profile
+    
+    @weight_profile.setter
+    def weight_profile(self, profile: WeightProfile) -> None:
+        self._weight_profile = profile
+        self._weights = profile.weights
+        # Time/volume weights renormalised for pairs without timing patterns;
+        # a pattern-only profile gives such pairs nothing to score on
+        total_weight = profile.weight_time_correlation + profile.weight_volume_similarity
+        if total_weight > 0:
+            self._norm_weights = (
+                profile.weight_time_correlation / total_weight,
+                profile.weight_volume_similarity / total_weight,
+            )
+        else:
+            self._norm_weights = (0.0, 0.0)
+    
     def correlate_observations(
         self,
-        entry_observations: List[TrafficObservation],
-        exit_observations: List[TrafficObservation]
+        entry_observations: ObservationsLike,
+        exit_observations: ObservationsLike,
+        entry_arrays: Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]] = None,
+        exit_arrays: Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]] = None,
+        with_reasoning: bool = True
     ) -> List[SessionPair]:
         """
         Correlate entry and exit observations to identify potential session pairs
         
+        Only entry/exit pairs within time_window of each other are scored
+        (see window_candidates), so the work grows with the number of
+        in-window pairs rather than with N x M.
+        
         Args:
-            entry_observations: List of entry point observations
-            exit_observations: List of exit point observations
+            entry_observations: Entry point observations, as a list or a
+                TrafficObservationBatch
+            exit_observations: Exit point observations, as a list or a
+                TrafficObservationBatch sharing the entry batch's epoch
+            entry_arrays: Optional precomputed (timestamps_us, bytes, packet_counts)
+                columns for entry_observations, e.g. from ObservationStore
+            exit_arrays: Same for exit_observations; must share the time base
+                of entry_arrays
+            with_reasoning: Build the plain English reasoning for each pair;
+                callers that only need scores can turn it off
         
         Returns:
             List of SessionPair objects with correlation scores
@@ -81,29 +576,279 @@ class CorrelationEngine:
         logger.info(f"Correlating {len(entry_observations)} entry observations "
                    f"with {len(exit_observations)} exit observations")
         
-        session_pairs = []
-        
-        for entry_obs in entry_observations:
-            for exit_obs in exit_observations:
-                # Check if observations fall within time window
-                time_delta = abs((exit_obs.timestamp - entry_obs.timestamp).total_seconds())
-                
-                if time_delta <= self.time_window:
-                    # Create session pair
-                    pair = self._create_session_pair(entry_obs, exit_obs, time_delta)
-                    
-                    # Only include if meets minimum confidence
-                    if pair.correlation_strength >= self.min_confidence:
-                        session_pairs.append(pair)
+        session_pairs = list(self.iter_correlate_observations(
+            entry_observations, exit_observations, entry_arrays, exit_arrays, with_reasoning
+        ))
         
         logger.info(f"Found {len(session_pairs)} potential session pairs")
         return session_pairs
     
+    def iter_correlate_observations(
+        self,
+        entry_observations: ObservationsLike,
+        exit_observations: ObservationsLike,
+        entry_arrays: Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]] = None,
+        exit_arrays: Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]] = None,
+        with_reasoning: bool = True
+    ) -> Iterator[SessionPair]:
+        """
+        Yield session pairs as they are scored (see correlate_observations)
+        
+        The vectorized pre-scoring runs on the first next(); pairs then
+        come out one by one in the same order correlate_observations
+        returns them. Repetition history for the whole run is normally
+        recorded on the first next() as well (see _record_repetitions); when
+        it has to be counted pair by pair it is updated as the generator
+        advances, so a partially consumed generator leaves it partially
+        updated.
+        """
+        if not len(entry_observations) or not len(exit_observations):
+            return
+        
+        epoch = None
+        if isinstance(entry_observations, TrafficObservationBatch):
+            epoch = entry_observations.epoch
+            entry_arrays = entry_observations.arrays
+            entry_observations = entry_observations.observations
+        if isinstance(exit_observations, TrafficObservationBatch):
+            epoch = exit_observations.epoch
+            exit_arrays = exit_observations.arrays
+            exit_observations = exit_observations.observations
+        
+        # Convert only the side(s) that came without columns, on the time
+        # base of the side that has them
+        if entry_arrays is None or exit_arrays is None:
+            if entry_arrays is None and exit_arrays is None:
+                epoch = entry_observations[0].timestamp
+            elif epoch is None:
+                entry_arrays = exit_arrays = None  # Loose arrays: time base unknown
+                epoch = entry_observations[0].timestamp
+            if entry_arrays is None:
+                entry_arrays = _obs_columns(entry_observations, epoch)
+            if exit_arrays is None:
+                exit_arrays = _obs_columns(exit_observations, epoch)
+        
+        # Repetition pattern keys, once per observation instead of once per
+        # candidate pair it takes part in
+        entry_keys = exit_keys = None
+        if settings.ENABLE_REPETITION_WEIGHTING:
+            entry_keys = self._pattern_keys(entry_observations, entry_arrays[1])
+            exit_keys = self._pattern_keys(exit_observations, exit_arrays[1])
+        
+        # Guard selection probability of each entry's relay, looked up once
+        # per entry instead of once per scored pair
+        guard_probabilities = None
+        if self.graph_analyzer:
+            guard_probabilities = self.graph_analyzer.estimate_guard_selection_probabilities(
+                [obs.relay_fingerprint for obs in entry_observations]
+            ).tolist()
+        
+        rows, cols, delta_us, base = self._score_window(entry_arrays, exit_arrays)
+        
+        # Highest score repetition weighting could lift each pair to; pairs that
+        # cannot reach min_confidence even then skip the full explainable scoring
+        if settings.ENABLE_REPETITION_WEIGHTING:
+            best_case = np.minimum(base * (1.0 + (settings.MAX_REPETITION_BOOST - 1.0) * 0.5), 100.0)
+        else:
+            best_case = base
+        viable = best_case >= self.min_confidence - 1e-6
+        
+        # Repetition weights of all candidates at once, when that is exact
+        # (see _record_repetitions); otherwise they are counted pair by pair
+        repetition = None
+        if entry_keys is not None:
+            repetition = self._record_repetitions(
+                rows, cols, entry_observations, exit_observations, entry_keys, exit_keys
+            )
+        if entry_keys is None or repetition is not None:
+            # Nothing left to count pair by pair, so candidates that cannot
+            # reach min_confidence are dropped here rather than in the loop
+            keep = np.flatnonzero(viable)
+            rows, cols, viable, delta_us, base = (
+                rows[keep], cols[keep], viable[keep], delta_us[keep], base[keep]
+            )
+        if repetition is not None:
+            repetition = zip(repetition[0][keep].tolist(), repetition[1][keep].tolist())
+        else:
+            repetition = itertools.repeat(None)
+        
+        # Candidates are entry-major, the same order as a nested loop, which
+        # keeps the stateful repetition counts order-identical. Per-pair values
+        # are gathered into Python lists in one go so the loop below does no
+        # NumPy scalar indexing.
+        candidates = zip(
+            rows.tolist(), cols.tolist(), viable.tolist(), delta_us.tolist(), base.tolist(), repetition
+        )
+        for i, j, is_viable, pair_delta_us, pair_base, repetition_weights in candidates:
+            entry_obs = entry_observations[i]
+            exit_obs = exit_observations[j]
+            
+            # Every candidate counts towards repetition history, viable or not
+            if repetition_weights is None and entry_keys is not None:
+                repetition_weights = (
+                    self._calculate_repetition_weight(entry_obs, entry_keys[i]),
+                    self._calculate_repetition_weight(exit_obs, exit_keys[j])
+                )
+            
+            if not is_viable:
+                continue
+            if repetition_weights is not None:
+                # With the actual boost known, pairs it leaves short of
+                # min_confidence are dropped before any explanation is built
+                boost = (repetition_weights[0] + repetition_weights[1]) / 2.0
+                if min(pair_base * (1.0 + (boost - 1.0) * 0.5), 100.0) < self.min_confidence - 1e-6:
+                    continue
+            
+            time_delta = pair_delta_us / 1_000_000
+            guard_probability = guard_probabilities[i] if guard_probabilities is not None else None
+            pair = self._create_session_pair(
+                entry_obs, exit_obs, time_delta, with_reasoning, repetition_weights, guard_probability
+            )
+            
+            # Only include if meets minimum confidence
+            if pair.correlation_strength >= self.min_confidence:
+                yield pair
+        
+    def score_arrays(
+        self,
+        entry_arrays: Tuple[np.ndarray, np.ndarray, np.ndarray],
+        exit_arrays: Tuple[np.ndarray, np.ndarray, np.ndarray]
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Score entry/exit observation columns without the observation models
+        
+        The vectorized pass of correlate_observations on its own: in-window
+        candidates get the weighted time/volume/pattern score of the active
+        profile, and those below min_confidence are dropped. Repetition
+        weighting and guard confidence need the observations themselves and
+        are not applied (nor is repetition history updated). In "correlation"
+        pattern mode the pattern score is its upper bound, as in pre-scoring.
+        
+        Args:
+            entry_arrays: (timestamps_us, bytes, packet_counts) of the entries
+            exit_arrays: Same for the exits, on the same time base
+        
+        Returns:
+            Tuple of (entry_rows, exit_rows, time_delta_seconds, base_correlation)
+        """
+        rows, cols, delta_us, base = self._score_window(entry_arrays, exit_arrays)
+        keep = base >= self.min_confidence
+        return rows[keep], cols[keep], delta_us[keep] / 1_000_000, base[keep]
+    
+    def _score_window(
+        self,
+        entry_arrays: Tuple[np.ndarray, np.ndarray, np.ndarray],
+        exit_arrays: Tuple[np.ndarray, np.ndarray, np.ndarray]
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """(rows, cols, delta_us, base) of every in-window entry/exit candidate"""
+        ts_e, vol_e, npk_e = entry_arrays
+        ts_x, vol_x, npk_x = exit_arrays
+        
+        # Only pairs inside the time window are scored; deltas are integral
+        # microseconds, so flooring the window keeps the <= comparison exact
+        rows, cols = window_candidates(ts_e, ts_x, int(self.time_window * 1_000_000))
+        
+        if self.volume_mode == "log_bucket":
+            vol_e, vol_x = volume_buckets(vol_e), volume_buckets(vol_x)
+        if self.pattern_mode == "correlation":
+            # Timing correlation is only computed per pair; pre-score with its
+            # upper bound (equal packet counts score 100) so that the viability
+            # checks of iter_correlate_observations never drop a pair it could lift
+            npk_e, npk_x = (npk_e > 0).astype(np.int64), (npk_x > 0).astype(np.int64)
+        
+        weights = self._weights
+        if score_candidates is not None:
+            # Compiled kernel: one pass over the candidates, no gathered copies
+            delta_us, base = score_candidates(
+                rows, cols, ts_e, vol_e, npk_e, ts_x, vol_x, npk_x,
+                float(self.time_window), *map(float, weights),
+                self.time_decay == "log",
+                _VOLUME_SIMILARITY_LUT if self.volume_mode == "log_bucket" else _NO_VOLUME_LUT
+            )
+        else:
+            delta_us, base = _score_columns(
+                ts_e[rows], vol_e[rows], npk_e[rows],
+                ts_x[cols], vol_x[cols], npk_x[cols],
+                self.time_window, *weights,
+                self.time_decay,
+                self.volume_mode
+            )
+        return rows, cols, delta_us, base
+    
+    def reset_repetition_state(self) -> None:
+        """
+        Forget repetition history and the observations seen by add_observations
+        
+        Topology-derived state (graph analyzer) is kept, so this is the cheap
+        way to start a new analysis on the same topology.
+        """
+        # Repeated observation tracking, keyed by packed pattern keys
+        # (see _create_pattern_key); relay fingerprints get small integer ids.
+        # pattern_frequency is kept in least-recently-seen order and capped at
+        # PATTERN_CACHE_MAX patterns, and each relay's observation_history
+        # keeps its OBSERVATION_HISTORY_MAX latest sightings, so long-running
+        # services stay bounded
+        self.observation_history: Dict[str, Deque[TrafficObservation]] = defaultdict(
+            partial(deque, maxlen=settings.OBSERVATION_HISTORY_MAX)
+        )
+        self.pattern_frequency: Dict[int, int] = OrderedDict()
+        self._relay_ids: Dict[str, int] = {}
+        
+        # get_repetition_statistics pattern figures by top_n, kept until
+        # pattern_frequency next changes
+        self._pattern_statistics: Dict[int, Dict[str, Any]] = {}
+        self._relay_fingerprints: List[str] = []
+        
+        # Observations already correlated through add_observations, kept with
+        # their columns so earlier arrivals are not converted again
+        self._stream_epoch: Optional[datetime] = None
+        self._stream_entries = TrafficObservationBatch.from_observations([])
+        self._stream_exits = TrafficObservationBatch.from_observations([])
+    
+    def add_observations(
+        self,
+        entry_observations: List[TrafficObservation],
+        exit_observations: List[TrafficObservation]
+    ) -> List[SessionPair]:
+        """
+        Correlate newly arrived observations against everything seen so far
+        
+        Only pairs involving at least one new observation are scored, so
+        feeding a stream through this method scores every pair exactly once
+        instead of re-correlating the whole history on each arrival.
+        Repetition weighting sees each pair once, as in a single
+        correlate_observations call over the full history.
+        
+        Args:
+            entry_observations: New entry point observations
+            exit_observations: New exit point observations
+        
+        Returns:
+            Session pairs involving the new observations
+        """
+        if self._stream_epoch is None:
+            first = next(iter(entry_observations or exit_observations), None)
+            self._stream_epoch = first.timestamp if first is not None else None
+        new_entries = TrafficObservationBatch.from_observations(entry_observations, self._stream_epoch)
+        new_exits = TrafficObservationBatch.from_observations(exit_observations, self._stream_epoch)
+        all_exits = self._stream_exits.concat(new_exits)
+        
+        # New entries against every exit, then earlier entries against new exits
+        session_pairs = self.correlate_observations(new_entries, all_exits)
+        session_pairs.extend(self.correlate_observations(self._stream_entries, new_exits))
+        
+        self._stream_entries = self._stream_entries.concat(new_entries)
+        self._stream_exits = all_exits
+        return session_pairs
+    
     def _create_session_pair(
         self,
         entry_obs: TrafficObservation,
         exit_obs: TrafficObservation,
-        time_delta: float
+        time_delta: float,
+        with_reasoning: bool = True,
+        repetition_weights: Optional[Tuple[float, float]] = None,
+        guard_probability: Optional[float] = None
     ) -> SessionPair:
         """
         Create a session pair with correlation scores
@@ -114,9 +859,22 @@ class CorrelationEngine:
         3. Pattern similarity (similar timing patterns = higher score)
         
         All calculations include plain English explanations for auditability.
+        With with_reasoning=False the scores are identical, but the
+        reasoning text and per-pair log messages are skipped: reasoning is
+        empty and score_breakdown holds numbers only.
+        
+        repetition_weights are the observations' (entry, exit) repetition
+        weights, if the caller has already recorded them (see
+        _record_repetitions); guard_probability likewise is the entry
+        relay's precomputed guard selection probability.
         """
         pair_id = f"pair-{entry_obs.observation_id}-{exit_obs.observation_id}"
         
+        if not with_reasoning:
+            return self._create_unexplained_session_pair(
+                pair_id, entry_obs, exit_obs, time_delta, repetition_weights, guard_probability
+            )
+        
         # Track all reasoning steps
         reasoning = []
         reasoning.append(f"Analyzing correlation between entry observation '{entry_obs.observation_id}' and exit observation '{exit_obs.observation_id}'.")
@@ -135,9 +893,9 @@ class CorrelationEngine:
             reasoning.append(pattern_explanation)
         
         # Use weights from profile (configurable per investigation)
-        time_weight = self.weight_profile.weight_time_correlation
-        volume_weight = self.weight_profile.weight_volume_similarity
-        pattern_weight = self.weight_profile.weight_pattern_similarity if pattern_score is not None else 0.0
+        time_weight, volume_weight, pattern_weight = self._weights
+        if pattern_score is None:
+            pattern_weight = 0.0
         
         # Calculate composite correlation score using profile weights
         if pattern_score is not None:
@@ -156,9 +914,7 @@ class CorrelationEngine:
             )
         else:
             # Only time and volume available, renormalize weights
-            total_weight = time_weight + volume_weight
-            norm_time_weight = time_weight / total_weight
-            norm_volume_weight = volume_weight / total_weight
+            norm_time_weight, norm_volume_weight = self._norm_weights
             
             base_correlation = (
                 time_score * norm_time_weight +
@@ -171,20 +927,21 @@ class CorrelationEngine:
                 f"Base correlation: {base_correlation:.1f}%."
             )
         reasoning.append(composite_explanation)
-        logger.info(f"Composite Score Calculation: {composite_explanation}")
+        logger.info("Composite Score Calculation: %s", composite_explanation)
         
         # Apply repetition weighting to boost repeated patterns
         correlation_strength, repetition_boost = self._apply_repetition_weighting(
             base_correlation,
             entry_obs,
-            exit_obs
+            exit_obs,
+            repetition_weights
         )
         
         # Log boost if significant
         if repetition_boost > 1.1:
             boost_explanation = f"Repetition boost applied: This pattern has been observed multiple times before. Increasing confidence from {base_correlation:.1f}% to {correlation_strength:.1f}% (boost factor: {repetition_boost:.2f}x). Repeated patterns are statistically more significant."
             reasoning.append(boost_explanation)
-            logger.info(f"Repetition Boost: {boost_explanation}")
+            logger.info("Repetition Boost: %s", boost_explanation)
         elif settings.ENABLE_REPETITION_WEIGHTING:
             reasoning.append(f"No repetition boost applied (pattern seen for first time or below threshold). Final correlation: {correlation_strength:.1f}%.")
         
@@ -194,17 +951,19 @@ class CorrelationEngine:
         
         if entry_obs.relay_fingerprint:
             hypothesized_guard = entry_obs.relay_fingerprint
+            if self.graph_analyzer and guard_probability is None:
+                guard_probability = self.graph_analyzer.estimate_guard_selection_probability(entry_obs.relay_fingerprint)
             guard_confidence = self._calculate_guard_confidence(
                 entry_obs.relay_fingerprint,
-                correlation_strength
+                correlation_strength,
+                guard_probability
             )
             
             guard_explanation = f"Entry observation shows traffic at relay {entry_obs.relay_fingerprint[:16]}... Hypothesizing this as the guard node. Guard confidence: {guard_confidence:.1f}%."
             if self.graph_analyzer:
-                guard_prob = self.graph_analyzer.estimate_guard_selection_probability(entry_obs.relay_fingerprint)
-                guard_explanation += f" This relay has {guard_prob:.2f}% probability of being selected as a guard based on network consensus weight."
+                guard_explanation += f" This relay has {guard_probability:.2f}% probability of being selected as a guard based on network consensus weight."
             reasoning.append(guard_explanation)
-            logger.info(f"Guard Hypothesis: {guard_explanation}")
+            logger.info("Guard Hypothesis: %s", guard_explanation)
         else:
             reasoning.append("No relay fingerprint available for guard hypothesis.")
         
@@ -244,7 +1003,7 @@ class CorrelationEngine:
             final_summary = f"LOW CONFIDENCE ({correlation_strength:.1f}%): Weak correlation. May be coincidental or different sessions."
         
         reasoning.append(final_summary)
-        logger.info(f"Final Assessment: {final_summary}")
+        logger.info("Final Assessment: %s", final_summary)
         
         pair = SessionPair(
             pair_id=pair_id,
@@ -263,36 +1022,104 @@ class CorrelationEngine:
         
         return pair
     
+    def _create_unexplained_session_pair(
+        self,
+        pair_id: str,
+        entry_obs: TrafficObservation,
+        exit_obs: TrafficObservation,
+        time_delta: float,
+        repetition_weights: Optional[Tuple[float, float]] = None,
+        guard_probability: Optional[float] = None
+    ) -> SessionPair:
+        """Scores-only counterpart of _create_session_pair (same numbers, no text)"""
+        time_score = _time_score(time_delta, self.time_window, self.time_decay)
+        volume_score = _volume_score(entry_obs.bytes_transferred, exit_obs.bytes_transferred, self.volume_mode)
+        pattern_score = _pattern_similarity(
+            len(entry_obs.inter_packet_timings or ()), len(exit_obs.inter_packet_timings or ())
+        )
+        if pattern_score is not None and self.pattern_mode == "correlation":
+            correlation = timing_correlation(entry_obs.inter_packet_timings, exit_obs.inter_packet_timings)
+            if correlation is not None:
+                pattern_score = correlation
+        
+        time_weight, volume_weight, pattern_weight = self._weights
+        if pattern_score is not None:
+            base_correlation = (
+                time_score * time_weight +
+                volume_score * volume_weight +
+                pattern_score * pattern_weight
+            )
+        else:
+            norm_time_weight, norm_volume_weight = self._norm_weights
+            base_correlation = (
+                time_score * norm_time_weight +
+                volume_score * norm_volume_weight
+            )
+        
+        correlation_strength, repetition_boost = self._apply_repetition_weighting(
+            base_correlation,
+            entry_obs,
+            exit_obs,
+            repetition_weights
+        )
+        
+        guard_confidence = 0.0
+        if entry_obs.relay_fingerprint:
+            guard_confidence = self._calculate_guard_confidence(
+                entry_obs.relay_fingerprint,
+                correlation_strength,
+                guard_probability
+            )
+        
+        score_breakdown = {
+            "time_correlation": {
+                "score": time_score,
+                "weight": time_weight,
+                "contribution": time_score * time_weight
+            },
+            "volume_similarity": {
+                "score": volume_score,
+                "weight": volume_weight,
+                "contribution": volume_score * volume_weight
+            },
+            "base_correlation": base_correlation,
+            "repetition_boost": repetition_boost,
+            "final_correlation": correlation_strength
+        }
+        if pattern_score is not None:
+            score_breakdown["pattern_similarity"] = {
+                "score": pattern_score,
+                "weight": pattern_weight,
+                "contribution": pattern_score * pattern_weight
+            }
+        
+        return SessionPair(
+            pair_id=pair_id,
+            entry_observation_id=entry_obs.observation_id,
+            exit_observation_id=exit_obs.observation_id,
+            time_delta=time_delta,
+            time_correlation_score=time_score,
+            pattern_similarity=pattern_score,
+            volume_similarity=volume_score,
+            hypothesized_guard=entry_obs.relay_fingerprint or None,
+            guard_confidence=guard_confidence,
+            correlation_strength=correlation_strength,
+            score_breakdown=score_breakdown
+        )
+    
     def _calculate_time_correlation(self, time_delta: float) -> tuple[float, str]:
         """
         Calculate time correlation score (0-100)
         
-        Uses exponential decay: perfect match at 0 seconds,
-        decreases as time delta increases
+        Uses exponential decay by default (or log decay, see
+        TIME_DECAY_FUNCTION): perfect match at 0 seconds, decreases as
+        time delta increases
         
         Returns:
             Tuple of (score, plain_english_explanation)
         """
-        # Normalize to 0-1 range using exponential decay
-        # At time_window seconds, score is ~36.8% (1/e)
-        normalized = math.exp(-time_delta / self.time_window)
-        
-        # Convert to 0-100 scale
-        score = normalized * 100
-        
-        # Generate plain English explanation
-        if time_delta < 1.0:
-            explanation = f"Entry and exit observations are nearly simultaneous ({time_delta:.2f} seconds apart). This is highly indicative of the same TOR session. Time correlation score: {score:.1f}%."
-        elif time_delta < 30:
-            explanation = f"Observations are {time_delta:.1f} seconds apart, which is very close. TOR circuits typically add only 1-2 seconds of latency. Time correlation score: {score:.1f}%."
-        elif time_delta < 120:
-            explanation = f"Observations are {time_delta:.1f} seconds apart. This is within typical TOR latency variance. Time correlation score: {score:.1f}%."
-        elif time_delta < self.time_window:
-            explanation = f"Observations are {time_delta:.1f} seconds apart. Still within the correlation window ({self.time_window}s), but confidence decreases with larger gaps. Time correlation score: {score:.1f}%."
-        else:
-            explanation = f"Observations are {time_delta:.1f} seconds apart, exceeding the correlation window ({self.time_window}s). Low confidence in temporal correlation. Time correlation score: {score:.1f}%."
-        
-        logger.info(f"Time Correlation Analysis: {explanation}")
+        score, explanation = _time_correlation(time_delta, self.time_window, self.time_decay)
+        logger.info("Time Correlation Analysis: %s", explanation)
         
         return score, explanation
     
@@ -305,57 +1132,19 @@ class CorrelationEngine:
         Calculate volume similarity score (0-100)
         
         Compares bytes transferred in both observations
-        TOR adds some overhead, so we allow for differences
+        TOR adds some overhead, so we allow for differences. Uses the exact
+        min/max ratio by default, or quarter-octave buckets (see
+        VOLUME_SIMILARITY_MODE).
         
         Returns:
             Tuple of (score, plain_english_explanation)
         """
-        if not entry_obs.bytes_transferred or not exit_obs.bytes_transferred:
-            explanation = "Volume data is unavailable for one or both observations. Using neutral score of 50%. Cannot make volume-based assessment."
-            logger.info(f"Volume Similarity Analysis: {explanation}")
-            return 50.0, explanation
-        
-        entry_bytes = entry_obs.bytes_transferred
-        exit_bytes = exit_obs.bytes_transferred
-        
-        # Calculate relative difference
-        if entry_bytes == 0 and exit_bytes == 0:
-            explanation = "Both observations show zero bytes transferred. Perfect volume match. Score: 100%."
-            logger.info(f"Volume Similarity Analysis: {explanation}")
-            return 100.0, explanation
-        
-        max_bytes = max(entry_bytes, exit_bytes)
-        min_bytes = min(entry_bytes, exit_bytes)
-        
-        if max_bytes == 0:
-            explanation = "Invalid volume data (max is zero). Cannot calculate similarity. Score: 0%."
-            logger.warning(f"Volume Similarity Analysis: {explanation}")
-            return 0.0, explanation
-        
-        # Similarity ratio
-        similarity = (min_bytes / max_bytes) * 100
-        
-        # Calculate percentage difference
-        diff_percent = ((max_bytes - min_bytes) / max_bytes) * 100
-        
-        # Generate explanation
-        entry_mb = entry_bytes / 1_000_000
-        exit_mb = exit_bytes / 1_000_000
-        
-        if similarity >= 95:
-            explanation = f"Entry traffic: {entry_mb:.2f}MB, Exit traffic: {exit_mb:.2f}MB. Volumes are nearly identical (difference: {diff_percent:.1f}%). This strongly suggests the same data passing through TOR. Volume similarity: {similarity:.1f}%."
-        elif similarity >= 85:
-            explanation = f"Entry traffic: {entry_mb:.2f}MB, Exit traffic: {exit_mb:.2f}MB. Volumes are very similar (difference: {diff_percent:.1f}%). The ~3-5% variance is consistent with TOR protocol overhead. Volume similarity: {similarity:.1f}%."
-        elif similarity >= 70:
-            explanation = f"Entry traffic: {entry_mb:.2f}MB, Exit traffic: {exit_mb:.2f}MB. Volumes are reasonably similar (difference: {diff_percent:.1f}%). Could be the same session with some buffering variance. Volume similarity: {similarity:.1f}%."
-        elif similarity >= 50:
-            explanation = f"Entry traffic: {entry_mb:.2f}MB, Exit traffic: {exit_mb:.2f}MB. Moderate volume difference (difference: {diff_percent:.1f}%). May indicate different sessions or significant protocol overhead. Volume similarity: {similarity:.1f}%."
-        else:
-            explanation = f"Entry traffic: {entry_mb:.2f}MB, Exit traffic: {exit_mb:.2f}MB. Large volume difference (difference: {diff_percent:.1f}%). Unlikely to be the same session. Volume similarity: {similarity:.1f}%."
-        
-        logger.info(f"Volume Similarity Analysis: {explanation}")
+        score, explanation, level = _volume_similarity(
+            entry_obs.bytes_transferred, exit_obs.bytes_transferred, self.volume_mode
+        )
+        logger.log(level, "Volume Similarity Analysis: %s", explanation)
         
-        return similarity, explanation
+        return score, explanation
     
     def _calculate_pattern_similarity(
         self,
@@ -365,15 +1154,17 @@ class CorrelationEngine:
         """
         Calculate timing pattern similarity (0-100)
         
-        Compares inter-packet timing patterns if available
-        Uses simple correlation for PoC
+        Compares inter-packet timing patterns if available: by packet count
+        ratio, or with PATTERN_SIMILARITY_MODE "correlation" by Pearson
+        correlation of the timings (see timing_correlation), falling back to
+        the count ratio for short or constant series
         
         Returns:
             Tuple of (score, plain_english_explanation)
         """
         if not entry_obs.inter_packet_timings or not exit_obs.inter_packet_timings:
             explanation = "Inter-packet timing data is not available. Cannot perform pattern analysis."
-            logger.debug(f"Pattern Similarity Analysis: {explanation}")
+            logger.debug("Pattern Similarity Analysis: %s", explanation)
             return None, explanation
         
         # Simple implementation: compare pattern lengths and basic statistics
@@ -386,11 +1177,18 @@ class CorrelationEngine:
         
         if max_len == 0:
             explanation = "Pattern data exists but is empty. Cannot calculate similarity."
-            logger.debug(f"Pattern Similarity Analysis: {explanation}")
+            logger.debug("Pattern Similarity Analysis: %s", explanation)
             return None, explanation
         
         length_similarity = (min_len / max_len) * 100
         
+        if self.pattern_mode == "correlation":
+            correlation = timing_correlation(entry_pattern, exit_pattern)
+            if correlation is not None:
+                explanation = f"Entry pattern: {len(entry_pattern)} packets, Exit pattern: {len(exit_pattern)} packets. Correlating the inter-packet timings (shorter series resampled to the longer one): the more closely the timing rhythms track each other, the more likely the same data stream. Pattern similarity: {correlation:.1f}%."
+                logger.info("Pattern Similarity Analysis: %s", explanation)
+                return correlation, explanation
+        
         # Generate explanation
         if length_similarity >= 90:
             explanation = f"Entry pattern: {len(entry_pattern)} packets, Exit pattern: {len(exit_pattern)} packets. Packet counts are nearly identical, suggesting the same data stream. Pattern similarity: {length_similarity:.1f}%."
@@ -399,25 +1197,25 @@ class CorrelationEngine:
         else:
             explanation = f"Entry pattern: {len(entry_pattern)} packets, Exit pattern: {len(exit_pattern)} packets. Significant difference in packet counts. May indicate different sessions or heavy multiplexing. Pattern similarity: {length_similarity:.1f}%."
         
-        logger.info(f"Pattern Similarity Analysis: {explanation}")
+        logger.info("Pattern Similarity Analysis: %s", explanation)
         
-        # For PoC, just use length similarity
-        # In production, would use more sophisticated correlation techniques
         return length_similarity, explanation
     
-    def _calculate_guard_confidence(self, guard_fingerprint: str, base_correlation: float) -> float:
+    def _calculate_guard_confidence(self, guard_fingerprint: str, base_correlation: float,
+                                    guard_probability: Optional[float] = None) -> float:
         """
         Calculate confidence in guard node hypothesis
         
         Factors:
         - Base correlation strength
-        - Guard's selection probability in network
+        - Guard's selection probability in network (looked up unless given)
         """
         if not self.graph_analyzer:
             return base_correlation
         
         # Get guard selection probability
-        guard_probability = self.graph_analyzer.estimate_guard_selection_probability(guard_fingerprint)
+        if guard_probability is None:
+            guard_probability = self.graph_analyzer.estimate_guard_selection_probability(guard_fingerprint)
         
         # Combine base correlation with guard probability
         # Higher probability guards are more likely to be selected
@@ -425,7 +1223,8 @@ class CorrelationEngine:
         
         return min(confidence, 100.0)
     
-    def _calculate_repetition_weight(self, observation: TrafficObservation) -> float:
+    def _calculate_repetition_weight(self, observation: TrafficObservation,
+                                     pattern_key: Optional[int] = None) -> float:
         """
         Calculate weight boost based on observation repetition
         
@@ -436,6 +1235,7 @@ class CorrelationEngine:
         
         Args:
             observation: The observation to calculate weight for
+            pattern_key: Its _create_pattern_key key, if already computed
         
         Returns:
             Weight multiplier (1.0 = no boost, up to MAX_REPETITION_BOOST)
@@ -446,15 +1246,31 @@ class CorrelationEngine:
         if not observation.relay_fingerprint:
             return 1.0
         
-        # Track this observation
-        pattern_key = self._create_pattern_key(observation)
+        # Track this observation; one observation may stand for several
+        # identical sightings (occurrences), which are counted at once
+        if pattern_key is None:
+            pattern_key = self._create_pattern_key(observation)
         self.observation_history[observation.relay_fingerprint].append(observation)
-        self.pattern_frequency[pattern_key] += 1
+        repetition_count = self.pattern_frequency.get(pattern_key, 0) + observation.occurrences
+        self.pattern_frequency[pattern_key] = repetition_count
+        self.pattern_frequency.move_to_end(pattern_key)
+        if len(self.pattern_frequency) > settings.PATTERN_CACHE_MAX:
+            self.pattern_frequency.popitem(last=False)
+        self._pattern_statistics.clear()
+        
+        if repetition_count < settings.MIN_REPETITIONS_FOR_BOOST:
+            return 1.0
+        boost = self._repetition_boost(repetition_count)
         
-        # Get repetition count for this pattern
-        repetition_count = self.pattern_frequency[pattern_key]
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Repetition weight for {self._describe_pattern_key(pattern_key)}: "
+                         f"{boost:.2f}x (count: {repetition_count})")
         
-        # Calculate boost
+        return boost
+    
+    @staticmethod
+    def _repetition_boost(repetition_count: int) -> float:
+        """Weight multiplier for a pattern seen repetition_count times"""
         if repetition_count < settings.MIN_REPETITIONS_FOR_BOOST:
             return 1.0
         
@@ -463,13 +1279,94 @@ class CorrelationEngine:
         boost = 1.0 + (math.log2(repetition_count) * (settings.REPETITION_BOOST_FACTOR - 1.0))
         
         # Cap at maximum boost
-        boost = min(boost, settings.MAX_REPETITION_BOOST)
+        return min(boost, settings.MAX_REPETITION_BOOST)
+    
+    def _record_repetitions(
+        self,
+        rows: np.ndarray,
+        cols: np.ndarray,
+        entry_observations: List[TrafficObservation],
+        exit_observations: List[TrafficObservation],
+        entry_keys: List[Optional[int]],
+        exit_keys: List[Optional[int]]
+    ) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Record the repetitions of a whole candidate list at once
         
-        logger.debug(f"Repetition weight for {pattern_key}: {boost:.2f}x (count: {repetition_count})")
+        Same result as calling _calculate_repetition_weight for the entry
+        and then the exit of each candidate (rows[k], cols[k]) in order: a
+        sighting's count is the stored count of its pattern plus the running
+        sum of occurrences within the run, computed with one grouped cumsum.
         
-        return boost
+        Returns:
+            (entry_weights, exit_weights) per candidate, or None (nothing
+            recorded) when the run could evict patterns from the capped
+            pattern_frequency or debug logging wants each weight; only the
+            pair-by-pair path is exact there
+        """
+        if logger.isEnabledFor(logging.DEBUG):
+            return None
+        
+        # Dense ids of the pattern keys involved; -1 for untracked observations
+        ids: Dict[int, int] = {}
+        def dense(keys: List[Optional[int]]) -> np.ndarray:
+            return np.fromiter(
+                (-1 if key is None else ids.setdefault(key, len(ids)) for key in keys),
+                dtype=np.int64, count=len(keys)
+            )
+        entry_ids, exit_ids = dense(entry_keys), dense(exit_keys)
+        keys = list(ids)
+        stored = [self.pattern_frequency.get(key) for key in keys]
+        new_patterns = sum(count is None for count in stored)
+        if len(self.pattern_frequency) + new_patterns > settings.PATTERN_CACHE_MAX:
+            return None
+        
+        def occurrences(observations: List[TrafficObservation]) -> np.ndarray:
+            return np.fromiter((o.occurrences for o in observations), dtype=np.int64, count=len(observations))
+        
+        # Sightings in call order: entry then exit of each candidate
+        seq_ids = np.empty(2 * len(rows), dtype=np.int64)
+        seq_ids[0::2], seq_ids[1::2] = entry_ids[rows], exit_ids[cols]
+        seq_occ = np.empty(2 * len(rows), dtype=np.int64)
+        seq_occ[0::2], seq_occ[1::2] = occurrences(entry_observations)[rows], occurrences(exit_observations)[cols]
+        tracked = np.flatnonzero(seq_ids >= 0)
+        
+        # Running count per pattern: group the sightings by pattern (stable,
+        # so call order is kept within a group) and cumsum within groups
+        order = tracked[np.argsort(seq_ids[tracked], kind="stable")]
+        group = seq_ids[order]
+        totals = np.cumsum(seq_occ[order])
+        starts = np.ones(len(order), dtype=bool)
+        starts[1:] = group[1:] != group[:-1]
+        before = np.maximum.accumulate(np.where(starts, totals - seq_occ[order], 0))
+        initial = np.array([count or 0 for count in stored], dtype=np.int64)
+        counts = initial[group] + totals - before
+        
+        # Boosts are looked up per distinct count, with the scalar formula
+        distinct, inverse = np.unique(counts, return_inverse=True)
+        boosts = np.array([self._repetition_boost(c) for c in distinct.tolist()], dtype=np.float64)
+        weights = np.ones(len(seq_ids), dtype=np.float64)
+        weights[order] = boosts[inverse]
+        
+        # Final count of each pattern, stored in order of its last sighting
+        ends = np.ones(len(order), dtype=bool)
+        ends[:-1] = starts[1:]
+        last_seen = np.argsort(order[ends], kind="stable")
+        for key_id, count in zip(group[ends][last_seen].tolist(), counts[ends][last_seen].tolist()):
+            self.pattern_frequency[keys[key_id]] = count
+            self.pattern_frequency.move_to_end(keys[key_id])
+        self._pattern_statistics.clear()
+        
+        history = self.observation_history
+        for i, j in zip(rows.tolist(), cols.tolist()):
+            if entry_keys[i] is not None:
+                history[entry_observations[i].relay_fingerprint].append(entry_observations[i])
+            if exit_keys[j] is not None:
+                history[exit_observations[j].relay_fingerprint].append(exit_observations[j])
+        
+        return weights[0::2], weights[1::2]
     
-    def _create_pattern_key(self, observation: TrafficObservation) -> str:
+    def _create_pattern_key(self, observation: TrafficObservation) -> int:
         """
         Create a unique key for pattern matching
         
@@ -478,30 +1375,80 @@ class CorrelationEngine:
         - Observation type
         - Approximate volume (bucketed)
         
+        The three parts are packed into one integer (relay id, type code,
+        volume bucket index), which is cheaper to build and hash than a
+        string; _describe_pattern_key turns it back into
+        "relay:type:volume" for reporting.
+        
         Args:
             observation: The observation to create key for
         
         Returns:
-            Pattern key string
+            Packed pattern key
         """
-        relay = observation.relay_fingerprint or "unknown"
-        obs_type = observation.observation_type.value if hasattr(observation.observation_type, 'value') else observation.observation_type
-        
         # Bucket volume into ranges for pattern matching
         # This allows similar (but not identical) volumes to be grouped
         if observation.bytes_transferred:
             # Bucket into 100KB ranges
-            volume_bucket = (observation.bytes_transferred // 100000) * 100000
+            volume_bucket = min(observation.bytes_transferred // _VOLUME_BUCKET_BYTES, _MAX_VOLUME_BUCKET)
         else:
             volume_bucket = 0
         
+        return self._pattern_prefix(observation) | volume_bucket
+    
+    def _pattern_prefix(self, observation: TrafficObservation) -> int:
+        """Relay id and type code bits of the observation's pattern key"""
+        relay = observation.relay_fingerprint or "unknown"
+        relay_id = self._relay_ids.get(relay)
+        if relay_id is None:
+            relay_id = len(self._relay_fingerprints)
+            self._relay_ids[relay] = relay_id
+            self._relay_fingerprints.append(relay)
+        
+        # ObservationType is a str enum, so members and plain values both hit
+        type_code = _OBS_TYPE_CODES.get(observation.observation_type, _UNKNOWN_OBS_TYPE_CODE)
+        return (relay_id << _RELAY_SHIFT) | (type_code << _TYPE_SHIFT)
+    
+    def _pattern_keys(self, observations: List[TrafficObservation], volumes: np.ndarray) -> List[Optional[int]]:
+        """
+        _create_pattern_key keys of a batch of observations
+        
+        Volume buckets are taken from the bytes column in one array
+        operation. Observations without a relay fingerprint, which are
+        never tracked, get None.
+        """
+        buckets = np.minimum(volumes // _VOLUME_BUCKET_BYTES, _MAX_VOLUME_BUCKET).tolist()
+        
+        # A batch repeats few (relay, type) combinations, so each prefix is
+        # built once and then found with a single tuple lookup
+        prefixes: Dict[Tuple[str, str], int] = {}
+        keys: List[Optional[int]] = []
+        for obs, bucket in zip(observations, buckets):
+            relay = obs.relay_fingerprint
+            if not relay:
+                keys.append(None)
+                continue
+            combo = (relay, obs.observation_type)
+            prefix = prefixes.get(combo)
+            if prefix is None:
+                prefix = prefixes[combo] = self._pattern_prefix(obs)
+            keys.append(prefix | bucket)
+        return keys
+    
+    def _describe_pattern_key(self, pattern_key: int) -> str:
+        """Readable "relay:type:volume" form of a packed pattern key"""
+        relay = self._relay_fingerprints[pattern_key >> _RELAY_SHIFT]
+        type_code = (pattern_key >> _TYPE_SHIFT) & _TYPE_MASK
+        obs_type = _OBS_TYPES[type_code] if type_code < len(_OBS_TYPES) else "unknown"
+        volume_bucket = (pattern_key & _MAX_VOLUME_BUCKET) * _VOLUME_BUCKET_BYTES
         return f"{relay}:{obs_type}:{volume_bucket}"
     
     def _apply_repetition_weighting(
         self,
         base_score: float,
         entry_obs: TrafficObservation,
-        exit_obs: TrafficObservation
+        exit_obs: TrafficObservation,
+        repetition_weights: Optional[Tuple[float, float]] = None
     ) -> Tuple[float, float]:
         """
         Apply repetition weighting to correlation score
@@ -510,6 +1457,8 @@ class CorrelationEngine:
             base_score: Base correlation strength
             entry_obs: Entry observation
             exit_obs: Exit observation
+            repetition_weights: (entry, exit) weights already recorded by the
+                caller; without them both observations are recorded here
         
         Returns:
             Tuple of (weighted_score, repetition_boost)
@@ -518,8 +1467,12 @@ class CorrelationEngine:
             return base_score, 1.0
         
         # Calculate weights for both observations
-        entry_weight = self._calculate_repetition_weight(entry_obs)
-        exit_weight = self._calculate_repetition_weight(exit_obs)
+        if repetition_weights is None:
+            repetition_weights = (
+                self._calculate_repetition_weight(entry_obs),
+                self._calculate_repetition_weight(exit_obs)
+            )
+        entry_weight, exit_weight = repetition_weights
         
         # Use average of both weights
         combined_weight = (entry_weight + exit_weight) / 2.0
@@ -533,6 +1486,14 @@ class CorrelationEngine:
         
         return weighted_score, combined_weight
     
+    @staticmethod
+    def top_pairs(session_pairs: List[SessionPair], k: int = 10) -> List[SessionPair]:
+        """The k strongest session pairs, strongest first (see top_indices)"""
+        strengths = np.fromiter(
+            (p.correlation_strength for p in session_pairs), dtype=np.float64, count=len(session_pairs)
+        )
+        return [session_pairs[i] for i in top_indices(strengths, k)]
+    
     def cluster_session_pairs(self, session_pairs: List[SessionPair]) -> List[CorrelationCluster]:
         """
         Group session pairs into clusters based on repeated patterns
@@ -542,31 +1503,74 @@ class CorrelationEngine:
         - Consistent guard node usage
         - Behavioral patterns
         
+        Results for large pair lists are memoized: clustering pairs with the
+        same clustered fields again (e.g. re-reading an analysis) returns
+        the earlier clusters.
+        
         Args:
             session_pairs: List of correlated session pairs
         
         Returns:
             List of CorrelationCluster objects
         """
+        if len(session_pairs) < _CLUSTER_CACHE_MIN_PAIRS:
+            return self._cluster_session_pairs(session_pairs)
+        
+        # Keyed by the values clustering reads, not pair identity: pairs are
+        # mutable and ids of collected lists are reused. Building the key
+        # costs about a quarter of clustering the pairs
+        key = (settings.MIN_OBSERVATIONS_FOR_CORRELATION, tuple(
+            (p.pair_id, p.hypothesized_guard, p.correlation_strength,
+             p.entry_observation_id, p.exit_observation_id, p.created_at)
+            for p in session_pairs
+        ))
+        cached = self._cluster_cache.get(key)
+        if cached is not None:
+            self._cluster_cache.move_to_end(key)
+            return list(cached)
+        
+        clusters = self._cluster_session_pairs(session_pairs)
+        self._cluster_cache[key] = clusters
+        if len(self._cluster_cache) > _CLUSTER_CACHE_SIZE:
+            self._cluster_cache.popitem(last=False)
+        return list(clusters)
+    
+    def _cluster_session_pairs(self, session_pairs: List[SessionPair]) -> List[CorrelationCluster]:
+        """Uncached body of cluster_session_pairs"""
         logger.info(f"Clustering {len(session_pairs)} session pairs")
         
-        # Group by hypothesized guard
-        guard_groups: Dict[str, List[SessionPair]] = {}
+        # Group by hypothesized guard: one hash lookup per pair, so
+        # clustering is linear in the number of pairs. (Sorting guard codes
+        # and splitting the index array measured slower: the fingerprints
+        # must be hashed to codes anyway, and each group gathered back into
+        # a pair list for _create_cluster.)
+        guard_groups: Dict[str, List[SessionPair]] = defaultdict(list)
+        group_ids: Dict[str, int] = {}
+        pair_groups = []
+        strengths = []
         
         for pair in session_pairs:
             if pair.hypothesized_guard:
-                if pair.hypothesized_guard not in guard_groups:
-                    guard_groups[pair.hypothesized_guard] = []
                 guard_groups[pair.hypothesized_guard].append(pair)
+                pair_groups.append(group_ids.setdefault(pair.hypothesized_guard, len(group_ids)))
+                strengths.append(pair.correlation_strength)
+        
+        # Correlation strength total of every group in one pass
+        strength_sums = np.bincount(
+            np.array(pair_groups, dtype=np.intp),
+            weights=np.array(strengths, dtype=np.float64),
+            minlength=len(group_ids)
+        )
         
         # Create clusters
         clusters = []
         cluster_id = 1
         
-        for guard_fp, pairs in guard_groups.items():
+        for group, (guard_fp, pairs) in enumerate(guard_groups.items()):
             # Only cluster if we have multiple observations
             if len(pairs) >= settings.MIN_OBSERVATIONS_FOR_CORRELATION:
-                cluster = self._create_cluster(cluster_id, guard_fp, pairs)
+                avg_correlation = float(strength_sums[group]) / len(pairs)
+                cluster = self._create_cluster(cluster_id, guard_fp, pairs, avg_correlation)
                 clusters.append(cluster)
                 cluster_id += 1
         
@@ -577,15 +1581,23 @@ class CorrelationEngine:
         self,
         cluster_id: int,
         guard_fp: str,
-        pairs: List[SessionPair]
+        pairs: List[SessionPair],
+        avg_correlation: Optional[float] = None
     ) -> CorrelationCluster:
-        """Create a correlation cluster from related session pairs"""
+        """
+        Create a correlation cluster from related session pairs
         
-        # Extract all observation IDs
-        observation_ids = set()
-        for pair in pairs:
-            observation_ids.add(pair.entry_observation_id)
-            observation_ids.add(pair.exit_observation_id)
+        avg_correlation is the pairs' mean correlation strength, if the
+        caller has already aggregated it.
+        """
+        
+        # Extract all observation IDs (first-seen order, so output is stable);
+        # entry and exit ids are gathered with two flat comprehensions and
+        # interleaved by slice assignment rather than a nested generator
+        pair_obs_ids = [None] * (2 * len(pairs))
+        pair_obs_ids[0::2] = [pair.entry_observation_id for pair in pairs]
+        pair_obs_ids[1::2] = [pair.exit_observation_id for pair in pairs]
+        observation_ids = dict.fromkeys(pair_obs_ids)
         
         # Extract timestamps (would need to pass observations for real implementation)
         # For PoC, use pair creation timestamps
@@ -594,7 +1606,8 @@ class CorrelationEngine:
         last_obs = max(timestamps)
         
         # Calculate consistency score
-        avg_correlation = sum(p.correlation_strength for p in pairs) / len(pairs)
+        if avg_correlation is None:
+            avg_correlation = sum(p.correlation_strength for p in pairs) / len(pairs)
         consistency_score = avg_correlation
         
         # Guard persistence score (high if same guard appears repeatedly)
@@ -603,17 +1616,8 @@ class CorrelationEngine:
         # Overall cluster confidence
         cluster_confidence = (consistency_score * 0.6) + (guard_persistence * 0.4)
         
-        # Generate reasoning
-        reasoning = [
-            f"Found {len(pairs)} correlated session pairs",
-            f"All pairs share hypothesized guard: {guard_fp}",
-            f"Average correlation strength: {avg_correlation:.1f}%",
-            f"Observations span {(last_obs - first_obs).total_seconds() / 3600:.1f} hours",
-        ]
-        
-        if guard_persistence > 70:
-            reasoning.append("Strong guard persistence indicates consistent user behavior")
-        
+        # Reasoning is formatted from these fields on access (see
+        # CorrelationCluster.reasoning)
         cluster = CorrelationCluster(
             cluster_id=f"cluster-{cluster_id}",
             observation_ids=list(observation_ids),
@@ -624,42 +1628,105 @@ class CorrelationEngine:
             consistency_score=consistency_score,
             probable_guards=[guard_fp],
             guard_persistence_score=guard_persistence,
-            cluster_confidence=cluster_confidence,
-            reasoning=reasoning
+            cluster_confidence=cluster_confidence
         )
         
         return cluster
     
-    def get_repetition_statistics(self) -> Dict[str, Any]:
+    def get_repetition_statistics(self, top_n: int = 10) -> Dict[str, Any]:
         """
         Get statistics about repeated observation patterns
         
+        Args:
+            top_n: Number of most repeated patterns to list
+        
         Returns:
             Dictionary containing:
-            - total_patterns: Number of unique patterns tracked
-            - total_observations: Total observations across all patterns
-            - most_common_pattern: Most frequently observed pattern
-            - most_common_pattern_count: Count of most common pattern
-            - average_repetitions: Average repetitions per pattern
-        """
-        if not self.pattern_frequency:
-            return {
-                "total_patterns": 0,
-                "total_observations": 0,
-                "most_common_pattern": None,
-                "most_common_pattern_count": 0,
-                "average_repetitions": 0.0
-            }
+            - enabled: Whether repetition weighting is on
+            - total_unique_patterns: Number of unique patterns tracked
+            - repeated_patterns: Patterns seen more than once
+            - max_repetitions: Count of the most common pattern
+            - avg_repetitions: Average repetitions per pattern
+            - boost_parameters: min_repetitions, boost_factor, max_boost
+            - top_patterns: Most repeated patterns as {"pattern", "count"}
+            - total_patterns, total_observations, most_common_pattern,
+              most_common_pattern_count, average_repetitions: earlier
+              names of the same figures
+        
+        The pattern figures are computed once per top_n and reused until
+        pattern_frequency changes, so frequent polling stays cheap.
+        """
+        figures = self._pattern_statistics.get(top_n)
+        if figures is None:
+            figures = self._pattern_statistics[top_n] = self._pattern_figures(top_n)
         
-        total_observations = sum(self.pattern_frequency.values())
-        most_common = max(self.pattern_frequency.items(), key=lambda x: x[1])
+        return {
+            "enabled": settings.ENABLE_REPETITION_WEIGHTING,
+            "total_unique_patterns": figures["total_patterns"],
+            "repeated_patterns": figures["repeated_patterns"],
+            "max_repetitions": figures["most_common_pattern_count"],
+            "avg_repetitions": round(figures["average_repetitions"], 2),
+            "boost_parameters": {
+                "min_repetitions": settings.MIN_REPETITIONS_FOR_BOOST,
+                "boost_factor": settings.REPETITION_BOOST_FACTOR,
+                "max_boost": settings.MAX_REPETITION_BOOST
+            },
+            "top_patterns": list(figures["top_patterns"]),
+            "total_patterns": figures["total_patterns"],
+            "total_observations": figures["total_observations"],
+            "most_common_pattern": figures["most_common_pattern"],
+            "most_common_pattern_count": figures["most_common_pattern_count"],
+            "average_repetitions": figures["average_repetitions"]
+        }
+    
+    def _pattern_figures(self, top_n: int) -> Dict[str, Any]:
+        """Aggregates of pattern_frequency for get_repetition_statistics"""
+        # Aggregate the counts as one array instead of walking the dict per figure
+        keys = list(self.pattern_frequency)
+        counts = np.fromiter(self.pattern_frequency.values(), dtype=np.int64, count=len(keys))
+        
+        total_patterns = len(counts)
+        total_observations = int(counts.sum())
+        average = total_observations / total_patterns if total_patterns else 0.0
+        
+        top_patterns = []
+        most_common_pattern = None
+        most_common_count = 0
+        if total_patterns:
+            # Highest counts first, earliest-seen first among ties. Only
+            # patterns tied with or above the top_n-th highest count can be
+            # listed, so just those are sorted
+            candidates = np.arange(total_patterns)
+            if 0 < top_n < total_patterns:
+                threshold = np.partition(counts, total_patterns - top_n)[total_patterns - top_n]
+                candidates = np.flatnonzero(counts >= threshold)
+            order = candidates[np.argsort(-counts[candidates], kind="stable")]
+            most_common_pattern = self._describe_pattern_key(keys[order[0]])
+            most_common_count = int(counts[order[0]])
+            top_patterns = [
+                {"pattern": self._describe_pattern_key(keys[i]), "count": int(counts[i])}
+                for i in order[:top_n] if counts[i] > 1
+            ]
         
         return {
-            "total_patterns": len(self.pattern_frequency),
+            "total_patterns": total_patterns,
+            "repeated_patterns": int(np.count_nonzero(counts > 1)),
+            "top_patterns": top_patterns,
             "total_observations": total_observations,
-            "most_common_pattern": most_common[0],
-            "most_common_pattern_count": most_common[1],
-            "average_repetitions": total_observations / len(self.pattern_frequency)
+            "most_common_pattern": most_common_pattern,
+            "most_common_pattern_count": most_common_count,
+            "average_repetitions": average
+        }
+    
+    def get_score_cache_statistics(self) -> Dict[str, Dict[str, int]]:
+        """
+        Hit/miss counts of the cached time and volume scorers
+        
+        The caches are module-level, so the counts cover all engines.
+        """
+        return {
+            "time_correlation": _time_correlation.cache_info()._asdict(),
+            "volume_similarity": _volume_similarity.cache_info()._asdict(),
         }
     
     def get_weight_profile(self) -> WeightProfile:
@@ -671,6 +1738,28 @@ class CorrelationEngine:
         """
         return self.weight_profile
     
+    def with_profile(self, profile: WeightProfile) -> "CorrelationEngine":
+        """
+        Create an engine for the same topology using a different weight profile
+        
+        The topology indexes (graph analyzer) are shared with this engine
+        instead of being rebuilt; repetition history and the cluster memo
+        start empty, as they would for a newly constructed engine.
+        
+        Args:
+            profile: WeightProfile for the new engine
+        
+        Raises:
+            ValueError: If profile weights don't sum to 1.0
+        """
+        profile.validate_weights_sum()
+        engine = copy.copy(self)
+        engine.weight_profile = profile
+        engine.reset_repetition_state()
+        engine._cluster_cache = OrderedDict()
+        logger.info(f"Correlation Engine derived with weight profile: {profile.profile_name}")
+        return engine
+    
     def set_weight_profile(self, profile: WeightProfile) -> None:
         """
         Update the weight profile for future correlations
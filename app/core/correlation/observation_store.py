@@ -0,0 +1,140 @@
+"""
+Observation Store - In-memory observation storage
+
+Keeps ingested observations as Pydantic models for the API, plus
+columnar NumPy copies of the fields the correlation engine scores on,
+so analysis runs do not have to walk the model objects again.
+"""
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.models.correlation import TrafficObservation
+from app.core.correlation.engine import (
+    TrafficObservationBatch, _obs_to_soa, ENTRY_TYPE_CODE, EXIT_TYPE_CODE
+)
+
+
+logger = logging.getLogger(__name__)
+
+
+class ObservationStore:
+    """
+    Append-only store of traffic observations
+
+    Column buffers grow by doubling. Timestamps are integer microseconds
+    since the first stored observation, so all rows share one time base.
+    """
+
+    def __init__(self, initial_capacity: int = 1024):
+        self.observations: List[TrafficObservation] = []
+        self.entry_observations: List[TrafficObservation] = []
+        self.exit_observations: List[TrafficObservation] = []
+
+        self._epoch: Optional[datetime] = None
+        self._size = 0
+        self._ts = np.empty(initial_capacity, dtype=np.int64)
+        self._vol = np.empty(initial_capacity, dtype=np.uint64)
+        self._npk = np.empty(initial_capacity, dtype=np.int64)
+        self._is_entry = np.empty(initial_capacity, dtype=bool)
+        self._is_exit = np.empty(initial_capacity, dtype=bool)
+
+        # entry_batch/exit_batch results, until the next extend
+        self._batches: Dict[str, TrafficObservationBatch] = {}
+
+    def __len__(self) -> int:
+        return self._size
+
+    def append(self, observation: TrafficObservation) -> None:
+        """Store a single observation"""
+        self.extend([observation])
+
+    def extend(self, observations: List[TrafficObservation]) -> None:
+        """
+        Store a batch of observations
+
+        Raises:
+            ValueError: If a timestamp cannot be compared with the stored ones
+                (timezone-aware mixed with naive)
+        """
+        if not observations:
+            return
+
+        epoch = self._epoch or observations[0].timestamp
+        try:
+            ts, vol, npk, type_codes = _obs_to_soa(observations, epoch)
+        except TypeError as e:
+            raise ValueError(f"Observation timestamps must all be timezone-aware or all naive: {e}")
+        is_entry = type_codes == ENTRY_TYPE_CODE
+        is_exit = type_codes == EXIT_TYPE_CODE
+
+        self._reserve(self._size + len(observations))
+        end = self._size + len(observations)
+        self._ts[self._size:end] = ts
+        self._vol[self._size:end] = vol
+        self._npk[self._size:end] = npk
+        self._is_entry[self._size:end] = is_entry
+        self._is_exit[self._size:end] = is_exit
+
+        self._epoch = epoch
+        self._size = end
+        self._batches.clear()
+        self.observations.extend(observations)
+        for obs, entry, exit_ in zip(observations, is_entry, is_exit):
+            if entry:
+                self.entry_observations.append(obs)
+            elif exit_:
+                self.exit_observations.append(obs)
+
+    def entry_arrays(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(timestamps_us, bytes, packet_counts) of entry observations, in entry_observations order"""
+        return self._select(self._is_entry[:self._size])
+
+    def exit_arrays(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(timestamps_us, bytes, packet_counts) of exit observations, in exit_observations order"""
+        return self._select(self._is_exit[:self._size])
+
+    def entry_batch(self) -> TrafficObservationBatch:
+        """
+        Snapshot of the entry observations and their columns
+
+        Built once per store state: repeated analyses between appends share
+        the same (read-only) batch instead of re-selecting the columns.
+        """
+        batch = self._batches.get("entry")
+        if batch is None:
+            batch = self._batches["entry"] = TrafficObservationBatch(
+                list(self.entry_observations), self._epoch, *self.entry_arrays()
+            )
+        return batch
+
+    def exit_batch(self) -> TrafficObservationBatch:
+        """Snapshot of the exit observations and their columns (see entry_batch)"""
+        batch = self._batches.get("exit")
+        if batch is None:
+            batch = self._batches["exit"] = TrafficObservationBatch(
+                list(self.exit_observations), self._epoch, *self.exit_arrays()
+            )
+        return batch
+
+    def _select(self, mask: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        n = self._size
+        return self._ts[:n][mask], self._vol[:n][mask], self._npk[:n][mask]
+
+    def _reserve(self, needed: int) -> None:
+        """Grow the column buffers (by doubling) to hold at least `needed` rows"""
+        capacity = len(self._ts)
+        if needed <= capacity:
+            return
+
+        while capacity < needed:
+            capacity = max(capacity * 2, 1)
+        logger.debug(f"Growing observation buffers to {capacity} rows")
+
+        for name in ("_ts", "_vol", "_npk", "_is_entry", "_is_exit"):
+            old = getattr(self, name)
+            new = np.empty(capacity, dtype=old.dtype)
+            new[:self._size] = old[:self._size]
+            setattr(self, name, new)
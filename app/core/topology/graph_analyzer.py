@@ -6,16 +6,63 @@ Provides graph-based analysis of TOR network structure:
 - Guard-to-exit path analysis
 - Relay family and subnet constraints
 """
-import networkx as nx
+import numpy as np
 import logging
-from typing import List, Set, Tuple, Optional
-from ipaddress import ip_address, ip_network
+import weakref
+from typing import List, Set, Tuple, Optional, Dict
+from ipaddress import ip_address
 
-from app.models.topology import TORRelay, TopologySnapshot, TORCircuit
+from app.models.topology import (
+    TORRelay,
+    TopologySnapshot,
+    TORCircuit,
+    RelayAdjacency,
+    EDGE_GUARD_EXIT,
+    FLAG_RUNNING,
+    FLAG_VALID
+)
 
 
 logger = logging.getLogger(__name__)
 
+# Analyzers by id() of their snapshot, kept only while some engine uses them
+_ANALYZERS: "weakref.WeakValueDictionary[int, TORGraphAnalyzer]" = weakref.WeakValueDictionary()
+
+_RUNNING_VALID = FLAG_RUNNING | FLAG_VALID
+
+
+def validate_circuits(
+    guard_idx: np.ndarray,
+    mid_idx: np.ndarray,
+    exit_idx: np.ndarray,
+    prefix16: np.ndarray,
+    flags_mask: np.ndarray,
+    is_guard: np.ndarray,
+    is_exit: np.ndarray
+) -> np.ndarray:
+    """
+    Check many 3-hop circuits at once against the path selection constraints
+
+    Args:
+        guard_idx, mid_idx, exit_idx: Relay row indices of each circuit's hops
+        prefix16: /16 prefix per relay row
+        flags_mask: Packed flag bits per relay row
+        is_guard, is_exit: Guard/exit capability per relay row
+
+    Returns:
+        Boolean array, True where the circuit satisfies every constraint
+    """
+    pg, pm, px = prefix16[guard_idx], prefix16[mid_idx], prefix16[exit_idx]
+    distinct_subnets = (pg != pm) & (pm != px) & (pg != px)
+
+    running_valid = (
+        ((flags_mask[guard_idx] & _RUNNING_VALID) == _RUNNING_VALID)
+        & ((flags_mask[mid_idx] & _RUNNING_VALID) == _RUNNING_VALID)
+        & ((flags_mask[exit_idx] & _RUNNING_VALID) == _RUNNING_VALID)
+    )
+
+    return is_guard[guard_idx] & is_exit[exit_idx] & distinct_subnets & running_valid
+
 
 class TORGraphAnalyzer:
     """
@@ -29,43 +76,98 @@ class TORGraphAnalyzer:
     
     def __init__(self, snapshot: TopologySnapshot):
         self.snapshot = snapshot
-        self.graph = nx.DiGraph()
         self._build_graph()
         
         logger.info(f"Graph analyzer initialized with {len(self.snapshot.relays)} relays")
     
+    @classmethod
+    def for_snapshot(cls, snapshot: TopologySnapshot) -> "TORGraphAnalyzer":
+        """
+        Get the analyzer for a snapshot, building it only if none is alive
+        
+        Engines created for the same snapshot share one analyzer and its
+        per-relay index structures.
+        """
+        analyzer = _ANALYZERS.get(id(snapshot))
+        # An analyzer holds its snapshot, so a live entry cannot belong to a
+        # different object that reused the id; the check is belt and braces
+        if analyzer is None or analyzer.snapshot is not snapshot:
+            analyzer = cls(snapshot)
+            _ANALYZERS[id(snapshot)] = analyzer
+        return analyzer
+    
     def _build_graph(self):
-        """Build NetworkX graph from topology snapshot"""
-        # Add all relays as nodes
-        for relay in self.snapshot.relays:
-            self.graph.add_node(
-                relay.fingerprint,
-                relay=relay,
-                is_guard=relay.is_guard,
-                is_exit=relay.is_exit,
-                address=relay.address,
-                bandwidth=relay.observed_bandwidth
+        """
+        Build per-relay lookup structures from the topology snapshot
+        
+        Relays are stored as parallel NumPy arrays indexed by their position
+        in snapshot.relays; graph algorithms can be built on these on demand.
+        """
+        arrays = self.snapshot.arrays
+        n = len(arrays)
+        self._is_guard = arrays.is_guard
+        self._is_exit = arrays.is_exit
+        self._bandwidth = arrays.observed_bandwidth
+        self._weight = arrays.consensus_weight.astype(np.float64)
+        
+        # Row indices of the guards/exits by descending weight, and the
+        # weight-ordered guard/exit lists, built once
+        relays = self.snapshot.relays
+        self._guard_idxs = self.snapshot.rows_by_weight(self._is_guard).astype(np.int32)
+        self._exit_idxs = self.snapshot.rows_by_weight(self._is_exit).astype(np.int32)
+        self._guards_sorted = [relays[i] for i in self._guard_idxs]
+        self._exits_sorted = [relays[i] for i in self._exit_idxs]
+        self._total_guard_weight = int(arrays.consensus_weight[self._is_guard].sum())
+        
+        # Guard selection probability (percent) per relay row, 0 for non-guards
+        self._guard_probability = np.zeros(n, dtype=np.float64)
+        if self._total_guard_weight > 0:
+            self._guard_probability[self._is_guard] = (
+                self._weight[self._is_guard] / self._total_guard_weight * 100
             )
         
-        logger.info(f"Built graph with {self.graph.number_of_nodes()} nodes")
+        # Fingerprint -> row, shared with the snapshot
+        self._fp_to_idx: Dict[str, int] = self.snapshot.fp_index
+        
+        # /16 prefix per relay, so the subnet constraint is an integer compare
+        self._prefix16 = np.array(
+            [self._subnet_prefix(r.address, i) for i, r in enumerate(self.snapshot.relays)],
+            dtype=np.uint32
+        )
+        
+        # Relay flags packed into bitmasks, so flag checks are an integer AND
+        self._flags_mask = arrays.flags
+        
+        # Exit -> compatible guard edges, built on first use
+        self._exit_guard_adjacency: Optional[RelayAdjacency] = None
+        
+        logger.info(f"Built relay index with {n} relays")
     
-    def _same_subnet(self, ip1: str, ip2: str) -> bool:
-        """Check if two IPs are in the same /16 subnet (TOR constraint)"""
+    @staticmethod
+    def _subnet_prefix(address: str, idx: int) -> int:
+        """
+        Compute the /16 prefix used for the subnet constraint
+        
+        TOR uses /16 for IPv4. IPv6 and unparseable addresses get a unique
+        sentinel above the IPv4 prefix range so they never match another relay.
+        """
         try:
-            addr1 = ip_address(ip1)
-            addr2 = ip_address(ip2)
-            
-            # TOR uses /16 for IPv4, /32 for IPv6
-            if addr1.version == 4 and addr2.version == 4:
-                net1 = ip_network(f"{ip1}/16", strict=False)
-                return addr2 in net1
-            
-            # For IPv6 or mixed, consider them different subnets
-            return False
+            addr = ip_address(address)
+            if addr.version == 4:
+                return int(addr) >> 16
+        except ValueError as e:
+            logger.warning(f"Failed to parse address {address}: {e}")
         
-        except Exception as e:
-            logger.warning(f"Failed to check subnet for {ip1}, {ip2}: {e}")
+        return 0x10000 + idx
+    
+    def _same_subnet(self, fp1: str, fp2: str) -> bool:
+        """Check if two relays are in the same /16 subnet (TOR constraint)"""
+        i = self._fp_to_idx.get(fp1)
+        j = self._fp_to_idx.get(fp2)
+        if i is None or j is None:
             return False
+        
+        return bool(self._prefix16[i] == self._prefix16[j])
     
     def is_valid_circuit(self, guard_fp: str, middle_fp: str, exit_fp: str) -> Tuple[bool, List[str]]:
         """
@@ -99,61 +201,135 @@ class TORGraphAnalyzer:
             violations.append("Last relay is not an exit")
         
         # Constraint 3: No same /16 subnet
-        if self._same_subnet(guard.address, middle.address):
+        if self._same_subnet(guard_fp, middle_fp):
             violations.append("Guard and middle in same /16 subnet")
         
-        if self._same_subnet(middle.address, exit_relay.address):
+        if self._same_subnet(middle_fp, exit_fp):
             violations.append("Middle and exit in same /16 subnet")
         
-        if self._same_subnet(guard.address, exit_relay.address):
+        if self._same_subnet(guard_fp, exit_fp):
             violations.append("Guard and exit in same /16 subnet")
         
         # Constraint 4: All must be Running and Valid
-        for relay, name in [(guard, "guard"), (middle, "middle"), (exit_relay, "exit")]:
-            if not any(f.value == "Running" for f in relay.flags):
+        for fp, name in [(guard_fp, "guard"), (middle_fp, "middle"), (exit_fp, "exit")]:
+            mask = int(self._flags_mask[self._fp_to_idx[fp]])
+            if (mask & _RUNNING_VALID) == _RUNNING_VALID:
+                continue
+            if not mask & FLAG_RUNNING:
                 violations.append(f"{name} relay is not Running")
-            if not any(f.value == "Valid" for f in relay.flags):
+            if not mask & FLAG_VALID:
                 violations.append(f"{name} relay is not Valid")
         
         is_valid = len(violations) == 0
         return is_valid, violations
     
+    def validate_circuits_batch(self, circuits: List[Tuple[str, str, str]]) -> np.ndarray:
+        """
+        Check many (guard, middle, exit) fingerprint triples in one pass
+        
+        Same constraints as is_valid_circuit, without the violation details.
+        Circuits referencing unknown relays are invalid.
+        
+        Returns:
+            Boolean array with one entry per circuit
+        """
+        n = len(circuits)
+        idx = np.fromiter(
+            (self._fp_to_idx.get(fp, -1) for circuit in circuits for fp in circuit),
+            dtype=np.int64, count=3 * n
+        ).reshape(n, 3)
+        
+        known = (idx >= 0).all(axis=1)
+        result = np.zeros(n, dtype=bool)
+        k = idx[known]
+        result[known] = validate_circuits(
+            k[:, 0], k[:, 1], k[:, 2],
+            self._prefix16, self._flags_mask, self._is_guard, self._is_exit
+        )
+        return result
+    
     def _get_relay(self, fingerprint: str) -> Optional[TORRelay]:
         """Get relay by fingerprint"""
-        for relay in self.snapshot.relays:
-            if relay.fingerprint == fingerprint:
-                return relay
-        return None
-    
-    def get_possible_guards(self) -> List[TORRelay]:
-        """Get all relays that can serve as guards"""
-        guards = [r for r in self.snapshot.relays if r.is_guard]
-        # Sort by consensus weight (higher weight = more likely to be selected)
-        guards.sort(key=lambda r: r.consensus_weight, reverse=True)
-        return guards
-    
-    def get_possible_exits(self) -> List[TORRelay]:
-        """Get all relays that can serve as exits"""
-        exits = [r for r in self.snapshot.relays if r.is_exit]
-        exits.sort(key=lambda r: r.consensus_weight, reverse=True)
-        return exits
+        return self.snapshot.relay_by_fp(fingerprint)
+    
+    def get_possible_guards(self, min_bandwidth: int = 0, required_flags: int = 0) -> List[TORRelay]:
+        """
+        Get all relays that can serve as guards
+        
+        Args:
+            min_bandwidth: Only guards with at least this observed bandwidth
+            required_flags: Only guards having all of these FLAG_* bits
+        """
+        # Sorted by consensus weight (higher weight = more likely to be selected)
+        if not min_bandwidth and not required_flags:
+            return list(self._guards_sorted)
+        return self._filter_relays(self._guard_idxs, min_bandwidth, required_flags)
+    
+    def get_possible_exits(self, min_bandwidth: int = 0, required_flags: int = 0) -> List[TORRelay]:
+        """Get all relays that can serve as exits (filters as in get_possible_guards)"""
+        if not min_bandwidth and not required_flags:
+            return list(self._exits_sorted)
+        return self._filter_relays(self._exit_idxs, min_bandwidth, required_flags)
+    
+    def _filter_relays(self, idxs: np.ndarray, min_bandwidth: int, required_flags: int) -> List[TORRelay]:
+        """Relays at rows idxs (order kept) passing the filters, checked as column masks"""
+        keep = (
+            (self._bandwidth[idxs] >= min_bandwidth)
+            & ((self._flags_mask[idxs] & required_flags) == required_flags)
+        )
+        relays = self.snapshot.relays
+        return [relays[i] for i in idxs[keep]]
     
     def get_compatible_guards_for_exit(self, exit_fp: str) -> List[TORRelay]:
         """
         Get all guards that could theoretically be used with a given exit
         (considering subnet constraints)
         """
-        exit_relay = self._get_relay(exit_fp)
-        if not exit_relay:
+        exit_idx = self._fp_to_idx.get(exit_fp)
+        if exit_idx is None:
             return []
         
-        compatible_guards = []
-        for guard in self.get_possible_guards():
-            # Check subnet constraint
-            if not self._same_subnet(guard.address, exit_relay.address):
-                compatible_guards.append(guard)
+        if self._is_exit[exit_idx]:
+            guard_idxs = self.get_exit_guard_adjacency().neighbors(exit_idx)
+        else:
+            # Check subnet constraint for every guard in one vector compare
+            guard_idxs = self._guard_idxs[self._prefix16[self._guard_idxs] != self._prefix16[exit_idx]]
         
-        return compatible_guards
+        relays = self.snapshot.relays
+        return [relays[i] for i in guard_idxs]
+    
+    def get_exit_guard_adjacency(self) -> RelayAdjacency:
+        """
+        Edges from every exit to the guards it is compatible with
+        
+        Guards of each exit are in consensus weight order; the edge
+        probability is the guard's selection probability (0-1).
+        """
+        if self._exit_guard_adjacency is None:
+            n = len(self._flags_mask)
+            exit_idxs = np.flatnonzero(self._is_exit)
+            guard_prefix = self._prefix16[self._guard_idxs]
+            
+            # One row per exit, one column per guard (in weight order)
+            compatible = self._prefix16[exit_idxs][:, None] != guard_prefix[None, :]
+            counts = np.zeros(n, dtype=np.int32)
+            counts[exit_idxs] = compatible.sum(axis=1)
+            row_ptr = np.zeros(n + 1, dtype=np.int32)
+            np.cumsum(counts, out=row_ptr[1:])
+            
+            col_idx = np.broadcast_to(self._guard_idxs, compatible.shape)[compatible]
+            if self._total_guard_weight > 0:
+                probability = (self._weight[col_idx] / self._total_guard_weight).astype(np.float32)
+            else:
+                probability = np.zeros(len(col_idx), dtype=np.float32)
+            
+            self._exit_guard_adjacency = RelayAdjacency(
+                row_ptr=row_ptr,
+                col_idx=col_idx.astype(np.int32),
+                probability=probability,
+                edge_type=np.full(len(col_idx), EDGE_GUARD_EXIT, dtype=np.uint8)
+            )
+        return self._exit_guard_adjacency
     
     def estimate_guard_selection_probability(self, guard_fp: str) -> float:
         """
@@ -162,15 +338,23 @@ class TORGraphAnalyzer:
         TOR uses weighted random selection based on consensus weight
         This gives a rough probability estimate
         """
-        guard = self._get_relay(guard_fp)
-        if not guard or not guard.is_guard:
-            return 0.0
-        
-        all_guards = self.get_possible_guards()
-        total_weight = sum(g.consensus_weight for g in all_guards)
-        
-        if total_weight == 0:
+        idx = self._fp_to_idx.get(guard_fp)
+        if idx is None:
             return 0.0
+        return float(self._guard_probability[idx])
+    
+    def estimate_guard_selection_probabilities(self, guard_fps: List[str]) -> np.ndarray:
+        """
+        Guard selection probabilities (percent) for many fingerprints at once
         
-        probability = (guard.consensus_weight / total_weight) * 100
+        Same values as estimate_guard_selection_probability; unknown relays
+        and non-guards get 0.
+        """
+        idx = np.fromiter(
+            (self._fp_to_idx.get(fp, -1) for fp in guard_fps),
+            dtype=np.int64, count=len(guard_fps)
+        )
+        probability = np.zeros(len(idx), dtype=np.float64)
+        known = idx >= 0
+        probability[known] = self._guard_probability[idx[known]]
         return probability
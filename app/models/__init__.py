@@ -6,6 +6,7 @@ from app.models.topology import (
     TopologySnapshot,
     RelayEdge,
     TORCircuit,
+    RelayAdjacency,
     RelayFlags
 )
 
@@ -22,6 +23,7 @@ __all__ = [
     "TopologySnapshot",
     "RelayEdge",
     "TORCircuit",
+    "RelayAdjacency",
     "RelayFlags",
     
     # Correlation models
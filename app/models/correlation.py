@@ -4,9 +4,11 @@ Metadata-only, no payload inspection
 """
 from datetime import datetime
 from typing import Optional, List, Dict, Any
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, computed_field, validator
 from enum import Enum
 
+from app.models.topology import canonical_fingerprint
+
 
 class ObservationType(str, Enum):
     """Type of traffic observation"""
@@ -44,6 +46,9 @@ class TrafficObservation(BaseModel):
     # Timing patterns (for correlation)
     inter_packet_timings: Optional[List[float]] = Field(None, description="Packet timing patterns (milliseconds)")
     
+    # Repeated sightings of the same pattern can be recorded once
+    occurrences: int = Field(1, ge=1, description="Number of times this observation pattern was seen")
+    
     # Case tracking (for legal compliance)
     case_number: Optional[str] = Field(None, description="Investigation case number")
     investigator_id: Optional[str] = Field(None, description="Authorized investigator ID")
@@ -53,8 +58,16 @@ class TrafficObservation(BaseModel):
     notes: Optional[str] = Field(None, description="Investigator notes")
     created_at: datetime = Field(default_factory=datetime.utcnow, description="When observation was recorded")
     
+    # Not frozen: callers may record repeats by setting occurrences after
+    # construction. Pydantic models cannot declare field __slots__; hot
+    # paths work on the engine's columnar copies instead of the models.
     class Config:
         use_enum_values = True
+    
+    @validator('relay_fingerprint')
+    def intern_relay_fingerprint(cls, v):
+        """Share one string per fingerprint with the topology's relays"""
+        return canonical_fingerprint(v)
 
 
 class SessionPair(BaseModel):
@@ -128,7 +141,24 @@ class CorrelationCluster(BaseModel):
     # Overall cluster strength
     cluster_confidence: float = Field(0.0, description="Confidence that this is a real pattern (0-100)")
     
-    # Reasoning and explainability
-    reasoning: List[str] = Field(default_factory=list, description="Why this cluster was formed")
-    
     created_at: datetime = Field(default_factory=datetime.utcnow, description="When cluster was identified")
+    
+    # Reasoning and explainability. Derived from the fields above and
+    # formatted only when read (or serialized), so bulk clustering passes
+    # that never look at it do not pay for the strings
+    @computed_field(description="Why this cluster was formed")
+    @property
+    def reasoning(self) -> List[str]:
+        """Plain English explanation of the cluster"""
+        if not self.session_pair_ids or not self.probable_guards:
+            return []
+        span_hours = (self.last_observation - self.first_observation).total_seconds() / 3600
+        reasoning = [
+            f"Found {len(self.session_pair_ids)} correlated session pairs",
+            f"All pairs share hypothesized guard: {self.probable_guards[0]}",
+            f"Average correlation strength: {self.consistency_score:.1f}%",
+            f"Observations span {span_hours:.1f} hours",
+        ]
+        if self.guard_persistence_score > 70:
+            reasoning.append("Strong guard persistence indicates consistent user behavior")
+        return reasoning
@@ -2,11 +2,16 @@
 Data models for TOR network topology and relay information
 Based on official TOR Project relay descriptor specifications
 """
-from datetime import datetime
-from typing import Optional, List, Dict, Any
-from pydantic import BaseModel, Field, validator
+import re
+import sys
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Optional, List, Dict, Any, Tuple
+from pydantic import BaseModel, Field, PrivateAttr, computed_field, validator
 from enum import Enum
 
+import numpy as np
+
 
 class RelayFlags(str, Enum):
     """Official TOR relay flags as defined in dir-spec.txt"""
@@ -22,6 +27,76 @@ class RelayFlags(str, Enum):
     V2DIR = "V2Dir"
 
 
+# Bit assigned to each flag when a relay's flags are packed into an integer mask
+FLAG_RUNNING = 1 << 0
+FLAG_VALID = 1 << 1
+FLAG_GUARD = 1 << 2
+FLAG_EXIT = 1 << 3
+FLAG_FAST = 1 << 4
+FLAG_STABLE = 1 << 5
+FLAG_HS_DIR = 1 << 6
+FLAG_V2DIR = 1 << 7
+FLAG_AUTHORITY = 1 << 8
+FLAG_BAD_EXIT = 1 << 9
+
+FLAG_BITS: Dict[str, int] = {
+    RelayFlags.RUNNING.value: FLAG_RUNNING,
+    RelayFlags.VALID.value: FLAG_VALID,
+    RelayFlags.GUARD.value: FLAG_GUARD,
+    RelayFlags.EXIT.value: FLAG_EXIT,
+    RelayFlags.FAST.value: FLAG_FAST,
+    RelayFlags.STABLE.value: FLAG_STABLE,
+    RelayFlags.HS_DIR.value: FLAG_HS_DIR,
+    RelayFlags.V2DIR.value: FLAG_V2DIR,
+    RelayFlags.AUTHORITY.value: FLAG_AUTHORITY,
+    RelayFlags.BAD_EXIT.value: FLAG_BAD_EXIT,
+}
+
+
+# Flag (member or string value) -> string value; RelayFlags members hash and
+# compare equal to their values, so both find the same entry
+_FLAG_VALUES: Dict[str, str] = {flag: flag.value for flag in RelayFlags}
+
+
+def flags_to_mask(flags: List[str]) -> int:
+    """Pack a relay's flags (enum members or their string values) into a bitmask"""
+    mask = 0
+    for flag in flags:
+        mask |= FLAG_BITS.get(flag, 0)
+    return mask
+
+
+# Canonical fingerprint strings. The same relays appear in every snapshot, so
+# each fingerprint is stored once and compares by identity across snapshots.
+# Only relays add entries; client-supplied values are looked up, never added,
+# so the table is bounded by the relays seen in parsed topologies.
+_FP_INTERN: Dict[str, str] = {}
+
+# Relay fingerprints are 40 hex characters (SHA-1 digest)
+_FP_RE = re.compile(r"[0-9A-Fa-f]{40}")
+
+
+def check_fingerprint(fingerprint: str) -> str:
+    """Interned fingerprint; ValueError unless it is 40 hexadecimal characters"""
+    if len(fingerprint) != 40 or not _FP_RE.fullmatch(fingerprint):
+        raise ValueError(f"Fingerprint must be 40 hexadecimal characters, got {fingerprint!r}")
+    return intern_fingerprint(fingerprint)
+
+
+def intern_fingerprint(fingerprint: str) -> str:
+    """Return the canonical (interned) copy of a relay's own fingerprint"""
+    if not isinstance(fingerprint, str):
+        return fingerprint
+    return _FP_INTERN.setdefault(fingerprint, sys.intern(fingerprint))
+
+
+def canonical_fingerprint(fingerprint: str) -> str:
+    """The interned copy of a known relay fingerprint; other values are returned unchanged"""
+    if not isinstance(fingerprint, str):
+        return fingerprint
+    return _FP_INTERN.get(fingerprint, fingerprint)
+
+
 class TORRelay(BaseModel):
     """
     Represents a single TOR relay with its metadata
@@ -43,6 +118,7 @@ class TORRelay(BaseModel):
     
     # Relay flags (capabilities and characteristics)
     flags: List[RelayFlags] = Field(default_factory=list, description="Assigned flags by directory authorities")
+    flags_mask: int = Field(0, exclude=True, description="Computed: flags packed as FLAG_* bits")
     
     # Geographic and network information
     country_code: Optional[str] = Field(None, description="Two-letter ISO country code")
@@ -64,25 +140,121 @@ class TORRelay(BaseModel):
     
     # Metadata for our system
     snapshot_timestamp: datetime = Field(default_factory=datetime.utcnow, description="When we captured this data")
-    is_guard: bool = Field(False, description="Computed: Is this a guard-capable relay?")
-    is_exit: bool = Field(False, description="Computed: Is this an exit-capable relay?")
     
-    @validator('is_guard', always=True)
-    def compute_is_guard(cls, v, values):
-        """Determine if relay can serve as guard node"""
+    @validator('fingerprint')
+    def validate_fingerprint(cls, v):
+        """Check the 40-character hex format and intern the fingerprint"""
+        return check_fingerprint(v)
+    
+    @validator('flags_mask', always=True)
+    def compute_flags_mask(cls, v, values):
+        """Pack the relay flags into a bitmask"""
         if 'flags' in values:
-            return RelayFlags.GUARD in values['flags']
+            return flags_to_mask(values['flags'])
         return v
     
-    @validator('is_exit', always=True)
-    def compute_is_exit(cls, v, values):
+    @computed_field(description="Computed: Is this a guard-capable relay?")
+    @property
+    def is_guard(self) -> bool:
+        """Determine if relay can serve as guard node"""
+        return bool(self.flags_mask & FLAG_GUARD)
+    
+    @computed_field(description="Computed: Is this an exit-capable relay?")
+    @property
+    def is_exit(self) -> bool:
         """Determine if relay can serve as exit node"""
-        if 'flags' in values:
-            return RelayFlags.EXIT in values['flags'] and RelayFlags.BAD_EXIT not in values['flags']
-        return v
+        return bool(self.flags_mask & FLAG_EXIT) and not self.flags_mask & FLAG_BAD_EXIT
     
     class Config:
         use_enum_values = True
+    
+    @classmethod
+    def construct_unchecked(cls, **data: Any) -> "TORRelay":
+        """
+        Build a relay from trusted, well-typed fields without validation
+        
+        For the Onionoo parser, which checks and converts each field itself.
+        Flags (members or values) are stored as values and the fingerprint
+        is interned, as validation would; flags_mask is computed from flags.
+        """
+        flags = [_FLAG_VALUES[flag] for flag in data.get("flags", [])]
+        data["flags"] = flags
+        data["flags_mask"] = flags_to_mask(flags)
+        data["fingerprint"] = intern_fingerprint(data["fingerprint"])
+        return cls.model_construct(**data)
+
+
+_UNIX_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_ONE_MICROSECOND = timedelta(microseconds=1)
+
+
+def datetime_to_us(value: datetime) -> int:
+    """Exact microseconds since the Unix epoch; naive datetimes are taken as UTC"""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return (value - _UNIX_EPOCH) // _ONE_MICROSECOND
+
+
+@dataclass
+class TopologyArrays:
+    """
+    Columnar (structure-of-arrays) view of a snapshot's relays
+    
+    Row i describes snapshot.relays[i]. Used for vectorized analytics;
+    the Pydantic relays remain the source of truth for the API.
+    """
+    fingerprints: np.ndarray           # S40
+    observed_bandwidth: np.ndarray     # int64
+    advertised_bandwidth: np.ndarray   # int64
+    consensus_weight: np.ndarray       # int64
+    as_number: np.ndarray              # int64, -1 if unknown
+    flags: np.ndarray                  # uint16, FLAG_* bits
+    country: np.ndarray                # S2, empty if unknown
+    first_seen_us: np.ndarray          # int64, microseconds since the Unix epoch (UTC)
+    last_seen_us: np.ndarray           # int64, microseconds since the Unix epoch (UTC)
+    
+    @classmethod
+    def from_relays(cls, relays: List["TORRelay"]) -> "TopologyArrays":
+        """Build the columns in one pass over the relays"""
+        n = len(relays)
+        
+        # Relays share few distinct timestamps (every running relay's
+        # last_seen is the consensus time), so each is converted once
+        us_by_time: Dict[datetime, int] = {}
+        
+        def to_us(value: datetime) -> int:
+            us = us_by_time.get(value)
+            if us is None:
+                us = us_by_time[value] = datetime_to_us(value)
+            return us
+        
+        return cls(
+            fingerprints=np.array([r.fingerprint for r in relays], dtype="S40"),
+            observed_bandwidth=np.fromiter((r.observed_bandwidth for r in relays), dtype=np.int64, count=n),
+            advertised_bandwidth=np.fromiter((r.advertised_bandwidth for r in relays), dtype=np.int64, count=n),
+            consensus_weight=np.fromiter((r.consensus_weight for r in relays), dtype=np.int64, count=n),
+            as_number=np.fromiter(
+                (r.as_number if r.as_number is not None else -1 for r in relays),
+                dtype=np.int64, count=n
+            ),
+            flags=np.fromiter((r.flags_mask for r in relays), dtype=np.uint16, count=n),
+            country=np.array([r.country_code or "" for r in relays], dtype="S2"),
+            first_seen_us=np.fromiter((to_us(r.first_seen) for r in relays), dtype=np.int64, count=n),
+            last_seen_us=np.fromiter((to_us(r.last_seen) for r in relays), dtype=np.int64, count=n),
+        )
+    
+    def __len__(self) -> int:
+        return len(self.flags)
+    
+    @property
+    def is_guard(self) -> np.ndarray:
+        """Guard-capable relays (same rule as TORRelay.is_guard)"""
+        return (self.flags & FLAG_GUARD) != 0
+    
+    @property
+    def is_exit(self) -> np.ndarray:
+        """Exit-capable relays (same rule as TORRelay.is_exit)"""
+        return ((self.flags & FLAG_EXIT) != 0) & ((self.flags & FLAG_BAD_EXIT) == 0)
 
 
 class TopologySnapshot(BaseModel):
@@ -107,6 +279,96 @@ class TopologySnapshot(BaseModel):
     
     created_at: datetime = Field(default_factory=datetime.utcnow, description="When we created this snapshot")
     
+    _arrays: Optional[TopologyArrays] = PrivateAttr(default=None)
+    _fp_index: Optional[Dict[str, int]] = PrivateAttr(default=None)
+    _guard_cdf: Optional[Tuple[np.ndarray, np.ndarray]] = PrivateAttr(default=None)
+    _exit_cdf: Optional[Tuple[np.ndarray, np.ndarray]] = PrivateAttr(default=None)
+    
+    @property
+    def arrays(self) -> TopologyArrays:
+        """
+        Columnar view of the relays, built on first access
+        
+        The view is not refreshed if `relays` is mutated afterwards.
+        """
+        if self._arrays is None:
+            self._arrays = TopologyArrays.from_relays(self.relays)
+        return self._arrays
+    
+    @property
+    def fp_index(self) -> Dict[str, int]:
+        """
+        Fingerprint -> row in `relays` (and in `arrays`), built on first access
+        
+        Like `arrays`, the index is not refreshed if `relays` is mutated afterwards.
+        """
+        if self._fp_index is None:
+            self._fp_index = {r.fingerprint: i for i, r in enumerate(self.relays)}
+        return self._fp_index
+    
+    def relay_by_fp(self, fingerprint: str) -> Optional[TORRelay]:
+        """Look up a relay by fingerprint, None if it is not in this snapshot"""
+        idx = self.fp_index.get(fingerprint)
+        return self.relays[idx] if idx is not None else None
+    
+    def rows_by_weight(self, mask: np.ndarray) -> np.ndarray:
+        """
+        Rows of the relays in mask, by descending consensus weight
+        
+        Ties keep relay order, as a stable sort of the relays would.
+        """
+        rows = np.flatnonzero(mask)
+        return rows[np.argsort(-self.arrays.consensus_weight[rows], kind="stable")]
+    
+    def sample_guards(self, draws: np.ndarray) -> np.ndarray:
+        """
+        Pick guards with probability proportional to consensus weight
+        
+        Args:
+            draws: Uniform random numbers in [0, 1), one per guard to pick
+        
+        Returns:
+            Row indices into `relays`, one per draw
+        """
+        if self._guard_cdf is None:
+            self._guard_cdf = self._weight_cdf(self.arrays.is_guard)
+        return self._sample(self._guard_cdf, draws)
+    
+    def sample_exits(self, draws: np.ndarray) -> np.ndarray:
+        """Pick exits with probability proportional to consensus weight (see sample_guards)"""
+        if self._exit_cdf is None:
+            self._exit_cdf = self._weight_cdf(self.arrays.is_exit)
+        return self._sample(self._exit_cdf, draws)
+    
+    def _weight_cdf(self, mask: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """(row indices, cumulative weight share) of the relays in mask"""
+        idx = np.flatnonzero(mask)
+        weights = self.arrays.consensus_weight[idx].astype(np.float64)
+        total = weights.sum()
+        if total > 0:
+            cdf = np.cumsum(weights) / total
+        else:
+            # No weights published: fall back to a uniform choice
+            cdf = np.arange(1, len(idx) + 1) / max(len(idx), 1)
+        return idx, cdf
+    
+    @staticmethod
+    def _sample(idx_cdf: Tuple[np.ndarray, np.ndarray], draws: np.ndarray) -> np.ndarray:
+        idx, cdf = idx_cdf
+        if len(idx) == 0:
+            raise ValueError("No relays to sample from")
+        pos = np.searchsorted(cdf, draws, side="right")
+        return idx[np.minimum(pos, len(idx) - 1)]
+    
+    def compute_statistics(self) -> None:
+        """Fill the relay counts and bandwidth statistics from the relays"""
+        arrays = self.arrays
+        self.total_relays = len(arrays)
+        self.guard_relays = int(np.count_nonzero(arrays.is_guard))
+        self.exit_relays = int(np.count_nonzero(arrays.is_exit))
+        self.total_bandwidth = int(arrays.observed_bandwidth.sum())
+        self.avg_bandwidth = float(arrays.observed_bandwidth.mean()) if self.total_relays > 0 else 0.0
+    
     class Config:
         json_schema_extra = {
             "example": {
@@ -119,40 +381,109 @@ class TopologySnapshot(BaseModel):
         }
 
 
-class RelayEdge(BaseModel):
+@dataclass(slots=True, frozen=True)
+class RelayEdge:
     """
     Represents a potential path segment in the TOR network
     Used for graph-based analysis
+    
+    A slotted dataclass rather than a Pydantic model: edges are generated
+    internally in bulk, so only the checks in __post_init__ are applied.
     """
-    source_fingerprint: str = Field(..., description="Source relay fingerprint")
-    target_fingerprint: str = Field(..., description="Target relay fingerprint")
-    edge_type: str = Field(..., description="Type of connection (guard->middle, middle->exit, etc.)")
-    probability: float = Field(0.0, description="Computed probability of this path segment")
+    source_fingerprint: str  # Source relay fingerprint
+    target_fingerprint: str  # Target relay fingerprint
+    edge_type: str           # Type of connection (guard->middle, middle->exit, etc.)
+    probability: float = 0.0  # Computed probability of this path segment
     
     # Path constraints (why this edge exists or doesn't)
-    same_family: bool = Field(False, description="Are these relays in the same family?")
-    same_subnet: bool = Field(False, description="Are these relays in the same /16 subnet?")
-    valid_path: bool = Field(True, description="Is this a valid path segment per TOR rules?")
+    same_family: bool = False  # Are these relays in the same family?
+    same_subnet: bool = False  # Are these relays in the same /16 subnet?
+    valid_path: bool = True    # Is this a valid path segment per TOR rules?
+    
+    def __post_init__(self):
+        if not 0.0 <= self.probability <= 1.0:
+            raise ValueError(f"Edge probability must be between 0 and 1, got {self.probability}")
+        object.__setattr__(self, "source_fingerprint", canonical_fingerprint(self.source_fingerprint))
+        object.__setattr__(self, "target_fingerprint", canonical_fingerprint(self.target_fingerprint))
 
 
-class TORCircuit(BaseModel):
+@dataclass(slots=True, frozen=True)
+class TORCircuit:
     """
     Represents a hypothetical 3-hop TOR circuit
     Used for correlation analysis
+    
+    A slotted dataclass rather than a Pydantic model, for the same reason
+    as RelayEdge.
     """
-    circuit_id: str = Field(..., description="Unique identifier for this circuit hypothesis")
+    circuit_id: str  # Unique identifier for this circuit hypothesis
     
     # The three hops
-    guard_fingerprint: str = Field(..., description="Entry/Guard relay")
-    middle_fingerprint: str = Field(..., description="Middle relay")
-    exit_fingerprint: str = Field(..., description="Exit relay")
+    guard_fingerprint: str   # Entry/Guard relay
+    middle_fingerprint: str  # Middle relay
+    exit_fingerprint: str    # Exit relay
     
     # Path validation
-    is_valid_circuit: bool = Field(True, description="Does this circuit satisfy TOR path selection rules?")
-    path_constraints_met: List[str] = Field(default_factory=list, description="Which constraints are satisfied")
+    is_valid_circuit: bool = True  # Does this circuit satisfy TOR path selection rules?
+    path_constraints_met: List[str] = field(default_factory=list)  # Which constraints are satisfied
     
     # Temporal information
-    hypothesized_at: datetime = Field(default_factory=datetime.utcnow, description="When we hypothesized this circuit")
+    hypothesized_at: datetime = field(default_factory=datetime.utcnow)  # When we hypothesized this circuit
     
     # For correlation analysis
-    probability_score: float = Field(0.0, description="Likelihood this circuit was actually used")
+    probability_score: float = 0.0  # Likelihood this circuit was actually used
+    
+    def __post_init__(self):
+        if not 0.0 <= self.probability_score <= 1.0:
+            raise ValueError(f"Circuit probability must be between 0 and 1, got {self.probability_score}")
+        for name in ("guard_fingerprint", "middle_fingerprint", "exit_fingerprint"):
+            object.__setattr__(self, name, canonical_fingerprint(getattr(self, name)))
+
+
+# Edge type codes used by RelayAdjacency; the code is the index into EDGE_TYPES
+EDGE_GUARD_MIDDLE = 0
+EDGE_MIDDLE_EXIT = 1
+EDGE_GUARD_EXIT = 2
+EDGE_TYPES = ("guard->middle", "middle->exit", "guard->exit")
+
+
+@dataclass
+class RelayAdjacency:
+    """
+    Relay edges in compressed sparse row (CSR) layout
+    
+    Rows and columns are relay rows of a snapshot. The edges leaving
+    relay i are col_idx[row_ptr[i]:row_ptr[i + 1]], with matching entries
+    in probability and edge_type. RelayEdge objects are only built on
+    request, for API output.
+    """
+    row_ptr: np.ndarray      # int32, n_relays + 1
+    col_idx: np.ndarray      # int32, target relay row per edge
+    probability: np.ndarray  # float32 per edge
+    edge_type: np.ndarray    # uint8 per edge, EDGE_* code
+    
+    @property
+    def num_edges(self) -> int:
+        return len(self.col_idx)
+    
+    def neighbors(self, row: int) -> np.ndarray:
+        """Target relay rows of the edges leaving `row`"""
+        return self.col_idx[self.row_ptr[row]:self.row_ptr[row + 1]]
+    
+    def edges(self, row: int, relays: List[TORRelay]) -> List[RelayEdge]:
+        """Materialize the edges leaving `row` as RelayEdge objects"""
+        start, end = int(self.row_ptr[row]), int(self.row_ptr[row + 1])
+        source = relays[row].fingerprint
+        return [
+            RelayEdge(
+                source_fingerprint=source,
+                target_fingerprint=relays[j].fingerprint,
+                edge_type=EDGE_TYPES[t],
+                probability=float(p)
+            )
+            for j, p, t in zip(
+                self.col_idx[start:end].tolist(),
+                self.probability[start:end].tolist(),
+                self.edge_type[start:end].tolist()
+            )
+        ]
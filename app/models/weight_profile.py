@@ -4,11 +4,13 @@ Weight Profile Models
 Configurable weight profiles for different investigation types.
 Allows customization of correlation scoring weights per case.
 """
-from pydantic import BaseModel, field_validator, model_validator
-from typing import Optional
+from pydantic import BaseModel, Field, field_validator, model_validator
+from typing import Iterable, Optional, Tuple
 from datetime import datetime
 from enum import Enum
 
+import numpy as np
+
 
 class ProfileType(str, Enum):
     """Predefined investigation profile types"""
@@ -19,6 +21,29 @@ class ProfileType(str, Enum):
     CUSTOM = "custom"  # User-defined weights
 
 
+def _check_weight_range(weights: Iterable[float]) -> None:
+    """Raise ValueError if any weight is outside [0, 1]"""
+    for weight in weights:
+        if not 0 <= weight <= 1:
+            raise ValueError(f"Weight must be between 0 and 1, got {weight}")
+
+
+def validate_weight_rows(weights: np.ndarray) -> np.ndarray:
+    """
+    Check many weight triples at once
+    
+    Args:
+        weights: Array of shape (n, 3) with time, volume and pattern weights per row
+    
+    Returns:
+        Boolean array, True where a row is in range and sums to 1.0
+        (same tolerance as WeightProfile.validate_weights_sum)
+    """
+    weights = np.asarray(weights, dtype=np.float64)
+    in_range = ((weights >= 0) & (weights <= 1)).all(axis=1)
+    return in_range & (np.abs(weights.sum(axis=1) - 1.0) < 0.0001)
+
+
 class WeightProfile(BaseModel):
     """
     Correlation weight profile for an investigation
@@ -38,23 +63,28 @@ class WeightProfile(BaseModel):
     # Metadata
     case_id: Optional[str] = None  # Associated case/investigation
     created_by: Optional[str] = None  # Investigator who created profile
-    created_at: Optional[datetime] = None
+    created_at: Optional[datetime] = Field(None, validate_default=True)
     description: Optional[str] = None
     
+    @field_validator('created_at')
+    def default_created_at(cls, v):
+        """Set created_at to now if not provided"""
+        return v if v is not None else datetime.now()
+    
     @model_validator(mode='after')
-    def set_defaults(self):
-        """Set default created_at if not provided"""
-        if self.created_at is None:
-            self.created_at = datetime.now()
+    def check_weights(self):
+        """Check weight ranges"""
+        _check_weight_range(self.weights)
         return self
     
-    @field_validator('weight_time_correlation', 'weight_volume_similarity', 'weight_pattern_similarity')
-    @classmethod
-    def validate_weight_range(cls, v):
-        """Ensure weights are between 0 and 1"""
-        if not 0 <= v <= 1:
-            raise ValueError(f"Weight must be between 0 and 1, got {v}")
-        return v
+    @property
+    def weights(self) -> Tuple[float, float, float]:
+        """(time, volume, pattern) weights, in scoring order"""
+        return (
+            self.weight_time_correlation,
+            self.weight_volume_similarity,
+            self.weight_pattern_similarity
+        )
     
     def validate_weights_sum(self) -> bool:
         """
@@ -65,12 +95,11 @@ class WeightProfile(BaseModel):
         
         Raises:
             ValueError if weights don't sum to 1.0
+        
+        Not cached: the engine only checks a profile when it is assigned,
+        never per correlation.
         """
-        total = (
-            self.weight_time_correlation +
-            self.weight_volume_similarity +
-            self.weight_pattern_similarity
-        )
+        total = sum(self.weights)
         
         # Allow small floating-point tolerance
         if not abs(total - 1.0) < 0.0001:
@@ -83,7 +112,10 @@ class WeightProfile(BaseModel):
         
         return True
     
+    # Frozen: predefined profiles are shared by every get_profile caller, and
+    # engines snapshot the weights when a profile is assigned
     class Config:
+        frozen = True
         json_schema_extra = {
             "example": {
                 "profile_id": "case-2025-001-standard",
@@ -99,45 +131,52 @@ class WeightProfile(BaseModel):
         }
 
 
+_PREDEFINED_CREATED_AT = datetime.now()
+
 # Predefined weight profiles for common investigation types
+# (developer-controlled constants, so they skip validation via model_construct)
 PREDEFINED_PROFILES = {
-    ProfileType.STANDARD: WeightProfile(
+    ProfileType.STANDARD: WeightProfile.model_construct(
         profile_id="standard",
         profile_name="Standard Balanced Profile",
         profile_type=ProfileType.STANDARD,
         weight_time_correlation=0.40,
         weight_volume_similarity=0.30,
         weight_pattern_similarity=0.30,
+        created_at=_PREDEFINED_CREATED_AT,
         description="Balanced weights suitable for most investigations. Equal consideration of all signals."
     ),
     
-    ProfileType.TIME_FOCUSED: WeightProfile(
+    ProfileType.TIME_FOCUSED: WeightProfile.model_construct(
         profile_id="time-focused",
         profile_name="Time-Focused Profile",
         profile_type=ProfileType.TIME_FOCUSED,
         weight_time_correlation=0.60,
         weight_volume_similarity=0.20,
         weight_pattern_similarity=0.20,
+        created_at=_PREDEFINED_CREATED_AT,
         description="Prioritizes temporal correlation. Use when precise timing is critical (e.g., coordinated attacks)."
     ),
     
-    ProfileType.VOLUME_FOCUSED: WeightProfile(
+    ProfileType.VOLUME_FOCUSED: WeightProfile.model_construct(
         profile_id="volume-focused",
         profile_name="Volume-Focused Profile",
         profile_type=ProfileType.VOLUME_FOCUSED,
         weight_time_correlation=0.25,
         weight_volume_similarity=0.50,
         weight_pattern_similarity=0.25,
+        created_at=_PREDEFINED_CREATED_AT,
         description="Prioritizes data volume matching. Use for data exfiltration or large file transfer cases."
     ),
     
-    ProfileType.PATTERN_FOCUSED: WeightProfile(
+    ProfileType.PATTERN_FOCUSED: WeightProfile.model_construct(
         profile_id="pattern-focused",
         profile_name="Pattern-Focused Profile",
         profile_type=ProfileType.PATTERN_FOCUSED,
         weight_time_correlation=0.25,
         weight_volume_similarity=0.25,
         weight_pattern_similarity=0.50,
+        created_at=_PREDEFINED_CREATED_AT,
         description="Prioritizes behavioral patterns. Use for habitual offenders or long-term surveillance."
     ),
 }
@@ -151,7 +190,7 @@ def get_profile(profile_type: ProfileType) -> WeightProfile:
         profile_type: Type of profile to retrieve
     
     Returns:
-        WeightProfile instance
+        WeightProfile instance, the same (frozen) one on every call
     """
     return PREDEFINED_PROFILES[profile_type]
 
@@ -185,15 +224,20 @@ def create_custom_profile(
     Raises:
         ValueError: If weights don't sum to 1.0 or are out of range
     """
-    profile = WeightProfile(
+    # Same range check as the model validator, done up front so the
+    # profile can be built without a full validation pass
+    _check_weight_range((weight_time, weight_volume, weight_pattern))
+    
+    profile = WeightProfile.model_construct(
         profile_id=profile_id,
         profile_name=profile_name,
         profile_type=ProfileType.CUSTOM,
-        weight_time_correlation=weight_time,
-        weight_volume_similarity=weight_volume,
-        weight_pattern_similarity=weight_pattern,
+        weight_time_correlation=float(weight_time),
+        weight_volume_similarity=float(weight_volume),
+        weight_pattern_similarity=float(weight_pattern),
         case_id=case_id,
         created_by=created_by,
+        created_at=datetime.now(),
         description=description
     )
     
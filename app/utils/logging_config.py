@@ -2,6 +2,7 @@
 Logging configuration for the application
 """
 import logging
+import logging.handlers
 import sys
 from pathlib import Path
 from datetime import datetime
@@ -9,12 +10,34 @@ from datetime import datetime
 from config import settings
 
 
+# Formatters are shared by every handler setup_logging creates
+_CONSOLE_FORMATTER = logging.Formatter(
+    '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    datefmt='%Y-%m-%d %H:%M:%S'
+)
+_FILE_FORMATTER = logging.Formatter(
+    '%(asctime)s - %(name)s - %(levelname)s - [%(filename)s:%(lineno)d] - %(message)s',
+    datefmt='%Y-%m-%d %H:%M:%S'
+)
+
+# Log file rotation
+_LOG_MAX_BYTES = 10 * 1024 * 1024  # 10 MB
+_LOG_BACKUP_COUNT = 5
+
+_configured = False
+
+
 def setup_logging():
     """
     Configure application-wide logging
     
-    Logs to both console and file for audit trail
+    Logs to both console and file for audit trail. Only the first call
+    configures handlers; later calls (tests, re-imports) are no-ops.
     """
+    global _configured
+    if _configured:
+        return
+    
     # Create logs directory
     logs_dir = settings.BASE_DIR / "logs"
     logs_dir.mkdir(exist_ok=True)
@@ -32,24 +55,22 @@ def setup_logging():
     # Console handler
     console_handler = logging.StreamHandler(sys.stdout)
     console_handler.setLevel(logging.INFO)
-    console_formatter = logging.Formatter(
-        '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        datefmt='%Y-%m-%d %H:%M:%S'
-    )
-    console_handler.setFormatter(console_formatter)
+    console_handler.setFormatter(_CONSOLE_FORMATTER)
     
     # File handler (more detailed)
-    file_handler = logging.FileHandler(log_filename, encoding='utf-8')
-    file_handler.setLevel(logging.DEBUG)
-    file_formatter = logging.Formatter(
-        '%(asctime)s - %(name)s - %(levelname)s - [%(filename)s:%(lineno)d] - %(message)s',
-        datefmt='%Y-%m-%d %H:%M:%S'
+    file_handler = logging.handlers.RotatingFileHandler(
+        log_filename,
+        maxBytes=_LOG_MAX_BYTES,
+        backupCount=_LOG_BACKUP_COUNT,
+        encoding='utf-8'
     )
-    file_handler.setFormatter(file_formatter)
+    file_handler.setLevel(logging.DEBUG)
+    file_handler.setFormatter(_FILE_FORMATTER)
     
     # Add handlers
     root_logger.addHandler(console_handler)
     root_logger.addHandler(file_handler)
+    _configured = True
     
     # Log startup
     root_logger.info("=" * 80)
@@ -5,15 +5,22 @@ Generates realistic TOR traffic observations for testing the correlation engine.
 This is for PoC demonstration - in production, data would come from actual
 network monitoring (with proper legal authorization).
 """
+import itertools
 import random
-import uuid
 from datetime import datetime, timedelta
-from typing import List
+from typing import Callable, Iterator, List, Sequence
+
+import numpy as np
 
 from app.models.correlation import TrafficObservation, ObservationType
 from app.models.topology import TopologySnapshot
 
 
+# Session ids, shared by all generators: each API request builds its own
+# generator, and the observations all land in the same store
+_session_counter = itertools.count(1)
+
+
 class SyntheticDataGenerator:
     """
     Generates synthetic TOR traffic observations
@@ -26,8 +33,20 @@ class SyntheticDataGenerator:
     
     def __init__(self, topology: TopologySnapshot):
         self.topology = topology
-        self.guards = [r for r in topology.relays if r.is_guard]
-        self.exits = [r for r in topology.relays if r.is_exit]
+    
+    @property
+    def topology(self) -> TopologySnapshot:
+        """Topology snapshot; assigning one also rebuilds the relay lookups"""
+        return self._topology
+    
+    @topology.setter
+    def topology(self, topology: TopologySnapshot) -> None:
+        self._topology = topology
+        # Relay fingerprints by topology row, for the sampled picks
+        self._fingerprints = tuple(r.fingerprint for r in topology.relays)
+        # Two lookups per session; a plain dict skips the snapshot's
+        # fingerprint index, whose private attribute access is slow on models
+        self._ip_by_fp = {r.fingerprint: r.address for r in topology.relays}
     
     def generate_session(
         self,
@@ -48,47 +67,86 @@ class SyntheticDataGenerator:
         Returns:
             Tuple of (entry_observation, exit_observation)
         """
+        # Drawn in a fixed order, so a seeded run gives the same sessions
+        entry_bytes = random.randint(50000, 5000000)  # 50KB to 5MB
+        entry_port = random.randint(40000, 65000)
+        entry_packets = random.randint(100, 1000)
+        
+        # Slight timing variation (TOR circuit overhead)
+        exit_delay = random.uniform(0.1, 2.0)
+        exit_bytes = int(entry_bytes * random.uniform(0.95, 1.05))  # Similar but not exact
+        exit_port = random.randint(40000, 65000)
+        exit_packets = random.randint(100, 1000)
+        
+        return self._session_pair(
+            base_time, guard_fingerprint, exit_fingerprint, duration,
+            entry_bytes=entry_bytes,
+            exit_delay=exit_delay,
+            exit_bytes=exit_bytes,
+            ports=(entry_port, exit_port),
+            packets=(entry_packets, exit_packets)
+        )
+    
+    def _session_pair(
+        self,
+        entry_time: datetime,
+        guard_fingerprint: str,
+        exit_fingerprint: str,
+        duration: float,
+        entry_bytes: int,
+        exit_delay: float,
+        exit_bytes: int,
+        ports: Sequence[int],
+        packets: Sequence[int]
+    ) -> tuple[TrafficObservation, TrafficObservation]:
+        """
+        Entry/exit observations of one session from already drawn values
+        
+        ports and packets are (entry, exit) pairs.
+        """
         # Session ID for correlation
-        session_id = str(uuid.uuid4())[:8]
+        session_id = f"{next(_session_counter):08x}"
         
         # Entry observation (at guard)
-        entry_time = base_time
-        entry_bytes = random.randint(50000, 5000000)  # 50KB to 5MB
-        
-        entry_obs = TrafficObservation(
-            observation_id=f"entry-{session_id}",
-            observation_type=ObservationType.ENTRY_OBSERVED,
-            timestamp=entry_time,
-            duration=duration,
-            observed_ip=self._get_relay_ip(guard_fingerprint),
-            observed_port=random.randint(40000, 65000),
-            relay_fingerprint=guard_fingerprint,
-            bytes_transferred=entry_bytes,
-            packets_count=random.randint(100, 1000),
-            source="synthetic",
-            notes=f"Synthetic session {session_id}"
+        entry_obs = self._observation(
+            ObservationType.ENTRY_OBSERVED, session_id, entry_time, duration,
+            guard_fingerprint, ports[0], entry_bytes, packets[0]
         )
         
         # Exit observation (at exit relay)
-        # Add slight timing variation (TOR circuit overhead)
-        exit_time = entry_time + timedelta(seconds=random.uniform(0.1, 2.0))
-        exit_bytes = int(entry_bytes * random.uniform(0.95, 1.05))  # Similar but not exact
+        exit_obs = self._observation(
+            ObservationType.EXIT_OBSERVED, session_id, entry_time + timedelta(seconds=exit_delay),
+            duration, exit_fingerprint, ports[1], exit_bytes, packets[1]
+        )
         
-        exit_obs = TrafficObservation(
-            observation_id=f"exit-{session_id}",
-            observation_type=ObservationType.EXIT_OBSERVED,
-            timestamp=exit_time,
+        return entry_obs, exit_obs
+    
+    def _observation(
+        self,
+        observation_type: ObservationType,
+        session_id: str,
+        timestamp: datetime,
+        duration: float,
+        fingerprint: str,
+        port: int,
+        size: int,
+        packets: int
+    ) -> TrafficObservation:
+        """One entry or exit observation of a synthetic session"""
+        prefix = "entry" if observation_type == ObservationType.ENTRY_OBSERVED else "exit"
+        return TrafficObservation(
+            observation_id=f"{prefix}-{session_id}",
+            observation_type=observation_type,
+            timestamp=timestamp,
             duration=duration,
-            observed_ip=self._get_relay_ip(exit_fingerprint),
-            observed_port=random.randint(40000, 65000),
-            relay_fingerprint=exit_fingerprint,
-            bytes_transferred=exit_bytes,
-            packets_count=random.randint(100, 1000),
+            observed_ip=self._get_relay_ip(fingerprint),
+            observed_port=port,
+            relay_fingerprint=fingerprint,
+            bytes_transferred=size,
+            packets_count=packets,
             source="synthetic",
             notes=f"Synthetic session {session_id}"
         )
-        
-        return entry_obs, exit_obs
     
     def generate_user_sessions(
         self,
@@ -109,32 +167,63 @@ class SyntheticDataGenerator:
         Returns:
             Tuple of (entry_observations, exit_observations)
         """
-        entry_observations = []
-        exit_observations = []
+        return self._split_pairs(self.iter_user_sessions(
+            num_sessions, base_time, time_spread_hours, guard_persistence
+        ))
+    
+    def iter_user_sessions(
+        self,
+        num_sessions: int,
+        base_time: datetime,
+        time_spread_hours: int = 24,
+        guard_persistence: bool = True
+    ) -> Iterator[tuple[TrafficObservation, TrafficObservation]]:
+        """
+        Yield the (entry, exit) observations of generate_user_sessions one session at a time
         
+        Nothing is drawn until the first session is requested; consumed in
+        full, the sessions are the same as generate_user_sessions would return.
+        """
         # Select a persistent guard if enabled
-        persistent_guard = random.choice(self.guards).fingerprint if guard_persistence else None
+        persistent_guard = self._pick_relays(self.topology.sample_guards, 1)[0] if guard_persistence else None
+        
+        # Select relays for all sessions up front
+        guards = self._pick_relays(self.topology.sample_guards, num_sessions)
+        exits = self._pick_relays(self.topology.sample_exits, num_sessions)
         
-        for i in range(num_sessions):
+        # Draw every session's random values in batches, with the same
+        # distributions as generate_session. The generator is seeded from
+        # `random`, so random.seed() still makes runs reproducible
+        rng = np.random.default_rng(random.getrandbits(64))
+        offsets_h = rng.uniform(0, time_spread_hours, num_sessions).tolist()
+        durations = rng.uniform(30.0, 300.0, num_sessions).tolist()
+        entry_bytes = rng.integers(50000, 5000000, num_sessions, endpoint=True)
+        exit_bytes = (entry_bytes * rng.uniform(0.95, 1.05, num_sessions)).astype(np.int64).tolist()
+        exit_delays = rng.uniform(0.1, 2.0, num_sessions).tolist()
+        ports = rng.integers(40000, 65000, (num_sessions, 2), endpoint=True).tolist()
+        packets = rng.integers(100, 1000, (num_sessions, 2), endpoint=True).tolist()
+        
+        for i, entry_size in enumerate(entry_bytes.tolist()):
             # Random time within spread
-            session_time = base_time + timedelta(hours=random.uniform(0, time_spread_hours))
+            session_time = base_time + timedelta(hours=offsets_h[i])
             
-            # Select relays
-            guard = persistent_guard if persistent_guard else random.choice(self.guards).fingerprint
-            exit_relay = random.choice(self.exits).fingerprint
+            guard = persistent_guard if persistent_guard else guards[i]
+            exit_relay = exits[i]
             
             # Generate session
-            entry_obs, exit_obs = self.generate_session(
+            entry_obs, exit_obs = self._session_pair(
                 session_time,
                 guard,
                 exit_relay,
-                duration=random.uniform(30.0, 300.0)
+                durations[i],
+                entry_bytes=entry_size,
+                exit_delay=exit_delays[i],
+                exit_bytes=exit_bytes[i],
+                ports=ports[i],
+                packets=packets[i]
             )
             
-            entry_observations.append(entry_obs)
-            exit_observations.append(exit_obs)
-        
-        return entry_observations, exit_observations
+            yield entry_obs, exit_obs
     
     def generate_noise_observations(
         self,
@@ -147,30 +236,72 @@ class SyntheticDataGenerator:
         
         These represent other users' traffic that should NOT correlate
         """
-        entry_observations = []
-        exit_observations = []
+        return self._split_pairs(self.iter_noise_observations(
+            num_observations, base_time, time_spread_hours
+        ))
+    
+    def iter_noise_observations(
+        self,
+        num_observations: int,
+        base_time: datetime,
+        time_spread_hours: int = 24
+    ) -> Iterator[tuple[TrafficObservation, TrafficObservation]]:
+        """Yield the (entry, exit) observations of generate_noise_observations one at a time"""
+        guards = self._pick_relays(self.topology.sample_guards, num_observations)
+        exits = self._pick_relays(self.topology.sample_exits, num_observations)
+        
+        # The entry and exit of a noise pair come from two unrelated
+        # sessions, so their times and volumes are drawn independently
+        # (column 0: entry, column 1: exit). Only the kept observation of
+        # each session is built. Seeded from `random`, as in iter_user_sessions
+        rng = np.random.default_rng(random.getrandbits(64))
+        offsets_h = rng.uniform(0, time_spread_hours, (num_observations, 2)).tolist()
+        exit_delays = rng.uniform(0.1, 2.0, num_observations).tolist()
+        sizes = rng.integers(50000, 5000000, (num_observations, 2), endpoint=True)
+        sizes[:, 1] = sizes[:, 1] * rng.uniform(0.95, 1.05, num_observations)
+        sizes = sizes.tolist()
+        ports = rng.integers(40000, 65000, (num_observations, 2), endpoint=True).tolist()
+        packets = rng.integers(100, 1000, (num_observations, 2), endpoint=True).tolist()
         
         for i in range(num_observations):
-            session_time = base_time + timedelta(hours=random.uniform(0, time_spread_hours))
-            
-            guard = random.choice(self.guards).fingerprint
-            exit_relay = random.choice(self.exits).fingerprint
-            
-            # Generate observations but with random time offsets (no correlation)
-            entry_obs, _ = self.generate_session(session_time, guard, exit_relay)
+            entry_obs = self._observation(
+                ObservationType.ENTRY_OBSERVED, f"{next(_session_counter):08x}",
+                base_time + timedelta(hours=offsets_h[i][0]), 60.0,
+                guards[i], ports[i][0], sizes[i][0], packets[i][0]
+            )
             
             # Exit observation at completely different time
-            exit_time = base_time + timedelta(hours=random.uniform(0, time_spread_hours))
-            _, exit_obs = self.generate_session(exit_time, guard, exit_relay)
+            exit_obs = self._observation(
+                ObservationType.EXIT_OBSERVED, f"{next(_session_counter):08x}",
+                base_time + timedelta(hours=offsets_h[i][1], seconds=exit_delays[i]), 60.0,
+                exits[i], ports[i][1], sizes[i][1], packets[i][1]
+            )
             
+            yield entry_obs, exit_obs
+    
+    @staticmethod
+    def _split_pairs(
+        pairs: Iterator[tuple[TrafficObservation, TrafficObservation]]
+    ) -> tuple[List[TrafficObservation], List[TrafficObservation]]:
+        """Collect (entry, exit) pairs into entry and exit lists"""
+        entry_observations = []
+        exit_observations = []
+        for entry_obs, exit_obs in pairs:
             entry_observations.append(entry_obs)
             exit_observations.append(exit_obs)
-        
         return entry_observations, exit_observations
     
+    def _pick_relays(self, sample: Callable[[np.ndarray], np.ndarray], k: int) -> List[str]:
+        """
+        Fingerprints of k relays picked by consensus weight, as TOR path selection does
+        
+        The k uniform draws are made in one batch by a NumPy generator seeded
+        from the `random` module, so random.seed() still makes runs reproducible.
+        """
+        rows = sample(np.random.default_rng(random.getrandbits(64)).random(k))
+        fingerprints = self._fingerprints
+        return [fingerprints[i] for i in rows.tolist()]
+    
     def _get_relay_ip(self, fingerprint: str) -> str:
         """Get IP address for a relay fingerprint"""
-        for relay in self.topology.relays:
-            if relay.fingerprint == fingerprint:
-                return relay.address
-        return "0.0.0.0"
+        return self._ip_by_fp.get(fingerprint, "0.0.0.0")
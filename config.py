@@ -2,15 +2,20 @@
 Configuration management for TOR Correlation System
 Centralized settings for all system components
 """
+from functools import lru_cache
 from pathlib import Path
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import List, Optional
 
 
 class Settings(BaseSettings):
     """
     Application-wide configuration settings
     Uses environment variables when available, falls back to defaults
+    
+    Kept as BaseSettings for the .env layering and type coercion (e.g. the
+    JSON CORS_ORIGINS list); it is built once and read per analysis call,
+    not per scored pair. Not frozen: tests override limits in place.
     """
     
     # Application metadata
@@ -24,11 +29,20 @@ class Settings(BaseSettings):
     API_RELOAD: bool = True
     API_DEBUG: bool = True
     
+    # Origins allowed to call the API from a browser (JSON list in the
+    # environment, e.g. CORS_ORIGINS='["https://dashboard.example"]')
+    CORS_ORIGINS: List[str] = [
+        "http://localhost:3000",
+        "http://localhost:8000",
+        "http://127.0.0.1:8000",
+    ]
+    
     # Project paths
     BASE_DIR: Path = Path(__file__).parent
     DATA_DIR: Path = BASE_DIR / "data"
     RAW_DATA_DIR: Path = DATA_DIR / "raw"
     PROCESSED_DATA_DIR: Path = DATA_DIR / "processed"
+    SNAPSHOT_CACHE_DIR: Path = DATA_DIR / "cache"  # Parsed snapshots keyed by source hash
     OBSERVATIONS_DIR: Path = DATA_DIR / "observations"
     DATABASE_DIR: Path = BASE_DIR / "database"
     REPORTS_DIR: Path = BASE_DIR / "reports"
@@ -47,10 +61,26 @@ class Settings(BaseSettings):
     MAX_RELAY_AGE: int = 86400  # seconds (24 hours)
     ENABLE_AUTO_REFRESH: bool = False  # Manual refresh for PoC
     
+    # Saved snapshots are pickled; also write a JSON copy of each, for reading
+    # by hand or with other tools
+    DEBUG_JSON_SNAPSHOTS: bool = False
+    
     # Correlation Engine Settings
     # Time correlation window (how close entry/exit timestamps must be)
     TIME_CORRELATION_WINDOW: int = 300  # seconds (5 minutes)
     
+    # Time score decay over the window: "exponential" (1/e at the window)
+    # or "log" (100 / (1 + log1p(dt / window)), a slower, heavier-tailed decay)
+    TIME_DECAY_FUNCTION: str = "exponential"
+    
+    # Volume similarity: "ratio" (exact min/max byte ratio) or "log_bucket"
+    # (quarter-octave byte buckets, scored by table lookup on bucket distance)
+    VOLUME_SIMILARITY_MODE: str = "ratio"
+    
+    # Timing pattern similarity: "length" (packet count ratio) or "correlation"
+    # (Pearson correlation of the inter-packet timings, length ratio below 3 samples)
+    PATTERN_SIMILARITY_MODE: str = "length"
+    
     # Minimum confidence threshold for reporting (0-100)
     MIN_CONFIDENCE_THRESHOLD: float = 30.0
     
@@ -60,6 +90,7 @@ class Settings(BaseSettings):
     # Analysis parameters
     MIN_OBSERVATIONS_FOR_CORRELATION: int = 3
     MAX_CONCURRENT_SESSIONS: int = 1000
+    MAX_OBSERVATION_BATCH_SIZE: int = 1000  # Per /observations/add-batch request
     
     # Scoring weights (must sum to 1.0)
     WEIGHT_TIMING_SIMILARITY: float = 0.40
@@ -72,6 +103,8 @@ class Settings(BaseSettings):
     REPETITION_BOOST_FACTOR: float = 1.5  # Multiplier for repeated observations
     MIN_REPETITIONS_FOR_BOOST: int = 2   # Minimum repetitions to apply boost
     MAX_REPETITION_BOOST: float = 2.0    # Maximum boost multiplier
+    PATTERN_CACHE_MAX: int = 100000      # Patterns tracked; least recently seen are forgotten
+    OBSERVATION_HISTORY_MAX: int = 1000  # Recent sightings kept per relay fingerprint
     
     # Forensic reporting
     REPORT_INCLUDE_RAW_DATA: bool = True
@@ -87,9 +120,12 @@ class Settings(BaseSettings):
     LOG_LEVEL: str = "INFO"
     LOG_FORMAT: str = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
     
+    # Read once per process (see get_settings). Unrelated keys in a shared
+    # .env (e.g. for docker compose) are ignored rather than rejected
     class Config:
         env_file = ".env"
         env_file_encoding = "utf-8"
+        extra = "ignore"
     
     def create_directories(self):
         """Create all required directories if they don't exist"""
@@ -97,22 +133,26 @@ class Settings(BaseSettings):
             self.DATA_DIR,
             self.RAW_DATA_DIR,
             self.PROCESSED_DATA_DIR,
+            self.SNAPSHOT_CACHE_DIR,
             self.OBSERVATIONS_DIR,
             self.DATABASE_DIR,
             self.REPORTS_DIR,
         ]
         
+        # One stat per existing directory. Their .gitkeep placeholders are
+        # tracked in git, so they are not recreated at runtime
         for directory in directories:
-            directory.mkdir(parents=True, exist_ok=True)
-            
-            # Create .gitkeep files for empty directories
-            gitkeep = directory / ".gitkeep"
-            if not gitkeep.exists():
-                gitkeep.touch()
+            if not directory.is_dir():
+                directory.mkdir(parents=True, exist_ok=True)
 
 
-# Global settings instance
-settings = Settings()
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """The settings instance, read from the environment and with its directories created once"""
+    settings = Settings()
+    settings.create_directories()
+    return settings
 
-# Ensure directories exist on import
-settings.create_directories()
+
+# Global settings instance
+settings = get_settings()
@@ -3,7 +3,11 @@ Demonstration of Explainability Features
 
 Shows how the system generates plain English explanations for confidence scores.
 """
+import contextlib
+import io
+import sys
 from datetime import datetime, timedelta
+from operator import itemgetter
 from app.core.correlation import CorrelationEngine
 from app.models.correlation import TrafficObservation, ObservationType
 
@@ -15,6 +19,18 @@ def print_separator(title: str):
     print("=" * 80)
 
 
+# Fields of a scored component in SessionPair.score_breakdown, fetched in one call
+_COMPONENT_FIELDS = itemgetter("score", "weight", "contribution", "reasoning")
+
+
+def run_buffered(scenario):
+    """Run a demo scenario, writing its output to stdout in one go"""
+    with contextlib.redirect_stdout(io.StringIO()) as buf:
+        scenario()
+    sys.stdout.write(buf.getvalue())
+    sys.stdout.flush()
+
+
 def create_demo_observation(
     obs_id: str,
     obs_type: ObservationType,
@@ -69,20 +85,22 @@ def demo_high_confidence_scenario():
         print(f"⚖️  Confidence Level: {'HIGH' if pair.correlation_strength >= 70 else 'MEDIUM' if pair.correlation_strength >= 50 else 'LOW'}")
         
         print("\n📝 REASONING CHAIN:")
-        for i, reason in enumerate(pair.reasoning, 1):
-            print(f"\n  Step {i}:")
-            print(f"    {reason}")
+        print("".join(f"\n  Step {i}:\n    {reason}\n" for i, reason in enumerate(pair.reasoning, 1)), end="")
         
         print("\n📈 DETAILED SCORE BREAKDOWN:")
         for component, data in pair.score_breakdown.items():
+            title = component.replace('_', ' ').title()
             if isinstance(data, dict) and "score" in data:
-                print(f"\n  {component.replace('_', ' ').title()}:")
-                print(f"    Score: {data['score']:.1f}%")
-                print(f"    Weight: {data['weight']:.2f}")
-                print(f"    Contribution: {data['contribution']:.1f}")
-                print(f"    Reasoning: {data['reasoning']}")
+                score, weight, contribution, reasoning = _COMPONENT_FIELDS(data)
+                print(
+                    f"\n  {title}:\n"
+                    f"    Score: {score:.1f}%\n"
+                    f"    Weight: {weight:.2f}\n"
+                    f"    Contribution: {contribution:.1f}\n"
+                    f"    Reasoning: {reasoning}"
+                )
             else:
-                print(f"\n  {component.replace('_', ' ').title()}: {data}")
+                print(f"\n  {title}: {data}")
 
 
 def demo_medium_confidence_scenario():
@@ -115,9 +133,10 @@ def demo_medium_confidence_scenario():
         print(f"⚖️  Confidence Level: MEDIUM")
         
         print("\n📝 KEY REASONING POINTS:")
-        for reason in pair.reasoning:
-            if "time" in reason.lower() or "volume" in reason.lower() or "correlation" in reason.lower():
-                print(f"  • {reason}")
+        print("\n".join(
+            f"  • {reason}" for reason in pair.reasoning
+            if "time" in reason.lower() or "volume" in reason.lower() or "correlation" in reason.lower()
+        ))
 
 
 def demo_low_confidence_scenario():
@@ -151,8 +170,7 @@ def demo_low_confidence_scenario():
         print(f"⚠️  Warning: This correlation is weak and should be treated with caution")
         
         print("\n📝 EXPLANATION FOR LOW CONFIDENCE:")
-        for reason in pair.reasoning:
-            print(f"  • {reason}")
+        print("\n".join(f"  • {reason}" for reason in pair.reasoning))
     else:
         print(f"\n⚠️  No correlation found above minimum threshold (30%)")
         print(f"   Time gap: 180 seconds, Volume difference: {((4.5 - 1.2) / 1.2 * 100):.1f}%")
@@ -200,7 +218,7 @@ def demo_repetition_weighting():
         exits.append(exit_obs)
     
     # Correlate first observation
-    pairs_first = engine.correlate_observations([entries[0]], [exits[0]])
+    pairs_first = engine.add_observations([entries[0]], [exits[0]])
     
     print("\n🔍 FIRST OBSERVATION:")
     if pairs_first:
@@ -208,10 +226,11 @@ def demo_repetition_weighting():
         print(f"  Final Correlation: {pairs_first[0].correlation_strength:.1f}%")
         print(f"  Repetition Boost: None (first occurrence)")
     
-    # Correlate later observations to see boost
+    # Feed later observations one at a time to see boost; only pairs
+    # involving the new observation are scored on each step
     all_pairs = []
     for i in range(1, 5):
-        pairs = engine.correlate_observations(entries[:i+1], exits[:i+1])
+        pairs = engine.add_observations([entries[i]], [exits[i]])
         if pairs:
             latest = [p for p in pairs if p.entry_observation_id == entries[i].observation_id]
             if latest:
@@ -239,6 +258,11 @@ def demo_repetition_weighting():
     print("\n📊 REPETITION STATISTICS:")
     print(f"  Total Patterns Tracked: {stats['total_patterns']}")
     print(f"  Most Common Pattern: {stats.get('most_common_pattern_count', 0)} occurrences")
+    
+    cache_stats = engine.get_score_cache_statistics()
+    print("\n🗃️  SCORE CACHE:")
+    for scorer, info in cache_stats.items():
+        print(f"  {scorer.replace('_', ' ').title()}: {info['hits']} hits, {info['misses']} misses")
 
 
 def demo_api_usage():
@@ -294,11 +318,15 @@ def main():
     print(" " * 15 + "TN Police TOR Metadata Correlation" + " " * 30)
     print("=" * 80)
     
-    demo_high_confidence_scenario()
-    demo_medium_confidence_scenario()
-    demo_low_confidence_scenario()
-    demo_repetition_weighting()
-    demo_api_usage()
+    # Each scenario's output is collected and written at once
+    for scenario in (
+        demo_high_confidence_scenario,
+        demo_medium_confidence_scenario,
+        demo_low_confidence_scenario,
+        demo_repetition_weighting,
+        demo_api_usage,
+    ):
+        run_buffered(scenario)
     
     print("\n" + "=" * 80)
     print("  DEMONSTRATION COMPLETE")
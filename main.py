@@ -14,10 +14,11 @@ LEGAL NOTICE:
 - Designed for lawful law enforcement use only
 """
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 import logging
 
-from app.api import router
+from app.api import router, AppState
 from app.utils import setup_logging
 from config import settings
 
@@ -33,18 +34,23 @@ app = FastAPI(
     version=settings.APP_VERSION,
     docs_url="/docs",
     redoc_url="/redoc",
-    openapi_url="/openapi.json"
+    openapi_url="/openapi.json",
+    default_response_class=ORJSONResponse
 )
 
-# CORS middleware (configure appropriately for production)
+# CORS middleware: explicit allowlists, so origins are matched by set
+# membership rather than echoed back for every request
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],  # Restrict in production
+    allow_origins=settings.CORS_ORIGINS,
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_methods=["GET", "POST"],
+    allow_headers=["Authorization", "Content-Type"],
 )
 
+# Per-process state shared by the API routes
+app.state.app_state = AppState()
+
 # Include API routes
 app.include_router(router, prefix="/api")
 
@@ -89,6 +95,11 @@ async def startup_event():
     # Ensure directories exist
     settings.create_directories()
     
+    # Pydantic builds model validators/serializers at import time; what is
+    # left lazy is the OpenAPI document (JSON schema of every model), which
+    # FastAPI generates on first request and caches. Build it now instead.
+    app.openapi()
+    
     logger.info("Application ready")
 
 
@@ -96,6 +107,7 @@ async def startup_event():
 async def shutdown_event():
     """Application shutdown tasks"""
     logger.info("Shutting down...")
+    await app.state.app_state.close()
     logger.info("=" * 80)
 
 
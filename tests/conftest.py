@@ -0,0 +1,80 @@
+"""
+Shared test fixtures
+"""
+import asyncio
+import pickle
+import time
+
+import pytest
+from datetime import datetime
+
+from app.core.topology import TORTopologyEngine
+from app.models.topology import TORRelay, TopologySnapshot, RelayFlags
+
+
+# Live snapshots cached by tor_snapshot are refetched after this many seconds
+LIVE_SNAPSHOT_MAX_AGE = 24 * 3600
+
+
+@pytest.fixture(scope="session")
+def synthetic_topology():
+    """
+    Small in-memory topology snapshot, built once per test session
+    
+    10 relays (guards, exits and middles) with no network access. The
+    first guard uses the entry relay fingerprint of the correlation
+    sample observations.
+    """
+    now = datetime.utcnow()
+    role_flags = [
+        [RelayFlags.GUARD, RelayFlags.RUNNING, RelayFlags.VALID],
+        [RelayFlags.EXIT, RelayFlags.RUNNING, RelayFlags.VALID],
+        [RelayFlags.RUNNING, RelayFlags.VALID],
+    ]
+    relays = [
+        TORRelay(
+            fingerprint="AAAA1111BBBB2222CCCC3333DDDD4444EEEE5555" if n == 0 else f"{n:040X}",
+            address=f"10.{n}.0.1",
+            or_port=9001,
+            consensus_weight=1000 * (n + 1),
+            observed_bandwidth=100000 * (n + 1),
+            flags=role_flags[n % 3],
+            first_seen=now,
+            last_seen=now
+        )
+        for n in range(10)
+    ]
+    snapshot = TopologySnapshot(
+        snapshot_id="snapshot-synthetic", valid_after=now, valid_until=now, fresh_until=now,
+        relays=relays
+    )
+    snapshot.compute_statistics()
+    return snapshot
+
+
+@pytest.fixture(scope="session")
+def tor_snapshot(request):
+    """
+    Live 50-relay topology snapshot, fetched at most once a day
+    
+    The snapshot is pickled into pytest's cache directory (.pytest_cache,
+    see --cache-dir), so repeated and parallel test runs reuse it instead
+    of querying Onionoo. Use --cache-clear to force a fresh fetch. With the
+    cache plugin disabled (-p no:cacheprovider) it is fetched every session.
+    """
+    cache = getattr(request.config, "cache", None)
+    path = cache.mkdir("tor") / "snapshot-50.pkl" if cache is not None else None
+    if path is not None and path.exists() and time.time() - path.stat().st_mtime < LIVE_SNAPSHOT_MAX_AGE:
+        return pickle.loads(path.read_bytes())
+    
+    async def fetch():
+        engine = TORTopologyEngine()
+        try:
+            return await engine.create_topology_snapshot(limit=50)
+        finally:
+            await engine.close()
+    
+    snapshot = asyncio.run(fetch())
+    if path is not None:
+        path.write_bytes(pickle.dumps(snapshot, protocol=pickle.HIGHEST_PROTOCOL))
+    return snapshot
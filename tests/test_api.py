@@ -0,0 +1,238 @@
+"""
+Tests for the API routes, driven in-process through ASGI
+"""
+import asyncio
+
+import httpx
+import orjson
+import pytest
+import pytest_asyncio
+from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
+
+from app.api import router, AppState
+from app.api import routes
+
+
+@pytest.fixture
+def api_app(synthetic_topology):
+    """API app with its own state, loaded with the synthetic topology"""
+    app = FastAPI(default_response_class=ORJSONResponse)
+    app.state.app_state = AppState()
+    app.state.app_state.set_topology(synthetic_topology)
+    app.include_router(router, prefix="/api")
+    yield app
+    app.state.app_state.correlation_executor.shutdown(wait=True)
+
+
+@pytest_asyncio.fixture
+async def client(api_app):
+    transport = httpx.ASGITransport(app=api_app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        yield client
+
+
+async def _add_synthetic_observations(client: httpx.AsyncClient) -> None:
+    response = await client.post(
+        "/api/observations/generate-synthetic", params={"num_sessions": 10, "num_noise": 5}
+    )
+    assert response.status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_stream_analysis_full(api_app, client):
+    """A fully read stream relays every pair, then stores pairs and clusters"""
+    state = api_app.state.app_state
+    await _add_synthetic_observations(client)
+
+    response = await client.post("/api/correlation/analyze/stream")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    streamed = [orjson.loads(line) for line in response.content.splitlines()]
+    assert len(streamed) > 0
+    assert [p["pair_id"] for p in streamed] == [p.pair_id for p in state.pairs]
+    assert not state.analysis_lock.locked()
+
+
+@pytest.mark.asyncio
+async def test_stream_analysis_client_disconnect(api_app, client, monkeypatch):
+    """A client leaving mid-stream cancels the run: nothing is stored and the lock is released"""
+    state = api_app.state.app_state
+    await _add_synthetic_observations(client)
+
+    # One pair per chunk and a one-chunk buffer, so the run is still going
+    # when the client leaves after the first line
+    monkeypatch.setattr(routes, "_STREAM_CHUNK_PAIRS", 1)
+    monkeypatch.setattr(routes, "_STREAM_BUFFER_CHUNKS", 1)
+
+    first_body = asyncio.Event()
+    body_chunks = []
+    requested = False
+
+    async def receive():
+        nonlocal requested
+        if not requested:
+            requested = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await first_body.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.body" and message.get("body"):
+            body_chunks.append(message["body"])
+            first_body.set()
+            # Still sending when the disconnect lands, so the body generator
+            # is left suspended at its yield
+            await asyncio.sleep(0.05)
+
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": "POST", "scheme": "http", "path": "/api/correlation/analyze/stream",
+        "raw_path": b"/api/correlation/analyze/stream", "root_path": "", "query_string": b"",
+        "headers": [(b"host", b"test")], "client": ("127.0.0.1", 1234), "server": ("test", 80),
+    }
+    await asyncio.wait_for(api_app(scope, receive, send), timeout=10)
+
+    assert len(body_chunks) >= 1
+    # The cancelled run releases the lock without storing anything
+    await asyncio.wait_for(state.analysis_lock.acquire(), timeout=5)
+    state.analysis_lock.release()
+    assert state.pairs == []
+    assert state.clusters == []
+
+
+@pytest.fixture
+def fake_analysis(monkeypatch):
+    """Replace the correlation run with a stub; returns the list of runs made"""
+    runs = []
+
+    async def run_analysis(state):
+        runs.append(state)
+        return {"run": len(runs)}
+
+    monkeypatch.setattr(routes, "_run_analysis", run_analysis)
+    return runs
+
+
+async def _queue_analyze_requests(api_app, client, count: int):
+    """Start `count` analyze requests while the lock is held; they queue behind it"""
+    state = api_app.state.app_state
+    tasks = [asyncio.create_task(client.post("/api/correlation/analyze"))]
+    while state.pending_analysis is None:
+        await asyncio.sleep(0.01)
+    tasks += [asyncio.create_task(client.post("/api/correlation/analyze")) for _ in range(count - 1)]
+    await asyncio.sleep(0.1)
+    return tasks
+
+
+@pytest.mark.asyncio
+async def test_concurrent_analyze_requests_share_one_run(api_app, client, fake_analysis):
+    """Requests queued behind the same run all get that run's result"""
+    state = api_app.state.app_state
+    await _add_synthetic_observations(client)
+
+    async with state.analysis_lock:
+        tasks = await _queue_analyze_requests(api_app, client, 2)
+    responses = await asyncio.gather(*tasks)
+
+    assert len(fake_analysis) == 1
+    assert [r.status_code for r in responses] == [200, 200]
+    assert responses[0].json() == responses[1].json() == {"run": 1}
+
+
+@pytest.mark.asyncio
+async def test_analyze_joiner_retries_when_leader_cancelled(api_app, client, fake_analysis):
+    """A request whose joined run is cancelled starts a run of its own"""
+    state = api_app.state.app_state
+    await _add_synthetic_observations(client)
+
+    async with state.analysis_lock:
+        leader, joiner = await _queue_analyze_requests(api_app, client, 2)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+    response = await joiner
+
+    assert response.status_code == 200
+    assert response.json() == {"run": 1}
+    assert len(fake_analysis) == 1
+    assert state.pending_analysis is None
+
+
+@pytest.mark.asyncio
+async def test_analyze_error_reaches_all_joiners(api_app, client, monkeypatch):
+    """A run that fails fails every request that joined it"""
+    state = api_app.state.app_state
+    await _add_synthetic_observations(client)
+    runs = []
+
+    async def failing_run(state):
+        runs.append(state)
+        raise routes.HTTPException(status_code=503, detail="Correlation engine unavailable")
+
+    monkeypatch.setattr(routes, "_run_analysis", failing_run)
+
+    async with state.analysis_lock:
+        tasks = await _queue_analyze_requests(api_app, client, 3)
+    responses = await asyncio.gather(*tasks)
+
+    assert len(runs) == 1
+    assert [r.status_code for r in responses] == [503, 503, 503]
+    assert all(r.json()["detail"] == "Correlation engine unavailable" for r in responses)
+    assert state.pending_analysis is None
+
+
+def _observation_json(n: int, observation_type: str, timestamp: str) -> dict:
+    return {
+        "observation_id": f"obs-{n}",
+        "observation_type": observation_type,
+        "timestamp": timestamp,
+        "observed_ip": f"192.0.2.{n}",
+        "bytes_transferred": 1000 * (n + 1),
+    }
+
+
+@pytest.mark.asyncio
+async def test_add_batch_rejects_oversized_batch(api_app, client, monkeypatch):
+    """Batches over MAX_OBSERVATION_BATCH_SIZE are rejected whole with 413"""
+    monkeypatch.setattr(routes.settings, "MAX_OBSERVATION_BATCH_SIZE", 2)
+    batch = [_observation_json(n, "entry_observed", "2025-01-01T00:00:00") for n in range(3)]
+
+    response = await client.post("/api/observations/add-batch", json=batch)
+
+    assert response.status_code == 413
+    assert len(api_app.state.app_state.observations) == 0
+
+
+@pytest.mark.asyncio
+async def test_add_batch_mixed_timezones_is_bad_request(api_app, client):
+    """Timezone-aware and naive timestamps in one batch are a client error, and nothing is stored"""
+    batch = [
+        _observation_json(0, "entry_observed", "2025-01-01T00:00:00Z"),
+        _observation_json(1, "exit_observed", "2025-01-01T00:00:01"),
+    ]
+
+    response = await client.post("/api/observations/add-batch", json=batch)
+
+    assert response.status_code == 400
+    assert len(api_app.state.app_state.observations) == 0
+
+
+@pytest.mark.asyncio
+async def test_add_batch_buckets_entries_and_exits(api_app, client):
+    """A stored batch is split into the store's entry and exit buckets"""
+    batch = [
+        _observation_json(0, "entry_observed", "2025-01-01T00:00:00"),
+        _observation_json(1, "exit_observed", "2025-01-01T00:00:01"),
+        _observation_json(2, "entry_observed", "2025-01-01T00:00:02"),
+        _observation_json(3, "synthetic", "2025-01-01T00:00:03"),
+    ]
+
+    response = await client.post("/api/observations/add-batch", json=batch)
+
+    assert response.status_code == 200
+    assert response.json() == {"accepted": 4, "total_observations": 4}
+    store = api_app.state.app_state.observations
+    assert [o.observation_id for o in store.entry_batch().observations] == ["obs-0", "obs-2"]
+    assert [o.observation_id for o in store.exit_batch().observations] == ["obs-1"]
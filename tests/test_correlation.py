@@ -1,9 +1,17 @@
 """
 Unit tests for Correlation Engine
 """
+import itertools
 import pytest
+import numpy as np
 from datetime import datetime, timedelta
-from app.core.correlation import CorrelationEngine
+from app.core.correlation import CorrelationEngine, ObservationStore, TrafficObservationBatch
+from app.core.correlation import engine as correlation_engine_module
+from app.core.correlation._kernels import _score_candidates, score_candidates
+from app.core.correlation.engine import (
+    window_candidates, top_indices, volume_buckets, _score_columns,
+    _VOLUME_SIMILARITY_LUT, _NO_VOLUME_LUT
+)
 from app.models.correlation import TrafficObservation, ObservationType
 
 
@@ -65,6 +73,19 @@ def test_correlation_engine_initialization():
     """Test correlation engine initializes without topology"""
     engine = CorrelationEngine()
     assert engine is not None
+    assert engine.graph_analyzer is None
+
+
+def test_topology_reassignment(synthetic_topology):
+    """Test that assigning a topology switches the guard lookups to it"""
+    engine = CorrelationEngine()
+    
+    engine.topology = synthetic_topology
+    assert engine.graph_analyzer is not None
+    assert engine.graph_analyzer.snapshot is synthetic_topology
+    
+    engine.topology = None
+    assert engine.graph_analyzer is None
 
 
 def test_time_correlation_scoring(sample_observations):
@@ -80,6 +101,139 @@ def test_time_correlation_scoring(sample_observations):
     assert score_far < 50.0
 
 
+def test_log_time_decay():
+    """Test the log time decay keeps the same score bounds"""
+    engine = CorrelationEngine()
+    engine.time_decay = "log"
+    
+    score_close, _ = engine._calculate_time_correlation(1.0)
+    score_far, _ = engine._calculate_time_correlation(600.0)
+    
+    assert score_close > 95.0
+    assert score_far < 50.0
+
+
+def test_log_bucket_volume_similarity(sample_observations):
+    """Test the bucketed volume similarity keeps the same score bounds"""
+    engine = CorrelationEngine()
+    engine.volume_mode = "log_bucket"
+    
+    entry = sample_observations["entry"][0]
+    exit_correlated = sample_observations["exit_correlated"][0]
+    
+    score_same, _ = engine._calculate_volume_similarity(entry, entry)
+    score_close, _ = engine._calculate_volume_similarity(entry, exit_correlated)
+    
+    assert score_same == 100.0
+    assert 50.0 < score_close < 100.0
+
+
+def test_timing_correlation_pattern_similarity(sample_observations):
+    """Test the timing correlation mode scores timing rhythm, not packet counts"""
+    engine = CorrelationEngine()
+    engine.pattern_mode = "correlation"
+    
+    entry = sample_observations["entry"][0].model_copy(update={"inter_packet_timings": [1.0, 5.0, 2.0, 8.0]})
+    same_rhythm = entry.model_copy(update={"inter_packet_timings": [1.0, 3.0, 5.0, 3.5, 2.0, 5.0, 8.0]})
+    reversed_rhythm = entry.model_copy(update={"inter_packet_timings": [8.0, 2.0, 5.0, 1.0]})
+    
+    score_same, _ = engine._calculate_pattern_similarity(entry, same_rhythm)
+    score_reversed, _ = engine._calculate_pattern_similarity(entry, reversed_rhythm)
+    
+    assert score_same > 99.0  # Resampled onto the same shape
+    assert score_reversed == 0.0  # Equal counts, opposite rhythm
+    
+    # Scores-only pairs agree with the explained ones
+    pair = engine._create_session_pair(entry, same_rhythm, 1.0, with_reasoning=False)
+    assert pair.pattern_similarity == score_same
+
+
+def test_window_candidates(monkeypatch):
+    """Test windowed candidate search matches the full delta matrix"""
+    # Force the search path; these inputs would take the dense one
+    monkeypatch.setattr(correlation_engine_module, "_DENSE_WINDOW_MAX_CELLS", 0)
+    ts_e = np.array([0, 500, 100, 100], dtype=np.int64)
+    ts_x = np.array([90, 700, 0, 100, 1000], dtype=np.int64)
+    
+    rows, cols = window_candidates(ts_e, ts_x, 200)
+    expected = np.nonzero(np.abs(ts_x[None, :] - ts_e[:, None]) <= 200)
+    
+    assert rows.tolist() == expected[0].tolist()
+    assert cols.tolist() == expected[1].tolist()
+    
+    # Exits already in time order take the no-sort path
+    ts_x = np.sort(ts_x)
+    rows, cols = window_candidates(ts_e, ts_x, 200)
+    expected = np.nonzero(np.abs(ts_x[None, :] - ts_e[:, None]) <= 200)
+    
+    assert rows.tolist() == expected[0].tolist()
+    assert cols.tolist() == expected[1].tolist()
+    
+    # No exits at all: no candidates
+    rows, cols = window_candidates(ts_e, np.empty(0, dtype=np.int64), 200)
+    assert len(rows) == len(cols) == 0
+    
+    # Dense path gives the same pairs
+    monkeypatch.undo()
+    rows, cols = window_candidates(ts_e, ts_x, 200)
+    assert rows.tolist() == expected[0].tolist()
+    assert cols.tolist() == expected[1].tolist()
+
+
+def test_observation_timestamp_columns(sample_observations):
+    """Test that timestamps become exact integer microseconds once per batch"""
+    entry = sample_observations["entry"][0]
+    late = entry.model_copy(update={"timestamp": entry.timestamp + timedelta(days=3650, microseconds=1)})
+    
+    batch = TrafficObservationBatch.from_observations([entry, late])
+    assert batch.timestamps_us.dtype == np.int64
+    assert batch.timestamps_us.tolist() == [0, 3650 * 86400 * 1_000_000 + 1]
+    
+    # Ten years apart, one microsecond still survives the pair delta
+    engine = CorrelationEngine()
+    engine.time_window = 3650 * 86400 + 1
+    pair = engine.correlate_observations([entry], [late.model_copy(update={"observation_type": "exit_observed"})])[0]
+    assert pair.time_delta == 3650 * 86400 + 0.000001
+
+
+def test_score_kernel_matches_numpy():
+    """Test the scoring kernel (and its Numba build, if any) against the NumPy scoring path"""
+    rng = np.random.default_rng(0)
+    ts_e, ts_x = rng.integers(0, 10**8, 20), rng.integers(0, 10**8, 30)
+    vol_e = rng.integers(0, 10**7, 20).astype(np.uint64)
+    vol_x = rng.integers(0, 10**7, 30).astype(np.uint64)
+    npk_e, npk_x = rng.integers(0, 3, 20), rng.integers(0, 3, 30)
+    vol_e[0] = npk_e[0] = 0  # Missing volume and timing patterns
+    rows, cols = np.nonzero(np.ones((20, 30), dtype=bool))
+    kernels = [_score_candidates] + ([score_candidates] if score_candidates is not None else [])
+    
+    # Pattern-only weights leave pairs without patterns nothing to score on
+    for kernel, weights in itertools.product(kernels, [(0.5, 0.3, 0.2), (0.0, 0.0, 1.0)]):
+        for decay in ("exponential", "log"):
+            for mode in ("ratio", "log_bucket"):
+                ve, vx = (volume_buckets(vol_e), volume_buckets(vol_x)) if mode == "log_bucket" else (vol_e, vol_x)
+                lut = _VOLUME_SIMILARITY_LUT if mode == "log_bucket" else _NO_VOLUME_LUT
+                delta_us, base = kernel(
+                    rows, cols, ts_e, ve, npk_e, ts_x, vx, npk_x,
+                    30.0, *weights, decay == "log", lut
+                )
+                expected_delta, expected_base = _score_columns(
+                    ts_e[rows], ve[rows], npk_e[rows], ts_x[cols], vx[cols], npk_x[cols],
+                    30.0, *weights, decay, mode
+                )
+                assert delta_us.tolist() == expected_delta.tolist()
+                assert np.allclose(base, expected_base, rtol=1e-12, atol=0)
+
+
+def test_top_indices():
+    """Test top-k selection orders like a stable descending sort"""
+    scores = np.array([50.0, 90.0, 70.0, 90.0, 70.0, 10.0])
+    
+    assert top_indices(scores, 3).tolist() == [1, 3, 2]
+    assert top_indices(scores, 10).tolist() == [1, 3, 2, 4, 0, 5]
+    assert top_indices(scores, 0).tolist() == []
+
+
 def test_volume_correlation_scoring(sample_observations):
     """Test volume similarity scoring"""
     engine = CorrelationEngine()
@@ -92,9 +246,11 @@ def test_volume_correlation_scoring(sample_observations):
     assert score > 90.0
 
 
-def test_session_pair_creation(sample_observations):
+@pytest.mark.parametrize("use_topology", [False, True])
+def test_session_pair_creation(sample_observations, synthetic_topology, use_topology):
     """Test creating session pairs with correlation scores"""
-    engine = CorrelationEngine()
+    topology = synthetic_topology if use_topology else None
+    engine = CorrelationEngine(topology=topology)
     
     entry = sample_observations["entry"]
     exit_correlated = sample_observations["exit_correlated"]
@@ -108,6 +264,13 @@ def test_session_pair_creation(sample_observations):
     assert pair.entry_observation_id == "entry-001"
     assert pair.exit_observation_id == "exit-001"
     assert pair.correlation_strength > 0
+    
+    # Scores-only pairs carry the same numbers without the reasoning text
+    unexplained = CorrelationEngine(topology=topology).correlate_observations(
+        entry, exit_correlated, with_reasoning=False
+    )
+    assert unexplained[0].correlation_strength == pair.correlation_strength
+    assert unexplained[0].reasoning == []
 
 
 def test_correlation_filtering(sample_observations):
@@ -125,9 +288,10 @@ def test_correlation_filtering(sample_observations):
         assert pairs[0].correlation_strength < 30.0
 
 
-def test_cluster_creation(sample_observations):
+@pytest.mark.parametrize("use_topology", [False, True])
+def test_cluster_creation(sample_observations, synthetic_topology, use_topology):
     """Test creating correlation clusters"""
-    engine = CorrelationEngine()
+    engine = CorrelationEngine(topology=synthetic_topology if use_topology else None)
     
     # Create multiple correlated pairs with same guard
     entry = sample_observations["entry"] * 3  # Repeat 3 times
@@ -143,6 +307,84 @@ def test_cluster_creation(sample_observations):
     cluster = clusters[0]
     assert cluster.observation_count > 0
     assert cluster.cluster_confidence > 0
+    
+    # Reasoning is formatted on access and still serialized
+    assert cluster.reasoning[0] == f"Found {len(cluster.session_pair_ids)} correlated session pairs"
+    assert cluster.model_dump()["reasoning"] == cluster.reasoning
+    
+    # Large pair lists are memoized by the pair fields clustering reads,
+    # so mutated pairs are clustered again
+    many = pairs * 256
+    cached = engine.cluster_session_pairs(many)[0]
+    assert engine.cluster_session_pairs(many)[0] is cached
+    
+    pairs[0].correlation_strength -= 10
+    assert engine.cluster_session_pairs(many)[0].consistency_score < cached.consistency_score
+
+
+def test_observation_store_arrays(sample_observations):
+    """Test that correlating from store columns matches correlating the models"""
+    store = ObservationStore(initial_capacity=1)
+    store.extend(sample_observations["entry"])
+    store.extend(sample_observations["exit_uncorrelated"] + sample_observations["exit_correlated"])
+    
+    assert len(store) == 3
+    assert [o.observation_id for o in store.exit_observations] == ["exit-002", "exit-001"]
+    
+    engine = CorrelationEngine()
+    pairs = engine.correlate_observations(
+        store.entry_observations, store.exit_observations,
+        store.entry_arrays(), store.exit_arrays()
+    )
+    expected = CorrelationEngine().correlate_observations(
+        store.entry_observations, store.exit_observations
+    )
+    
+    assert [(p.pair_id, p.time_delta, p.correlation_strength) for p in pairs] == \
+        [(p.pair_id, p.time_delta, p.correlation_strength) for p in expected]
+    
+    batched = CorrelationEngine().correlate_observations(store.entry_batch(), store.exit_batch())
+    assert [(p.pair_id, p.correlation_strength) for p in batched] == \
+        [(p.pair_id, p.correlation_strength) for p in expected]
+    
+    # Batches are reused until the store changes
+    assert store.entry_batch() is store.entry_batch()
+    exit_batch = store.exit_batch()
+    store.append(sample_observations["exit_correlated"][0])
+    assert len(store.exit_batch()) == len(exit_batch) + 1
+
+
+def test_score_arrays(sample_observations):
+    """Test that scoring bare columns finds the same pairs as correlating the models"""
+    entries = sample_observations["entry"]
+    exits = sample_observations["exit_uncorrelated"] + sample_observations["exit_correlated"]
+    engine = CorrelationEngine()
+    
+    batch = TrafficObservationBatch.from_observations(entries + exits)
+    columns = [column[:1] for column in batch.arrays], [column[1:] for column in batch.arrays]
+    rows, cols, time_delta, base = engine.score_arrays(*columns)
+    
+    pairs = CorrelationEngine().correlate_observations(entries, exits)
+    assert len(pairs) == 1
+    assert [(entries[i].observation_id, exits[j].observation_id) for i, j in zip(rows, cols)] == \
+        [(p.entry_observation_id, p.exit_observation_id) for p in pairs]
+    assert time_delta.tolist() == [p.time_delta for p in pairs]
+    
+    # Model-free scoring leaves repetition history alone
+    assert len(engine.pattern_frequency) == 0
+
+
+def test_incremental_correlation(sample_observations):
+    """Test that add_observations only scores pairs with new observations"""
+    engine = CorrelationEngine()
+    
+    # Exit arrives before its entry
+    assert engine.add_observations([], sample_observations["exit_correlated"]) == []
+    pairs = engine.add_observations(sample_observations["entry"], [])
+    assert [(p.entry_observation_id, p.exit_observation_id) for p in pairs] == [("entry-001", "exit-001")]
+    
+    # The already-correlated pair is not scored again
+    assert engine.add_observations([], sample_observations["exit_uncorrelated"]) == []
 
 
 if __name__ == "__main__":
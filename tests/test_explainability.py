@@ -49,10 +49,6 @@ def test_time_correlation_explanation():
     # Test large gap
     score, explanation = engine._calculate_time_correlation(600.0)
     assert "correlation window" in explanation.lower()
-    
-    print("\nTime Correlation Explanations:")
-    print(f"  0.5s: {explanation[:100]}...")
-    print(f"  Score: {score:.1f}%")
 
 
 def test_volume_similarity_explanation():
@@ -76,10 +72,6 @@ def test_volume_similarity_explanation():
     
     assert "difference" in explanation_diff.lower()
     assert score_diff < score
-    
-    print("\nVolume Similarity Explanations:")
-    print(f"  Similar: {explanation[:100]}...")
-    print(f"  Different: {explanation_diff[:100]}...")
 
 
 def test_session_pair_reasoning():
@@ -120,17 +112,6 @@ def test_session_pair_reasoning():
     full_reasoning = " ".join(pair.reasoning)
     assert "observation" in full_reasoning.lower()
     assert "%" in full_reasoning  # Should mention percentages
-    
-    print("\nSession Pair Reasoning:")
-    for i, reason in enumerate(pair.reasoning, 1):
-        print(f"  {i}. {reason}")
-    
-    print("\nScore Breakdown:")
-    for key, value in pair.score_breakdown.items():
-        if isinstance(value, dict):
-            print(f"  {key}: {value.get('score', 'N/A'):.1f}% (contribution: {value.get('contribution', 'N/A'):.1f})")
-        else:
-            print(f"  {key}: {value}")
 
 
 def test_confidence_levels_explanation():
@@ -154,16 +135,10 @@ def test_confidence_levels_explanation():
     
     pairs_low = engine.correlate_observations([entry_low], [exit_low])
     
-    # Should be significantly lower than high confidence
+    # Should be significantly lower than high confidence (or filtered out
+    # below the minimum threshold)
     if pairs_low:
         assert pairs_low[0].correlation_strength < pairs_high[0].correlation_strength
-        
-        print("\nConfidence Level Explanations:")
-        print(f"  High ({pairs_high[0].correlation_strength:.1f}%): {pairs_high[0].reasoning[-1]}")
-        print(f"  Low ({pairs_low[0].correlation_strength:.1f}%): {pairs_low[0].reasoning[-1]}")
-    else:
-        print(f"\nLow confidence scenario filtered out (below minimum threshold of 30%)")
-        print(f"High confidence: {pairs_high[0].correlation_strength:.1f}%")
 
 
 def test_reasoning_includes_all_components():
@@ -192,10 +167,6 @@ def test_reasoning_includes_all_components():
     
     # Should have final assessment
     assert "confidence" in reasoning_text
-    
-    print("\nComplete Reasoning Chain:")
-    for step in pair.reasoning:
-        print(f"  → {step[:150]}...")
 
 
 def test_score_breakdown_structure():
@@ -227,10 +198,6 @@ def test_score_breakdown_structure():
     # Verify math
     time_contribution = time_data["score"] * time_data["weight"]
     assert abs(time_contribution - time_data["contribution"]) < 0.01
-    
-    print("\nScore Breakdown Structure:")
-    print(f"  Time: {time_data['score']:.1f}% × {time_data['weight']:.2f} = {time_data['contribution']:.1f}")
-    print(f"  Reasoning: {time_data['reasoning'][:100]}...")
 
 
 def test_guard_hypothesis_explanation():
@@ -254,12 +221,7 @@ def test_guard_hypothesis_explanation():
     # Reasoning should mention guard
     reasoning_text = " ".join(pair.reasoning).lower()
     assert "guard" in reasoning_text or "relay" in reasoning_text
-    
-    print("\nGuard Hypothesis Explanation:")
-    guard_reasons = [r for r in pair.reasoning if "guard" in r.lower() or "relay" in r.lower()]
-    for reason in guard_reasons:
-        print(f"  {reason}")
 
 
 if __name__ == "__main__":
-    pytest.main([__file__, "-v", "-s"])
+    pytest.main([__file__, "-v"])
@@ -1,16 +1,24 @@
 """
 Integration test demonstrating the complete workflow
+
+Progress is logged rather than printed; run with
+``pytest --log-cli-level=DEBUG`` to follow each step. The live topology
+comes from the cached tor_snapshot fixture (see conftest.py).
 """
 import pytest
 import asyncio
+import logging
 from datetime import datetime
-from app.core.topology import TORTopologyEngine, TORGraphAnalyzer
+from app.core.topology import TORGraphAnalyzer
 from app.core.correlation import CorrelationEngine
 from app.utils import SyntheticDataGenerator
 
 
+logger = logging.getLogger(__name__)
+
+
 @pytest.mark.asyncio
-async def test_complete_workflow():
+async def test_complete_workflow(tor_snapshot):
     """
     Test the complete analysis workflow:
     1. Fetch topology
@@ -18,95 +26,74 @@ async def test_complete_workflow():
     3. Run correlation analysis
     4. Verify results
     """
-    print("\n" + "=" * 80)
-    print("INTEGRATION TEST: Complete Workflow")
-    print("=" * 80)
+    # Step 1: Fetch topology (shared, cached snapshot; see conftest)
+    snapshot = tor_snapshot
+    logger.debug("[1] Loaded %d relays: %d guards, %d exits",
+                 snapshot.total_relays, snapshot.guard_relays, snapshot.exit_relays)
+    
+    assert snapshot.total_relays > 0
+    assert snapshot.guard_relays > 0
+    assert snapshot.exit_relays > 0
+    
+    # Step 2: Generate synthetic data
+    generator = SyntheticDataGenerator(snapshot)
+    
+    # Generate correlated sessions (same user)
+    entry_obs, exit_obs = generator.generate_user_sessions(
+        num_sessions=5,
+        base_time=datetime.utcnow(),
+        time_spread_hours=24,
+        guard_persistence=True
+    )
+    # The graph analyzer of step 5 needs only the snapshot; the correlation
+    # engine of step 3 reuses it through for_snapshot
+    graph_analyzer = TORGraphAnalyzer.for_snapshot(snapshot)
+    logger.debug("[2] Generated %d entry and %d exit observations", len(entry_obs), len(exit_obs))
+    
+    assert len(entry_obs) == 5
+    assert len(exit_obs) == 5
     
-    # Step 1: Fetch topology
-    print("\n[1] Fetching TOR topology...")
-    topology_engine = TORTopologyEngine()
+    # Step 3: Run correlation analysis
+    correlation_engine = CorrelationEngine(topology=snapshot)
     
-    try:
-        snapshot = await topology_engine.create_topology_snapshot(limit=50)
-        print(f"    ✓ Loaded {snapshot.total_relays} relays")
-        print(f"    ✓ {snapshot.guard_relays} guards, {snapshot.exit_relays} exits")
-        
-        assert snapshot.total_relays > 0
-        assert snapshot.guard_relays > 0
-        assert snapshot.exit_relays > 0
-        
-        # Step 2: Generate synthetic data
-        print("\n[2] Generating synthetic observations...")
-        generator = SyntheticDataGenerator(snapshot)
-        
-        # Generate correlated sessions (same user)
-        entry_obs, exit_obs = generator.generate_user_sessions(
-            num_sessions=5,
-            base_time=datetime.utcnow(),
-            time_spread_hours=24,
-            guard_persistence=True
+    pairs = correlation_engine.correlate_observations(entry_obs, exit_obs)
+    logger.debug("[3] Found %d session pairs", len(pairs))
+    
+    assert len(pairs) > 0
+    
+    # Show top pairs
+    for i, pair in enumerate(correlation_engine.top_pairs(pairs, k=3), 1):
+        logger.debug("    %d. %s: %.1f%% confidence, time delta %.2fs, guard %s",
+                     i, pair.pair_id, pair.correlation_strength, pair.time_delta,
+                     pair.hypothesized_guard)
+    
+    # Step 4: Create clusters
+    clusters = correlation_engine.cluster_session_pairs(pairs)
+    logger.debug("[4] Identified %d clusters", len(clusters))
+    
+    if len(clusters) > 0:
+        cluster = clusters[0]
+        logger.debug("    Top cluster %s: %d observations, %.1f%% confidence, "
+                     "%.1f%% guard persistence",
+                     cluster.cluster_id, cluster.observation_count,
+                     cluster.cluster_confidence, cluster.guard_persistence_score)
+        for reason in cluster.reasoning:
+            logger.debug("      - %s", reason)
+    
+    # Step 5: Graph analysis
+    guards = graph_analyzer.get_possible_guards()
+    logger.debug("[5] %d possible guard relays", len(guards))
+    
+    if len(guards) > 0:
+        top_guard = guards[0]
+        probability = graph_analyzer.estimate_guard_selection_probability(
+            top_guard.fingerprint
         )
-        
-        print(f"    ✓ Generated {len(entry_obs)} entry observations")
-        print(f"    ✓ Generated {len(exit_obs)} exit observations")
-        
-        assert len(entry_obs) == 5
-        assert len(exit_obs) == 5
-        
-        # Step 3: Run correlation analysis
-        print("\n[3] Running correlation analysis...")
-        correlation_engine = CorrelationEngine(topology=snapshot)
-        
-        pairs = correlation_engine.correlate_observations(entry_obs, exit_obs)
-        print(f"    ✓ Found {len(pairs)} session pairs")
-        
-        assert len(pairs) > 0
-        
-        # Show top pairs
-        pairs_sorted = sorted(pairs, key=lambda p: p.correlation_strength, reverse=True)
-        print("\n    Top correlated pairs:")
-        for i, pair in enumerate(pairs_sorted[:3], 1):
-            print(f"      {i}. {pair.pair_id}: {pair.correlation_strength:.1f}% confidence")
-            print(f"         Time delta: {pair.time_delta:.2f}s")
-            if pair.hypothesized_guard:
-                print(f"         Hypothesized guard: {pair.hypothesized_guard[:16]}...")
-        
-        # Step 4: Create clusters
-        print("\n[4] Identifying correlation clusters...")
-        clusters = correlation_engine.cluster_session_pairs(pairs)
-        print(f"    ✓ Identified {len(clusters)} clusters")
-        
-        if len(clusters) > 0:
-            cluster = clusters[0]
-            print(f"\n    Top cluster: {cluster.cluster_id}")
-            print(f"      Observations: {cluster.observation_count}")
-            print(f"      Confidence: {cluster.cluster_confidence:.1f}%")
-            print(f"      Guard persistence: {cluster.guard_persistence_score:.1f}%")
-            print(f"      Reasoning:")
-            for reason in cluster.reasoning:
-                print(f"        - {reason}")
-        
-        # Step 5: Graph analysis
-        print("\n[5] Running graph analysis...")
-        graph_analyzer = TORGraphAnalyzer(snapshot)
-        
-        guards = graph_analyzer.get_possible_guards()
-        print(f"    ✓ {len(guards)} possible guard relays")
-        
-        if len(guards) > 0:
-            top_guard = guards[0]
-            probability = graph_analyzer.estimate_guard_selection_probability(
-                top_guard.fingerprint
-            )
-            print(f"    ✓ Top guard selection probability: {probability:.2f}%")
-        
-        print("\n" + "=" * 80)
-        print("INTEGRATION TEST: SUCCESS")
-        print("=" * 80)
-        
-    finally:
-        await topology_engine.close()
+        logger.debug("    Top guard selection probability: %.2f%%", probability)
+    
+    logger.info("Integration workflow: snapshot=%s relays=%d pairs=%d clusters=%d",
+                snapshot.snapshot_id, snapshot.total_relays, len(pairs), len(clusters))
 
 
 if __name__ == "__main__":
-    asyncio.run(test_complete_workflow())
+    pytest.main([__file__, "-v", "--log-cli-level=DEBUG"])
@@ -3,18 +3,29 @@ Test for repeated observation weighting functionality
 
 Demonstrates how repeated observations increase correlation confidence
 """
+import logging
 import pytest
 from datetime import datetime, timedelta
 from app.core.correlation import CorrelationEngine
 from app.models.correlation import TrafficObservation, ObservationType
 
 
-@pytest.fixture
-def correlation_engine():
-    """Create correlation engine for testing"""
+logger = logging.getLogger(__name__)
+
+
+@pytest.fixture(scope="module")
+def shared_correlation_engine():
+    """One correlation engine for the module's tests"""
     return CorrelationEngine()
 
 
+@pytest.fixture
+def correlation_engine(shared_correlation_engine):
+    """The shared engine with its repetition history cleared"""
+    shared_correlation_engine.reset_repetition_state()
+    return shared_correlation_engine
+
+
 def create_observation(
     obs_id: str,
     obs_type: ObservationType,
@@ -56,7 +67,101 @@ def test_repetition_weight_calculation(correlation_engine):
     weight3 = correlation_engine._calculate_repetition_weight(obs3)
     assert weight3 > 1.0  # Should have boost now
     
-    print(f"\nRepetition weights: {weight1:.2f}, {weight2:.2f}, {weight3:.2f}")
+    logger.info("Repetition weights: %.2f, %.2f, %.2f", weight1, weight2, weight3)
+
+
+def test_repetition_occurrences(correlation_engine):
+    """Test that one observation with occurrences counts as repeated sightings"""
+    base_time = datetime.utcnow()
+    relay_fp = "AAAA1111BBBB2222CCCC3333DDDD4444EEEE5555"
+    
+    repeated = create_observation("obs-1", ObservationType.ENTRY_OBSERVED, base_time, relay_fp)
+    repeated.occurrences = 3
+    weight = correlation_engine._calculate_repetition_weight(repeated)
+    
+    # Same as the third of three separate sightings
+    engine = CorrelationEngine()
+    for i in range(3):
+        obs = create_observation(f"obs-{i}", ObservationType.ENTRY_OBSERVED, base_time, relay_fp)
+        expected = engine._calculate_repetition_weight(obs)
+    
+    assert weight == expected > 1.0
+
+
+def test_batched_repetition_counts(correlation_engine):
+    """Test that correlating records the same repetitions as pair-by-pair counting"""
+    base_time = datetime.utcnow()
+    guard_fp = "AAAA1111BBBB2222CCCC3333DDDD4444EEEE5555"
+    exit_fp = "FFFF1111GGGG2222HHHH3333IIII4444JJJJ5555"
+    
+    entries = [create_observation(f"entry-{i}", ObservationType.ENTRY_OBSERVED, base_time, guard_fp) for i in range(3)]
+    exits = [create_observation(f"exit-{i}", ObservationType.EXIT_OBSERVED, base_time, exit_fp) for i in range(2)]
+    entries[1].occurrences = 4
+    
+    pairs = correlation_engine.correlate_observations(entries, exits, with_reasoning=False)
+    
+    # Reference: entry then exit of each pair, in order
+    engine = CorrelationEngine()
+    expected = []
+    for entry in entries:
+        for exit_obs in exits:
+            expected.append((
+                engine._calculate_repetition_weight(entry),
+                engine._calculate_repetition_weight(exit_obs)
+            ))
+    
+    assert [p.score_breakdown["repetition_boost"] for p in pairs] == [(e + x) / 2.0 for e, x in expected]
+    assert list(correlation_engine.pattern_frequency.values()) == list(engine.pattern_frequency.values()) == [12, 6]
+    assert len(correlation_engine.observation_history[guard_fp]) == 6
+
+
+def test_pattern_cache_bound(correlation_engine):
+    """Test that the least recently seen pattern is forgotten past PATTERN_CACHE_MAX"""
+    from config import settings
+    
+    original_value = settings.PATTERN_CACHE_MAX
+    settings.PATTERN_CACHE_MAX = 2
+    
+    try:
+        base_time = datetime.utcnow()
+        relays = ["RELAY_A", "RELAY_B", "RELAY_A", "RELAY_C"]
+        for i, relay_fp in enumerate(relays):
+            obs = create_observation(f"obs-{i}", ObservationType.ENTRY_OBSERVED, base_time, relay_fp)
+            correlation_engine._calculate_repetition_weight(obs)
+        
+        # RELAY_B was seen least recently, so RELAY_C evicted it
+        remaining = {
+            correlation_engine._describe_pattern_key(key).split(":")[0]: count
+            for key, count in correlation_engine.pattern_frequency.items()
+        }
+        assert remaining == {"RELAY_A": 2, "RELAY_C": 1}
+    
+    finally:
+        settings.PATTERN_CACHE_MAX = original_value
+
+
+def test_observation_history_bound(correlation_engine):
+    """Test that each relay keeps only its OBSERVATION_HISTORY_MAX latest sightings"""
+    from config import settings
+    
+    original_value = settings.OBSERVATION_HISTORY_MAX
+    settings.OBSERVATION_HISTORY_MAX = 2
+    
+    try:
+        correlation_engine.reset_repetition_state()
+        base_time = datetime.utcnow()
+        for i in range(4):
+            obs = create_observation(f"obs-{i}", ObservationType.ENTRY_OBSERVED, base_time, "RELAY_A")
+            correlation_engine._calculate_repetition_weight(obs)
+        
+        history = correlation_engine.observation_history["RELAY_A"]
+        assert [o.observation_id for o in history] == ["obs-2", "obs-3"]
+        
+        # Counts are kept in pattern_frequency, so the bound does not affect weighting
+        assert list(correlation_engine.pattern_frequency.values()) == [4]
+    
+    finally:
+        settings.OBSERVATION_HISTORY_MAX = original_value
 
 
 def test_pattern_key_creation(correlation_engine):
@@ -120,8 +225,7 @@ def test_repetition_boosts_correlation(correlation_engine):
     if len(pairs_repeated) >= 5:
         last_score = pairs_repeated[-1].correlation_strength
         
-        print(f"\nInitial correlation: {initial_score:.2f}%")
-        print(f"After repetition: {last_score:.2f}%")
+        logger.info("Correlation initially %.2f%%, after repetition %.2f%%", initial_score, last_score)
         
         # With repetition weighting enabled, later observations should score higher
         # (or at least not lower, if already at max)
@@ -163,11 +267,29 @@ def test_repetition_statistics(correlation_engine):
     assert stats["total_unique_patterns"] == 2
     assert stats["max_repetitions"] == 5
     
-    print(f"\nRepetition Statistics:")
-    print(f"  Unique patterns: {stats['total_unique_patterns']}")
-    print(f"  Repeated patterns: {stats['repeated_patterns']}")
-    print(f"  Max repetitions: {stats['max_repetitions']}")
-    print(f"  Average repetitions: {stats['avg_repetitions']}")
+    logger.info("Repetition statistics: %d unique patterns, %d repeated, max %d, average %s",
+                stats["total_unique_patterns"], stats["repeated_patterns"],
+                stats["max_repetitions"], stats["avg_repetitions"])
+
+
+def test_repetition_statistics_refresh(correlation_engine):
+    """Test that cached statistics follow later repetitions"""
+    base_time = datetime.utcnow()
+    relay_fp = "AAAA1111BBBB2222CCCC3333DDDD4444EEEE5555"
+    
+    obs = create_observation("obs-1", ObservationType.ENTRY_OBSERVED, base_time, relay_fp)
+    correlation_engine._calculate_repetition_weight(obs)
+    assert correlation_engine.get_repetition_statistics()["max_repetitions"] == 1
+    
+    correlation_engine._calculate_repetition_weight(obs)
+    stats = correlation_engine.get_repetition_statistics()
+    assert stats["max_repetitions"] == 2
+    assert stats["top_patterns"] == [{"pattern": stats["most_common_pattern"], "count": 2}]
+    
+    correlation_engine.correlate_observations(
+        [obs], [create_observation("exit-1", ObservationType.EXIT_OBSERVED, base_time, relay_fp)]
+    )
+    assert correlation_engine.get_repetition_statistics()["max_repetitions"] == 3
 
 
 def test_repetition_weighting_disabled():
@@ -196,4 +318,4 @@ def test_repetition_weighting_disabled():
 
 
 if __name__ == "__main__":
-    pytest.main([__file__, "-v", "-s"])
+    pytest.main([__file__, "-v", "--log-cli-level=INFO"])
@@ -2,9 +2,12 @@
 Unit tests for TOR Topology Engine
 """
 import pytest
+import numpy as np
 from datetime import datetime
-from app.core.topology import TORTopologyEngine
-from app.models.topology import TORRelay, RelayFlags
+from app.core.topology import TORTopologyEngine, TORGraphAnalyzer
+from app.models.correlation import TrafficObservation, ObservationType
+from app.models.topology import TORRelay, TopologySnapshot, RelayFlags, FLAG_RUNNING, FLAG_VALID, FLAG_STABLE
+from app.models import topology as topology_models
 
 
 @pytest.mark.asyncio
@@ -68,5 +71,278 @@ async def test_relay_parsing():
         await engine.close()
 
 
+def test_circuit_flag_constraints():
+    """Test that circuit validation checks the Running and Valid flags"""
+    now = datetime.utcnow()
+    
+    def make_relay(n, flags, address):
+        return TORRelay(
+            fingerprint=f"{n:040X}", address=address, or_port=9001,
+            flags=flags, first_seen=now, last_seen=now
+        )
+    
+    relays = [
+        make_relay(1, [RelayFlags.GUARD, RelayFlags.RUNNING, RelayFlags.VALID], "10.1.0.1"),
+        make_relay(2, [RelayFlags.RUNNING, RelayFlags.VALID], "10.2.0.1"),
+        make_relay(3, [RelayFlags.EXIT, RelayFlags.RUNNING, RelayFlags.VALID], "10.3.0.1"),
+        make_relay(4, [RelayFlags.EXIT], "10.4.0.1"),
+    ]
+    snapshot = TopologySnapshot(
+        snapshot_id="snapshot-test", valid_after=now, valid_until=now, fresh_until=now,
+        relays=relays, total_relays=len(relays)
+    )
+    analyzer = TORGraphAnalyzer(snapshot)
+    
+    is_valid, violations = analyzer.is_valid_circuit(relays[0].fingerprint, relays[1].fingerprint, relays[2].fingerprint)
+    assert is_valid
+    assert violations == []
+    
+    is_valid, violations = analyzer.is_valid_circuit(relays[0].fingerprint, relays[1].fingerprint, relays[3].fingerprint)
+    assert not is_valid
+    assert violations == ["exit relay is not Running", "exit relay is not Valid"]
+    
+    fps = [r.fingerprint for r in relays]
+    batch = analyzer.validate_circuits_batch([
+        (fps[0], fps[1], fps[2]),
+        (fps[0], fps[1], fps[3]),
+        (fps[0], fps[1], "0" * 40),
+    ])
+    assert batch.tolist() == [True, False, False]
+    
+    adjacency = analyzer.get_exit_guard_adjacency()
+    assert adjacency.neighbors(2).tolist() == [0]
+    assert adjacency.neighbors(1).tolist() == []
+    edges = adjacency.edges(3, relays)
+    assert [(e.source_fingerprint, e.target_fingerprint) for e in edges] == [(fps[3], fps[0])]
+
+
+def test_snapshot_statistics():
+    """Test that snapshot statistics are computed from the relay columns"""
+    now = datetime.utcnow()
+    relays = [
+        TORRelay(fingerprint="A" * 40, address="10.1.0.1", or_port=9001, observed_bandwidth=1000,
+                 flags=[RelayFlags.GUARD], first_seen=now, last_seen=now),
+        TORRelay(fingerprint="B" * 40, address="10.2.0.1", or_port=9001, observed_bandwidth=3000,
+                 flags=[RelayFlags.EXIT], first_seen=now, last_seen=now),
+        TORRelay(fingerprint="C" * 40, address="10.3.0.1", or_port=9001, observed_bandwidth=2000,
+                 flags=[RelayFlags.EXIT, RelayFlags.BAD_EXIT], first_seen=now, last_seen=now),
+    ]
+    snapshot = TopologySnapshot(
+        snapshot_id="snapshot-test", valid_after=now, valid_until=now, fresh_until=now,
+        relays=relays
+    )
+    snapshot.compute_statistics()
+    
+    assert snapshot.total_relays == 3
+    assert snapshot.guard_relays == sum(1 for r in relays if r.is_guard)
+    assert snapshot.exit_relays == sum(1 for r in relays if r.is_exit)
+    assert snapshot.total_bandwidth == 6000
+    assert snapshot.avg_bandwidth == 2000.0
+    assert snapshot.arrays.fingerprints[1] == b"B" * 40
+    assert (snapshot.arrays.last_seen_us - snapshot.arrays.first_seen_us).tolist() == [0, 0, 0]
+    assert snapshot.fp_index["B" * 40] == 1
+    assert snapshot.relay_by_fp("C" * 40) is relays[2]
+    assert snapshot.relay_by_fp("D" * 40) is None
+    
+    with pytest.raises(ValueError, match="40 hexadecimal"):
+        TORRelay(fingerprint="Z" * 40, address="10.4.0.1", or_port=9001, first_seen=now, last_seen=now)
+
+
+def test_relay_construct_unchecked():
+    """Test that an unvalidated relay matches the validated one"""
+    now = datetime.utcnow()
+    fields = dict(fingerprint="a" * 40, address="10.1.0.1", or_port=9001, consensus_weight=10,
+                  first_seen=now, last_seen=now, snapshot_timestamp=now)
+    
+    validated = TORRelay(flags=[RelayFlags.GUARD, RelayFlags.EXIT], **fields)
+    unchecked = TORRelay.construct_unchecked(flags=[RelayFlags.GUARD, "Exit"], **fields)
+    
+    assert unchecked.model_dump() == validated.model_dump()
+    assert unchecked.flags_mask == validated.flags_mask
+    assert unchecked.is_guard and unchecked.is_exit
+
+
+def test_fingerprint_interning():
+    """Test that observations share relay fingerprints but never add to the intern table"""
+    now = datetime.utcnow()
+    relay = TORRelay(fingerprint="".join(["b" * 20, "c" * 20]), address="10.2.0.1", or_port=9001,
+                     first_seen=now, last_seen=now)
+    
+    def observation(fingerprint):
+        return TrafficObservation(
+            observation_id="obs-1", observation_type=ObservationType.ENTRY_OBSERVED,
+            timestamp=now, observed_ip="10.2.0.1", relay_fingerprint=fingerprint
+        )
+    
+    assert observation("".join(["b" * 20, "c" * 20])).relay_fingerprint is relay.fingerprint
+    
+    table_size = len(topology_models._FP_INTERN)
+    unknown = observation("client-supplied-" + "d" * 30).relay_fingerprint
+    assert unknown == "client-supplied-" + "d" * 30
+    assert len(topology_models._FP_INTERN) == table_size
+
+
+def test_weighted_relay_sampling():
+    """Test that guards are sampled in proportion to consensus weight"""
+    now = datetime.utcnow()
+    relays = [
+        TORRelay(fingerprint=f"{n:040X}", address=f"10.{n}.0.1", or_port=9001, consensus_weight=weight,
+                 flags=[RelayFlags.GUARD], first_seen=now, last_seen=now)
+        for n, weight in enumerate([100, 0, 300])
+    ]
+    snapshot = TopologySnapshot(
+        snapshot_id="snapshot-test", valid_after=now, valid_until=now, fresh_until=now,
+        relays=relays
+    )
+    
+    # Cumulative weight shares are 0.25 and 1.0; the zero-weight relay is never picked
+    rows = snapshot.sample_guards(np.array([0.0, 0.2, 0.25, 0.9]))
+    assert rows.tolist() == [0, 0, 2, 2]
+    
+    with pytest.raises(ValueError):
+        snapshot.sample_exits(np.array([0.5]))
+
+
+def test_guard_selection_probability(synthetic_topology):
+    """Test the precomputed guard selection probabilities"""
+    analyzer = TORGraphAnalyzer(synthetic_topology)
+    guards = analyzer.get_possible_guards()
+    total = sum(g.consensus_weight for g in guards)
+    
+    top_guard = guards[0]
+    probability = analyzer.estimate_guard_selection_probability(top_guard.fingerprint)
+    assert probability == top_guard.consensus_weight / total * 100
+    
+    # Bulk lookup: guards by weight, a non-guard and an unknown relay score 0
+    exit_fp = analyzer.get_possible_exits()[0].fingerprint
+    fps = [g.fingerprint for g in guards] + [exit_fp, "UNKNOWN"]
+    probabilities = analyzer.estimate_guard_selection_probabilities(fps)
+    assert probabilities.tolist() == [analyzer.estimate_guard_selection_probability(fp) for fp in fps]
+    assert probabilities[-2:].tolist() == [0.0, 0.0]
+    assert abs(probabilities.sum() - 100.0) < 1e-9
+
+
+def test_filtered_guards_and_exits(synthetic_topology):
+    """Test bandwidth and flag filters on the guard/exit lists"""
+    analyzer = TORGraphAnalyzer(synthetic_topology)
+    
+    guards = analyzer.get_possible_guards(min_bandwidth=500000)
+    assert guards == [g for g in analyzer.get_possible_guards() if g.observed_bandwidth >= 500000]
+    assert len(guards) == 2
+    
+    assert analyzer.get_possible_exits(required_flags=FLAG_RUNNING | FLAG_VALID) == analyzer.get_possible_exits()
+    assert analyzer.get_possible_exits(required_flags=FLAG_STABLE) == []
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
+
+
+@pytest.mark.asyncio
+async def test_snapshot_disk_cache(tmp_path):
+    """Test that an unchanged consensus is served from the snapshot cache"""
+    import httpx
+    
+    body = {"relays": [{
+        "fingerprint": "A" * 40,
+        "nickname": "cached",
+        "or_addresses": ["10.0.0.1:9001"],
+        "flags": ["Guard", "Running", "Valid"],
+        "consensus_weight": 100,
+        "first_seen": "2025-01-01 00:00:00",
+        "last_seen": "2025-01-02 00:00:00",
+    }]}
+    requests = []
+    
+    def handler(request):
+        requests.append(request)
+        if request.headers.get("If-Modified-Since") == "Wed, 01 Jan 2025 00:00:00 GMT":
+            return httpx.Response(304)
+        return httpx.Response(200, json=body, headers={"Last-Modified": "Wed, 01 Jan 2025 00:00:00 GMT"})
+    
+    engine = TORTopologyEngine()
+    engine.client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    engine.cache_dir = engine.processed_dir = engine.snapshot_cache_dir = tmp_path
+    
+    try:
+        first = await engine.create_topology_snapshot(limit=1)
+        second = await engine.create_topology_snapshot(limit=1)
+        
+        assert len(requests) == 2
+        assert "If-Modified-Since" not in requests[0].headers
+        assert second.snapshot_id == first.snapshot_id
+        assert second.relays[0].fingerprint == "A" * 40
+        assert second.guard_relays == 1
+        
+        # The audit copy is the response body exactly as received
+        raw_files = list(tmp_path.glob("onionoo_details_*.json"))
+        assert [f.read_bytes() for f in raw_files] == [httpx.Response(200, json=body).content]
+        
+        # The saved snapshot loads back unchanged
+        loaded = await engine.load_snapshot(first.snapshot_id)
+        assert loaded.model_dump() == first.model_dump()
+        assert engine.list_snapshots() == [first.snapshot_id]
+        
+    finally:
+        await engine.close()
+
+
+@pytest.mark.asyncio
+async def test_bandwidth_refresh(tmp_path):
+    """Test that a bandwidth refresh updates a copy of the snapshot and adds only new relays in full"""
+    import httpx
+    
+    relay = {
+        "fingerprint": "A" * 40,
+        "or_addresses": ["10.0.0.1:9001"],
+        "flags": ["Guard", "Running", "Valid"],
+        "consensus_weight": 100,
+        "observed_bandwidth": 1000,
+        "first_seen": "2025-01-01 00:00:00",
+        "last_seen": "2025-01-02 00:00:00",
+    }
+    bodies = [
+        {"relays": [relay, dict(relay, fingerprint="B" * 40)]},
+        {"relays": [{"fingerprint": "A" * 40, "consensus_weight": 300,
+                     "observed_bandwidth": 1000, "last_seen": "2025-01-02 01:00:00"},
+                    {"fingerprint": "C" * 40, "consensus_weight": 50,
+                     "observed_bandwidth": 500, "last_seen": "2025-01-02 01:00:00"}]},
+        {"relays": [dict(relay, fingerprint="C" * 40, flags=["Exit", "Running", "Valid"])]},
+    ]
+    requests = []
+    
+    def handler(request):
+        requests.append(request)
+        return httpx.Response(200, json=bodies[len(requests) - 1])
+    
+    engine = TORTopologyEngine()
+    engine.client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    engine.cache_dir = engine.processed_dir = engine.snapshot_cache_dir = tmp_path
+    
+    try:
+        snapshot = await engine.create_topology_snapshot()
+        refreshed = await engine.refresh_snapshot(snapshot)
+        
+        assert requests[1].url.params["fields"] == "fingerprint,observed_bandwidth,consensus_weight,last_seen"
+        
+        # Relay B is no longer running; A keeps its other attributes
+        assert [r.fingerprint for r in refreshed.relays] == ["A" * 40, "C" * 40]
+        assert refreshed.relays[0].consensus_weight == 300
+        assert refreshed.relays[0].last_seen == datetime(2025, 1, 2, 1)
+        assert refreshed.relays[0].is_guard
+        assert refreshed.guard_relays == refreshed.exit_relays == 1
+        
+        # Relay C is new: only relays first seen since the snapshot are fetched in full
+        assert requests[2].url.params["first_seen_days"] == "0-1"
+        assert refreshed.relays[1].is_exit
+        
+        # The previous snapshot is unchanged
+        assert snapshot.relays[0].consensus_weight == 100
+        assert snapshot.total_relays == 2
+        
+        # Each fetch keeps its own audit copy
+        raw_files = sorted(f.name.rsplit("_", 2)[0] for f in tmp_path.glob("onionoo_*.json"))
+        assert raw_files == ["onionoo_bandwidth", "onionoo_details", "onionoo_new_relays"]
+    
+    finally:
+        await engine.close()
@@ -12,6 +12,7 @@ from app.models.weight_profile import (
     ProfileType,
     get_profile,
     create_custom_profile,
+    validate_weight_rows,
     PREDEFINED_PROFILES
 )
 from app.core.correlation import CorrelationEngine
@@ -39,6 +40,37 @@ def create_test_observation(
     )
 
 
+@pytest.fixture(scope="module")
+def time_vs_volume_obs():
+    """Entry/exit pair with close timing (1s) but a 5x volume difference"""
+    base_time = datetime.now()
+    entry = create_test_observation("entry-1", ObservationType.ENTRY_OBSERVED, base_time)
+    exit_obs = create_test_observation(
+        "exit-1",
+        ObservationType.EXIT_OBSERVED,
+        base_time + timedelta(seconds=1),
+        bytes_transferred=5000000
+    )
+    return entry, exit_obs
+
+
+@pytest.fixture(scope="module")
+def shared_profile_engines():
+    """One correlation engine per predefined profile, for the module's tests"""
+    return {
+        profile_type: CorrelationEngine(weight_profile=profile)
+        for profile_type, profile in PREDEFINED_PROFILES.items()
+    }
+
+
+@pytest.fixture
+def profile_engines(shared_profile_engines):
+    """The shared engines, by profile type, with their repetition history cleared"""
+    for engine in shared_profile_engines.values():
+        engine.reset_repetition_state()
+    return shared_profile_engines
+
+
 def test_predefined_profiles_exist():
     """Test that all predefined profiles exist and are valid"""
     assert len(PREDEFINED_PROFILES) == 4
@@ -63,6 +95,7 @@ def test_standard_profile():
     assert profile.weight_time_correlation == 0.40
     assert profile.weight_volume_similarity == 0.30
     assert profile.weight_pattern_similarity == 0.30
+    assert profile.weights == (0.40, 0.30, 0.30)
     assert profile.validate_weights_sum()
 
 
@@ -99,6 +132,16 @@ def test_pattern_focused_profile():
     assert profile.validate_weights_sum()
 
 
+def test_predefined_profiles_frozen():
+    """Test that the shared predefined profiles cannot be modified"""
+    profile = get_profile(ProfileType.STANDARD)
+    assert get_profile(ProfileType.STANDARD) is profile
+    
+    with pytest.raises(ValueError):
+        profile.weight_time_correlation = 0.9
+    assert profile.weight_time_correlation == 0.40
+
+
 def test_create_valid_custom_profile():
     """Test creating a valid custom profile"""
     profile = create_custom_profile(
@@ -176,7 +219,7 @@ def test_correlation_engine_with_custom_profile():
     assert profile.weight_pattern_similarity == 0.2
 
 
-def test_correlation_engine_profile_update():
+def test_correlation_engine_profile_update(time_vs_volume_obs):
     """Test updating weight profile on existing engine"""
     engine = CorrelationEngine()
     
@@ -189,52 +232,52 @@ def test_correlation_engine_profile_update():
     
     assert engine.get_weight_profile().profile_type == ProfileType.TIME_FOCUSED
     assert engine.get_weight_profile().weight_time_correlation == 0.60
+    
+    # Scoring picks up the new weights
+    entry, exit_obs = time_vs_volume_obs
+    pairs = engine.correlate_observations([entry], [exit_obs])
+    assert pairs[0].score_breakdown["time_correlation"]["weight"] == 0.60
 
 
-def test_correlation_results_differ_by_profile():
-    """Test that different profiles produce different correlation strengths"""
-    base_time = datetime.now()
+def test_correlation_engine_with_profile(time_vs_volume_obs):
+    """Test deriving an engine with a different profile"""
+    engine = CorrelationEngine()
+    entry, exit_obs = time_vs_volume_obs
+    engine.correlate_observations([entry], [exit_obs])
     
-    # Create observations with good time correlation but poor volume match
-    entry = create_test_observation(
-        "entry-1",
-        ObservationType.ENTRY_OBSERVED,
-        base_time,
-        bytes_transferred=1000000  # 1 MB
-    )
+    derived = engine.with_profile(get_profile(ProfileType.TIME_FOCUSED))
     
-    exit_obs = create_test_observation(
-        "exit-1",
-        ObservationType.EXIT_OBSERVED,
-        base_time + timedelta(seconds=1),  # Very close timing
-        bytes_transferred=5000000  # 5 MB - big difference
-    )
+    assert derived.get_weight_profile().profile_type == ProfileType.TIME_FOCUSED
+    assert engine.get_weight_profile().profile_type == ProfileType.STANDARD
+    assert derived.graph_analyzer is engine.graph_analyzer
+    assert derived._cluster_cache is not engine._cluster_cache
+    assert len(derived.pattern_frequency) == 0
+    assert len(engine.pattern_frequency) > 0
+
+
+def test_correlation_results_differ_by_profile(profile_engines, time_vs_volume_obs):
+    """Test that different profiles produce different correlation strengths"""
+    # Good time correlation but poor volume match
+    entry, exit_obs = time_vs_volume_obs
     
     # Test with time-focused profile (should score higher)
-    time_engine = CorrelationEngine(weight_profile=get_profile(ProfileType.TIME_FOCUSED))
-    time_pairs = time_engine.correlate_observations([entry], [exit_obs])
+    time_pairs = profile_engines[ProfileType.TIME_FOCUSED].correlate_observations([entry], [exit_obs])
     
     # Test with volume-focused profile (should score lower)
-    volume_engine = CorrelationEngine(weight_profile=get_profile(ProfileType.VOLUME_FOCUSED))
-    volume_pairs = volume_engine.correlate_observations([entry], [exit_obs])
+    volume_pairs = profile_engines[ProfileType.VOLUME_FOCUSED].correlate_observations([entry], [exit_obs])
     
     # Time-focused should produce higher correlation (good time, bad volume)
     if time_pairs and volume_pairs:
-        print(f"\nTime-focused correlation: {time_pairs[0].correlation_strength:.1f}%")
-        print(f"Volume-focused correlation: {volume_pairs[0].correlation_strength:.1f}%")
         assert time_pairs[0].correlation_strength > volume_pairs[0].correlation_strength
 
 
-def test_profile_in_reasoning():
+def test_profile_in_reasoning(profile_engines, time_vs_volume_obs):
     """Test that profile name appears in correlation reasoning"""
-    base_time = datetime.now()
-    
-    entry = create_test_observation("entry-1", ObservationType.ENTRY_OBSERVED, base_time)
-    exit_obs = create_test_observation("exit-1", ObservationType.EXIT_OBSERVED, base_time + timedelta(seconds=1))
+    entry, exit_obs = time_vs_volume_obs
     
     # Use time-focused profile
-    profile = get_profile(ProfileType.TIME_FOCUSED)
-    engine = CorrelationEngine(weight_profile=profile)
+    engine = profile_engines[ProfileType.TIME_FOCUSED]
+    profile = engine.get_weight_profile()
     
     pairs = engine.correlate_observations([entry], [exit_obs])
     
@@ -259,7 +302,18 @@ def test_weight_validation():
         profile.validate_weights_sum()
 
 
-def test_edge_case_all_weight_on_time():
+def test_weight_rows_validation():
+    """Test that batch weight validation matches the per-profile rules"""
+    rows = [
+        [0.4, 0.3, 0.3],
+        [0.5, 0.3, 0.1],  # Sum = 0.9
+        [1.2, -0.1, -0.1],  # Sums to 1.0 but out of range
+    ]
+    
+    assert validate_weight_rows(rows).tolist() == [True, False, False]
+
+
+def test_edge_case_all_weight_on_time(time_vs_volume_obs):
     """Test extreme profile with all weight on time correlation"""
     profile = create_custom_profile(
         profile_id="time-only",
@@ -272,10 +326,7 @@ def test_edge_case_all_weight_on_time():
     assert profile.validate_weights_sum()
     
     engine = CorrelationEngine(weight_profile=profile)
-    base_time = datetime.now()
-    
-    entry = create_test_observation("entry", ObservationType.ENTRY_OBSERVED, base_time, bytes_transferred=1000000)
-    exit_obs = create_test_observation("exit", ObservationType.EXIT_OBSERVED, base_time + timedelta(seconds=0.5), bytes_transferred=10000000)
+    entry, exit_obs = time_vs_volume_obs
     
     pairs = engine.correlate_observations([entry], [exit_obs])
     
@@ -283,6 +334,26 @@ def test_edge_case_all_weight_on_time():
     assert len(pairs) > 0
 
 
+def test_edge_case_all_weight_on_pattern(time_vs_volume_obs):
+    """Test a pattern-only profile: pairs without timing patterns score nothing"""
+    profile = create_custom_profile(
+        profile_id="pattern-only",
+        profile_name="Pattern Only",
+        weight_time=0.0,
+        weight_volume=0.0,
+        weight_pattern=1.0
+    )
+    
+    engine = CorrelationEngine(weight_profile=profile)
+    derived = CorrelationEngine().with_profile(profile)
+    derived.set_weight_profile(profile)
+    
+    # The sample observations carry no inter-packet timings
+    entry, exit_obs = time_vs_volume_obs
+    assert engine.correlate_observations([entry], [exit_obs]) == []
+    assert derived.correlate_observations([entry], [exit_obs]) == []
+
+
 def test_profile_metadata():
     """Test that profile metadata is properly stored"""
     profile = create_custom_profile(
@@ -304,4 +375,4 @@ def test_profile_metadata():
 
 
 if __name__ == "__main__":
-    pytest.main([__file__, "-v", "-s"])
+    pytest.main([__file__, "-v"])